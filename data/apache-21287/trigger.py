@@ -42,4 +42,4 @@ class Trigger(ApacheTrigger):
         """
         Gets the url to fetch when benchmarking
         """
-        return "http://127.0.0.1:{}/pippo.php?variable=1111".format(self.conf.get("listening_port"))
+        return "http://127.0.0.1:{}/pippo.php?variable=1111".format(self.resource("port"))
@@ -45,7 +45,7 @@ class Trigger(ApacheTrigger):
         """
         The url to fetch for benchmarking
         """
-        return "http://127.0.0.1:{port}/index.html.fr".format(port=self.conf.get("listening_port"))
+        return "http://127.0.0.1:{port}/index.html.fr".format(port=self.resource("port"))
 
     @property
     def named_helper_args(self) -> dict:
@@ -53,6 +53,6 @@ class Trigger(ApacheTrigger):
         Adds the listening port and the number of iteration to do to the arguments passed to the helper
         """
         return {
-            "port": self.conf["listening_port"],
+            "port": self.resource("port"),
             "iterations": 100
         }
@@ -47,4 +47,4 @@ class Trigger(ApacheTrigger):
         """
         The url to fetch for benchmarking means
         """
-        return "http://127.0.0.1:{port}/index.html".format(port=self.conf.get("listening_port"))
+        return "http://127.0.0.1:{port}/index.html".format(port=self.resource("port"))
@@ -5,14 +5,13 @@
 This script triggers a bug in cppcheck (#148).
 """
 
-from contextlib import suppress
 import os
-import shutil
 
 from lib.parsers.configuration import get_global_conf
 from lib import constants
-from lib import hooks
+from lib.installer.extract import ExtractionCache, extract
 from lib.trigger import BaseTrigger
+from lib.trigger.resources import ScratchDirectory
 
 
 __author__ = 'Benjamin Schubert, benjamin.schubert@epfl.ch'
@@ -22,10 +21,11 @@ class Trigger(BaseTrigger):
     """
     This trigger is for a bug in cppcheck 1.48, which is unable to parse a way of adding assembly code in it
     """
+    resources = [ScratchDirectory("sources")]
+
     def __init__(self):
         super().__init__()
         self.benchmark.pre_benchmark_run = self.pre_benchmark_run
-        hooks.register_for_cleaning(self.post_trigger_clean)
 
     @property
     def program(self):
@@ -62,19 +62,12 @@ class Trigger(BaseTrigger):
         """
         For benchmarking, we need to work on bigger files. We use transmission for this purpose
         """
-        shutil.unpack_archive(
-            os.path.join(get_global_conf().get("install", "source_directory"), "cppcheck-148/cppcheck-1.48.tar.gz"),
-            "/tmp/cppcheck-148"
+        archive = os.path.join(
+            get_global_conf().get("install", "source_directory"), "cppcheck-148/cppcheck-1.48.tar.gz"
         )
-        self.cmd = " ".join(self.cmd.split(" ")[:-1]) + " /tmp/cppcheck-148/cppcheck-1.48"
-
-    # noinspection PyUnusedLocal
-    @staticmethod
-    def post_trigger_clean(*args, **kwargs) -> None:
-        """
-        After a successful run, we remove transmission if we used it
-        :param args: additional arguments
-        :param kwargs: additional keyword arguments
-        """
-        with suppress(FileNotFoundError):
-            shutil.rmtree("/tmp/cppcheck-148")
+        if ExtractionCache.enabled():
+            sources = ExtractionCache().tree(archive)
+        else:
+            sources = self.resource("sources")
+            extract(archive, sources)
+        self.cmd = " ".join(self.cmd.split(" ")[:-1]) + " " + os.path.join(sources, "cppcheck-1.48")
@@ -9,23 +9,23 @@ from lib.parsers.configuration import get_global_conf
 __author__ = 'Benjamin Schubert, benjamin.schubert@epfl.ch'
 
 
-from contextlib import suppress
 import os
-import shutil
 
-from lib import hooks
 from lib import constants
+from lib.installer.extract import ExtractionCache, extract
 from lib.trigger import BaseTrigger
+from lib.trigger.resources import ScratchDirectory
 
 
 class Trigger(BaseTrigger):
     """
     This is the trigger for a bug in cppcheck 1.52
     """
+    resources = [ScratchDirectory("sources")]
+
     def __init__(self):
         super().__init__()
         self.benchmark.pre_benchmark_run = self.pre_benchmark_run
-        hooks.register_for_cleaning(self.post_trigger_clean)
 
     @property
     def program(self) -> str:
@@ -61,19 +61,12 @@ class Trigger(BaseTrigger):
         """
         When benchmarking, it is better to have a bigger workload. We use transmission for this purpose
         """
-        shutil.unpack_archive(
-            os.path.join(get_global_conf().get("install", "source_directory"), "cppcheck-152/cppcheck-1.52.tar.gz"),
-            "/tmp/cppcheck-152"
+        archive = os.path.join(
+            get_global_conf().get("install", "source_directory"), "cppcheck-152/cppcheck-1.52.tar.gz"
         )
-        self.cmd = " ".join(self.cmd.split(" ")[:-1]) + " /tmp/cppcheck-152/cppcheck-1.52"
-
-    # noinspection PyUnusedLocal
-    @staticmethod
-    def post_trigger_clean(*args, **kwargs) -> None:
-        """
-        After the run, we clean the transmission file if needed
-        :param args: additional arguments
-        :param kwargs: additional keyword arguments
-        """
-        with suppress(FileNotFoundError):
-            shutil.rmtree("/tmp/cppcheck-152")
+        if ExtractionCache.enabled():
+            sources = ExtractionCache().tree(archive)
+        else:
+            sources = self.resource("sources")
+            extract(archive, sources)
+        self.cmd = " ".join(self.cmd.split(" ")[:-1]) + " " + os.path.join(sources, "cppcheck-1.52")
@@ -8,8 +8,8 @@ This script triggers a bug in curl (version 7.21).
 __author__ = "Baris Kasikci, baris.kasikci@epfl.ch"
 
 
-from lib.plugins import create_big_file
 from lib.trigger import BaseTrigger
+from lib.trigger.workloads import WorkloadManager
 
 
 class Trigger(BaseTrigger):
@@ -51,7 +51,7 @@ class Trigger(BaseTrigger):
     def pre_benchmark_run(self) -> None:
         """
         For benchmarking purpose, downloading a file from the internet is too much throughput limited. We fallback to
-        a big file created on our disk
+        a big file created on our disk. Curl only copies it, its content does not matter
         """
-        path = create_big_file(1024*15)
+        path = WorkloadManager().get(1024 * 15, "zeros")
         self.cmd = self.cmd.rsplit(" ", 1)[0] + " file://{}".format(path)
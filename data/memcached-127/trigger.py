@@ -13,6 +13,8 @@ import os
 import memcache
 
 from lib.trigger import TriggerWithHelper, BaseHelper
+from lib.trigger.probes import TcpProbe
+from lib.trigger.resources import Cpus, Port
 
 
 class Helper(BaseHelper):
@@ -36,9 +38,9 @@ class Helper(BaseHelper):
         def __exit__(self, exc_type, exc_val, exc_tb):
             self.client.disconnect_all()
 
-    def __init__(self, key, iterations, results):
+    def __init__(self, key, iterations, results, port):
         super().__init__()
-        self.url = "127.0.0.1:11211"
+        self.url = "127.0.0.1:{}".format(port)
         self.key = key
         self.results = results
         self.iterations = iterations
@@ -61,9 +63,11 @@ class Trigger(TriggerWithHelper):
     """
     The trigger implementation for memcached
     """
+    resources = [Port("port"), Cpus(2)]
+
     def __init__(self):
         super().__init__()
-        self.__named_helper_args__ = {"iterations": 200}
+        self.__named_helper_args__ = {"iterations": 200, "port": self.resource("port")}
         self.benchmark.pre_benchmark_run = self.pre_benchmark_run
 
     @property
@@ -76,27 +80,21 @@ class Trigger(TriggerWithHelper):
     @property
     def start_cmd(self) -> str:
         """
-        The start command has to append -u root if the program is run as root
+        The start command has to append -u root if the program is run as root. UDP is disabled, as it would otherwise
+        listen on the default port
         """
-        command = "{} -t 2".format(self.conf.get_executable())
+        command = "{} -t 2 -l 127.0.0.1 -p {} -U 0".format(self.conf.get_executable(), self.resource("port"))
         if os.getuid() == 0:
             command += " -u root"
 
         return command
 
     @property
-    def stop_cmd(self) -> str:
-        """
-        Sends kill signal to memcached
-        """
-        return "pkill memcached"
-
-    @property
-    def delay(self) -> int:
+    def probes(self) -> list:
         """
-        The delay to wait until memcached is up
+        Memcached is up as soon as it accepts connections
         """
-        return 2
+        return [TcpProbe(self.resource("port"))]
 
     @property
     def helper_commands(self) -> list:
@@ -129,7 +127,7 @@ class Trigger(TriggerWithHelper):
         """
         if None in results:
             return 1
-        if self.named_helper_args["iterations"] * 2 not in results:
+        if self.active_helper_args["iterations"] * len(self.active_helper_commands) not in results:
             return None
 
         return 0
@@ -8,15 +8,34 @@ This script triggers a bug in pbzip2 (version 0.94).
 __author__ = "Baris Kasikci, baris.kasikci@epfl.ch"
 
 
+import os
+import shutil
+
 from lib import constants
-from lib.plugins import create_big_file
 from lib.trigger import BaseTrigger
+from lib.trigger.resources import Cpus, ScratchDirectory
+from lib.trigger.workloads import WorkloadManager
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """
+    Hard links the file at the destination, or copies it if they are not on the same filesystem
+    :param source: the file to link
+    :param destination: where to link it
+    """
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy(source, destination)
 
 
 class Trigger(BaseTrigger):
     """
     Pbzip2-specific Intel PT tracing
     """
+    # pbzip2 writes its output next to its input, each run works on its own link to the input
+    resources = [ScratchDirectory("work"), Cpus(2)]
+
     def __init__(self):
         super().__init__()
         self.benchmark.pre_benchmark_run = self.pre_benchmark_run
@@ -24,9 +43,12 @@ class Trigger(BaseTrigger):
     @property
     def file(self):
         """
-        The file used for tests
+        The file used for tests, linked in the scratch directory of the run
         """
-        return constants.ROOT_PATH + "/data/pbzip-2094/test.tar"
+        path = os.path.join(self.resource("work"), "test.tar")
+        if not os.path.exists(path):
+            link_or_copy(constants.ROOT_PATH + "/data/pbzip-2094/test.tar", path)
+        return path
 
     @property
     def program(self) -> str:
@@ -59,7 +81,9 @@ class Trigger(BaseTrigger):
 
     def pre_benchmark_run(self) -> None:
         """
-        For benchmarking purpose, we need a much bigger file for this. Let's create one and replace it in the command
+        For benchmarking purpose, we need a much bigger file for this. Let's create one and replace it in the command.
+        Its content mixes random and text-like data, for pbzip2 to compress it as it would compress real files
         """
-        path = create_big_file(2048)
+        path = os.path.join(self.resource("work"), "workload.tar")
+        link_or_copy(WorkloadManager().get(2048, "mixed"), path)
         self.cmd = self.cmd.replace(self.file, path)
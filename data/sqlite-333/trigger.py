@@ -10,19 +10,21 @@ __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 from contextlib import suppress
 import logging
-import psutil
 import os
+import signal
 import subprocess
-import time
 
-from lib import constants
 from lib.trigger import BaseTrigger
+from lib.trigger.resources import ScratchDirectory
 
 
 class Trigger(BaseTrigger):
     """
     SQLite deadlock bug trigger
     """
+    # the deadlock program creates its database in its working directory
+    resources = [ScratchDirectory("database")]
+
     @property
     def program(self) -> str:
         """
@@ -51,41 +53,31 @@ class Trigger(BaseTrigger):
         """
         return 1
 
-    @staticmethod
-    def clean() -> None:
+    def clean(self) -> None:
         """
         Cleans test files afterwards
         """
         with suppress(FileNotFoundError):
-            os.remove(os.path.join(constants.ROOT_PATH, "testdb-1"))
+            os.remove(os.path.join(self.resource("database"), "testdb-1"))
 
     def run(self):
         """
-        To run this program, we launch the command and wait until it is in a waiting state, which means it deadlocked.
-        We will then kill it and return
+        To run this program, we launch the command and wait until it deadlocks, which is when all its threads wait on a
+        futex without making any progress. We then make it dump its core and return
         :return: 0|1|None on success|failure|unexpected result
         """
         logging.verbose(self.cmd)
         proc = subprocess.Popen(
             self.cmd.split(" "), stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL, preexec_fn=self.__preexec_fn__,
+            cwd=self.resource("database")
         )
 
-        x = 0
-        counter = 0
-        while proc.poll() is None:
-            if psutil.Process(proc.pid).status() == psutil.STATUS_SLEEPING:
-                counter += 1
-                if counter >= 1000:
-                    proc.send_signal(11)
-                    time.sleep(1)
-                    self.clean()
-                    return self.check_success(1)
-                else:
-                    time.sleep(0.01)
-                    continue
-            x += 1
-            counter = 0
-            time.sleep(0.01)
+        try:
+            if self.wait_for_deadlock(proc):
+                proc.send_signal(signal.SIGSEGV)
+                proc.wait()
+                return self.check_success(1)
 
-        self.clean()
-        return self.check_success(proc.wait())
+            return self.check_success(proc.wait())
+        finally:
+            self.clean()
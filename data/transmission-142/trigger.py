@@ -8,30 +8,36 @@ This script triggers a bug in transmission (version 1.42).
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 
-import subprocess
-
 from lib.exceptions import ProgramTriggerFailedException
 from lib.trigger.benchmark import BaseBenchmark
+from lib.trigger.measures import Measure, measure_command
 from lib.trigger import BaseTrigger
+from lib.trigger.resources import ScratchDirectory
 
 
 class TransmissionBenchmark(BaseBenchmark):
     """
     Transmission benchmark is expected to return 1 instead of 0
     """
-    def benchmark_helper(self) -> None:
+    def benchmark_helper(self) -> Measure:
         """
         Launches transmission and raises an exception if 1 is not returned
         :raise ProgramTriggerFailedException
+        :return: the measure of the run
         """
-        if subprocess.call(self.trigger.cmd, shell=True, stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL) != 1:
+        returncode, measure = measure_command(self.trigger.cmd, shell=True, preexec_fn=self.placement.preexec_fn())
+        if returncode != 1:
             raise ProgramTriggerFailedException("Failed launching benchmark command {}".format(self.trigger.cmd))
 
+        return measure
+
 
 class Trigger(BaseTrigger):
     """
     Trigger for the transmission program
     """
+    resources = [ScratchDirectory("torrents")]
+
     @property
     def program(self):
         """
@@ -51,8 +57,8 @@ class Trigger(BaseTrigger):
         """
         Triggers the bug in transmissioncli
         """
-        return "{}/bin/transmissioncli -n {}/bin/transmissioncli /tmp/test.torrent".format(
-            self.conf.getdir("install_directory"), self.conf.getdir("install_directory")
+        return "{}/bin/transmissioncli -n {}/bin/transmissioncli {}/test.torrent".format(
+            self.conf.getdir("install_directory"), self.conf.getdir("install_directory"), self.resource("torrents")
         )
 
     @property
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+The coredump handler the kernel pipes cores to, set up as kernel.core_pattern by lib.configuration.coredump. Cores are
+compressed as the kernel writes them, without ever being stored whole on disk, and the stack of the crashing thread is
+hashed on the way, so that identical crashes can be recognized without loading the core in a debugger.
+
+It is run by the kernel as root, outside of any bugbase process, and therefore only depends on the standard library
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+CHUNK_SIZE = 1024 ** 2
+
+PT_LOAD, PT_NOTE = 1, 4
+PF_X = 1
+NT_PRSTATUS, NT_FILE = 1, 0x46494c45
+EM_X86_64 = 62
+
+# offset of pr_reg in struct elf_prstatus, and of rbp, rip and rsp in struct user_regs_struct, on x86_64
+PRSTATUS_REGISTERS = 112
+RBP, RIP, RSP = 4, 16, 19
+
+MAXIMUM_HEAD_SIZE = 64 * 1024 ** 2
+STACK_SIZE = 1024 ** 2
+MAXIMUM_FRAMES = 32
+
+
+class CoreStackHasher:
+    """
+    Computes a hash of the stack of the crashing thread of an x86_64 ELF core, fed to it in order as a stream. The
+    program headers and notes at the beginning of the core give the registers of the thread and the files mapped in
+    memory, and the top of the stack is kept when it streams by. Return addresses are found by following frame
+    pointers, or by scanning the stack for addresses in executable mappings when frame pointers are not used. Each
+    address is taken relative to the file it belongs to, so that the hash does not depend on where libraries were
+    loaded
+    """
+    def __init__(self):
+        self.offset = 0
+        self.head = bytearray()
+        self.head_size = 64
+        self.broken = False
+        self.program_headers = []
+        self.notes = None
+        self.signal = None
+        self.registers = None
+        self.mappings = []
+        self.stack_range = None
+        self.stack = bytearray()
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Reads the next part of the core
+
+        :param chunk: the bytes following the ones already fed
+        """
+        start = self.offset
+        self.offset += len(chunk)
+        if self.broken:
+            return
+
+        try:
+            while self.head_size is not None:
+                if len(self.head) < self.head_size:
+                    if len(self.head) >= self.offset:
+                        break
+                    self.head += chunk[len(self.head) - start:self.head_size - start]
+                    if len(self.head) < self.head_size:
+                        break
+                self.__parse_head__()
+
+            if self.stack_range is not None:
+                begin, end = max(start, self.stack_range[0]), min(self.offset, self.stack_range[1])
+                if begin < end:
+                    self.stack += chunk[begin - start:end - start]
+        except (struct.error, ValueError, IndexError):
+            self.broken = True
+
+    def __parse_head__(self) -> None:
+        """
+        Parses the part of the core read so far, and sets how much of it is needed next
+        :raise ValueError if the core is not one that can be hashed
+        """
+        if not self.program_headers:
+            if self.head[:4] != b"\x7fELF" or self.head[4] != 2 or self.head[5] != 1:
+                raise ValueError("Not a 64 bits little endian ELF file")
+            if struct.unpack_from("<H", self.head, 18)[0] != EM_X86_64:
+                raise ValueError("Unsupported architecture")
+
+            program_offset, = struct.unpack_from("<Q", self.head, 32)
+            entry_size, entries = struct.unpack_from("<HH", self.head, 54)
+            if not entries:
+                raise ValueError("The core has no program headers")
+            self.program_headers = [None] * entries
+            self.head_size = program_offset + entry_size * entries
+            self.__check_head_size__()
+            return
+
+        if self.notes is None:
+            program_offset, = struct.unpack_from("<Q", self.head, 32)
+            entry_size, = struct.unpack_from("<H", self.head, 54)
+            self.program_headers = [
+                struct.unpack_from("<IIQQQQQQ", self.head, program_offset + index * entry_size)
+                for index in range(len(self.program_headers))
+            ]
+            notes = [header for header in self.program_headers if header[0] == PT_NOTE]
+            if not notes:
+                raise ValueError("The core has no notes")
+            self.notes = notes[0]
+            self.head_size = self.notes[2] + self.notes[5]
+            self.__check_head_size__()
+            return
+
+        notes_end = self.notes[2] + self.notes[5]
+        self.__parse_notes__(self.notes[2], notes_end)
+        self.head_size = None
+
+        if self.registers is None:
+            raise ValueError("The core has no thread status")
+
+        stack_pointer = self.registers[RSP]
+        for kind, _, offset, address, _, file_size, _, _ in self.program_headers:
+            if kind == PT_LOAD and address <= stack_pointer < address + file_size:
+                begin = offset + stack_pointer - address
+                if begin < notes_end:
+                    raise ValueError("The stack is before the notes")
+                self.stack_range = (begin, min(offset + file_size, begin + STACK_SIZE))
+                return
+
+    def __check_head_size__(self) -> None:
+        """
+        :raise ValueError if the headers are too big to be kept in memory
+        """
+        if self.head_size > MAXIMUM_HEAD_SIZE:
+            raise ValueError("The core headers are too big")
+
+    def __parse_notes__(self, offset: int, end: int) -> None:
+        """
+        Reads the status of the crashing thread, which comes first, and the mapped files
+
+        :param offset: where the notes start
+        :param end: where the notes end
+        """
+        def align(value):
+            return (value + 3) & ~3
+
+        while offset + 12 <= end:
+            name_size, description_size, kind = struct.unpack_from("<III", self.head, offset)
+            description = offset + 12 + align(name_size)
+            offset = description + align(description_size)
+
+            if kind == NT_PRSTATUS and self.registers is None:
+                self.signal, = struct.unpack_from("<h", self.head, description + 12)
+                self.registers = struct.unpack_from("<27Q", self.head, description + PRSTATUS_REGISTERS)
+
+            elif kind == NT_FILE:
+                count, page_size = struct.unpack_from("<QQ", self.head, description)
+                names = bytes(
+                    self.head[description + 16 + 24 * count:description + description_size]
+                ).split(b"\0")
+                for index in range(count):
+                    start, stop, page = struct.unpack_from("<QQQ", self.head, description + 16 + 24 * index)
+                    self.mappings.append((start, stop, page * page_size, os.path.basename(names[index].decode())))
+
+    def symbolize(self, address: int) -> str:
+        """
+        :param address: an address in the crashed program
+        :return: the address as file+offset if it is in a mapped file, ? otherwise
+        """
+        for start, stop, file_offset, name in self.mappings:
+            if start <= address < stop:
+                return "{}+{:#x}".format(name, address - start + file_offset)
+        return "?"
+
+    def executable(self, address: int) -> bool:
+        """
+        :param address: an address in the crashed program
+        :return: whether the address is in an executable segment of a mapped file
+        """
+        return any(
+            kind == PT_LOAD and flags & PF_X and start <= address < start + size
+            for kind, flags, _, start, _, _, size, _ in self.program_headers
+        ) and self.symbolize(address) != "?"
+
+    def frames(self) -> list:
+        """
+        :return: the program counter and the return addresses on the stack of the crashing thread, innermost first
+        """
+        stack_pointer = self.registers[RSP]
+
+        def read(address):
+            index = address - stack_pointer
+            if 0 <= index and index + 8 <= len(self.stack):
+                return struct.unpack_from("<Q", self.stack, index)[0]
+            return None
+
+        frames = [self.registers[RIP]]
+        frame = self.registers[RBP]
+        while len(frames) < MAXIMUM_FRAMES:
+            previous, return_address = read(frame), read(frame + 8)
+            if previous is None or return_address is None or not self.executable(return_address):
+                break
+            frames.append(return_address)
+            if previous <= frame:
+                break
+            frame = previous
+
+        if len(frames) < 3:
+            frames = [self.registers[RIP]]
+            for index in range(0, min(len(self.stack), 64 * 1024) - 7, 8):
+                value = struct.unpack_from("<Q", self.stack, index)[0]
+                if self.executable(value):
+                    frames.append(value)
+                    if len(frames) == MAXIMUM_FRAMES:
+                        break
+
+        return frames
+
+    def hexdigest(self) -> str:
+        """
+        :return: the hash of the crash, from the signal and the stack, None if the core could not be parsed
+        """
+        if self.broken or self.registers is None or not self.stack:
+            return None
+
+        description = [str(self.signal)] + [self.symbolize(frame) for frame in self.frames()]
+        return hashlib.sha256("\n".join(description).encode()).hexdigest()[:16]
+
+
+def metadata_path(core: str) -> str:
+    """
+    :param core: the path of a compressed core
+    :return: the path of the description of the crash
+    """
+    return core[:-len(".gz")] + ".json" if core.endswith(".gz") else core + ".json"
+
+
+def store_core(stream, destination: str, level: int=1, metadata: dict=None, owner: int=None) -> dict:
+    """
+    Compresses a core from a stream to a file, hashing its stack on the way. The description of the crash is written
+    next to it first, and the core then appears at once, complete
+
+    :param stream: the binary stream of the core
+    :param destination: the path of the compressed core
+    :param level: the gzip compression level
+    :param metadata: information on the crash to store in its description
+    :param owner: the user to give the files to, the current one by default
+    :return: the description of the crash, with the size of the core and the hash of its stack
+    """
+    hasher = CoreStackHasher()
+    size = 0
+    descriptor, staging = tempfile.mkstemp(prefix=".core-", dir=os.path.dirname(destination))
+    try:
+        with os.fdopen(descriptor, "wb") as _file_, \
+                gzip.GzipFile(fileobj=_file_, mode="wb", compresslevel=level) as core:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                hasher.feed(chunk)
+                core.write(chunk)
+                size += len(chunk)
+
+        metadata = dict(metadata or {}, size=size, stack_hash=hasher.hexdigest())
+        with open(metadata_path(destination), "w") as _file_:
+            json.dump(metadata, _file_)
+
+        for path in [staging, metadata_path(destination)]:
+            os.chmod(path, 0o666)
+            if owner is not None:
+                os.chown(path, owner, -1)
+
+        os.rename(staging, destination)
+    except BaseException:
+        os.remove(staging)
+        raise
+
+    return metadata
+
+
+def main(arguments: list) -> None:
+    """
+    Stores a core given by the kernel on the standard input
+
+    :param arguments: the directory in which to store cores, the compression level, the name of the core as expanded
+                      by the kernel, the signal, pid and uid of the crashed process
+    """
+    directory, level, name, signal, pid, uid = arguments
+    os.makedirs(directory, exist_ok=True)
+    store_core(
+        sys.stdin.buffer, os.path.join(directory, name + ".gz"), int(level),
+        metadata={"signal": int(signal), "pid": int(pid), "time": time.time()}, owner=int(uid)
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
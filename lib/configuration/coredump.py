@@ -8,6 +8,7 @@ A module to handle the update for handling coredumps system wide
 import logging
 import os
 import subprocess
+import sys
 
 from lib.helper import launch_and_log_as_root
 from lib.parsers.configuration import get_global_conf
@@ -28,12 +29,29 @@ def create_coredump_directory() -> None:
     os.chmod(core_dump_location, 0o777)
 
 
+def core_pattern() -> str:
+    """
+    Gets the kernel.core_pattern to use. With [trigger] core_dump_handler, cores are piped to
+    lib/configuration/core_handler.py, which compresses them and hashes their stack. They are otherwise written as is
+    :return: the core pattern
+    """
+    conf = get_global_conf()
+    core_dump_location = conf.get("trigger", "core_dump_location")
+    if not conf.getboolean("trigger", "core_dump_handler"):
+        return os.path.join(core_dump_location, conf.get("trigger", "core_dump_pattern"))
+
+    return "|{python} {handler} {location} {level} {pattern} %s %p %u".format(
+        python=sys.executable, handler=os.path.join(os.path.dirname(os.path.abspath(__file__)), "core_handler.py"),
+        location=core_dump_location, level=conf.getint("trigger", "core_dump_compression"),
+        pattern=conf.get("trigger", "core_dump_pattern")
+    )
+
+
 def change_coredump_pattern() -> None:
     """
     Changes the coredump pattern system wide
     """
-    core_dump_location = get_global_conf().get("trigger", "core_dump_location")
-    core_dump = os.path.join(core_dump_location, get_global_conf().get("trigger", "core_dump_pattern"))
+    core_dump = core_pattern()
 
     last = False
     with open("/etc/sysctl.conf") as _file:
@@ -56,12 +74,15 @@ def change_coredump_pattern() -> None:
         raise
 
 
-def change_coredump_filter() -> None:
+def change_coredump_filter(coredump_filter: str=None) -> None:
     """
     Changes the coredump filter for the process and its children
+
+    :param coredump_filter: the mappings to dump, as in /proc/<pid>/coredump_filter, [trigger] core_dump_filter by
+                            default
     """
     logging.debug("Changing coredump filter")
-    coredump_filter = get_global_conf().get("trigger", "core_dump_filter")
+    coredump_filter = coredump_filter or get_global_conf().get("trigger", "core_dump_filter")
 
     with open("/proc/{}/coredump_filter".format(os.getpid()), "w") as core_file:
         core_file.write(coredump_filter)
@@ -45,7 +45,8 @@ class ProgramNotInstalledException(Exception):
     """
     Exception raised when a not installed program tries to get accessed
     """
-    def __init__(self, program_name: str):  # pylint: disable=super-init-not-called
+    def __init__(self, program_name: str):
+        super().__init__(program_name)
         self.program_name = program_name
 
     def __str__(self):
@@ -75,7 +76,8 @@ class PluginIncompatibleException(Exception):
     """
     Exception raised when a program is not compatible with a plugin
     """
-    def __init__(self, msg):  # pylint: disable=super-init-not-called
+    def __init__(self, msg):
+        super().__init__(msg)
         self.msg = msg
 
     def __str__(self):
@@ -5,6 +5,8 @@
 Helper functions to handle repetitive tasks
 """
 
+from collections import deque
+from contextlib import ExitStack, suppress
 import datetime
 import logging
 import os
@@ -16,13 +18,25 @@ from lib.parsers.configuration import get_global_conf
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 
+# the number of last lines of output of a command kept for error reports
+TAIL_LINES = 100
+MAXIMUM_LINE_LENGTH = 64 * 1024
+
+
 class Git:
     """
     A class for managing git commands from python
+
+    :param destination_folder: where the repository is
+    :param upstream: the repository from which to get commits
+    :param protocol: the protocol to use for github repositories, [install] git_protocol by default
+    :param reference: a local clone of the same repository whose objects can be reused instead of downloading them
+    :param kwargs: additional arguments to pass to launch_and_log when fetching
     """
-    def __init__(self, destination_folder, upstream, protocol=None, **kwargs):
+    def __init__(self, destination_folder, upstream, protocol=None, reference=None, **kwargs):
         self.destination_folder = destination_folder
         self.upstream = upstream
+        self.reference = reference
         self.kwargs = kwargs
         self.protocol = protocol or get_global_conf().get("install", "git_protocol")
 
@@ -45,6 +59,15 @@ class Git:
         launch_and_log(["git", "init"], cwd=self.destination_folder)
         launch_and_log(["git", "remote", "add", "origin", self.upstream], cwd=self.destination_folder)
 
+        if self.reference is not None:
+            # this is what git clone --reference does
+            alternates = os.path.join(self.destination_folder, ".git", "objects", "info", "alternates")
+            for objects in [os.path.join(self.reference, ".git", "objects"), os.path.join(self.reference, "objects")]:
+                if os.path.isdir(objects):
+                    with open(alternates, "w") as _file_:
+                        _file_.write(os.path.abspath(objects) + "\n")
+                    break
+
     def update(self) -> str:
         """
         Updates the git repository
@@ -53,12 +76,12 @@ class Git:
         :return the output of git update
         """
         try:
-            output = launch_and_log(["git", "pull"], cwd=self.destination_folder, **self.kwargs)
+            output = launch_and_log(["git", "pull"], cwd=self.destination_folder, tail=None, **self.kwargs)
         except subprocess.CalledProcessError as exc:
             output = exc.output.decode()
             if exc.returncode == 128:
                 logging.warning("Pulling git repo failed, retrying once")
-                return launch_and_log(["git", "pull"], **self.kwargs)
+                return launch_and_log(["git", "pull"], tail=None, **self.kwargs)
 
         return output
 
@@ -72,7 +95,7 @@ class Git:
         """
         self.update()
         try:
-            output = launch_and_log(["git", "checkout", commit], cwd=self.destination_folder)
+            output = launch_and_log(["git", "checkout", commit], cwd=self.destination_folder, tail=None)
         except subprocess.CalledProcessError:
             logging.warning("Could not checkout to commit %(commit)s.", dict(commit=commit))
             raise
@@ -80,6 +103,39 @@ class Git:
         else:
             return output
 
+    def fetch(self, commit: str, depth: int) -> bool:
+        """
+        Fetches only the given commit or branch, with at most depth commits of history, and checks it out
+
+        :param commit: the branch or commit to check out
+        :param depth: the number of commits of history to fetch
+        :raise subprocess.CalledProcessError on error
+        :return: True if a new commit was checked out
+        """
+        previous = None
+        with suppress(subprocess.CalledProcessError):
+            previous = self.revision()
+
+        launch_and_log(
+            ["git", "fetch", "--depth", str(depth), "origin", commit], cwd=self.destination_folder, **self.kwargs
+        )
+        launch_and_log(["git", "checkout", "--force", "FETCH_HEAD"], cwd=self.destination_folder)
+        return self.revision() != previous
+
+    def revision(self) -> str:
+        """
+        Gets the commit currently checked out, marked as dirty if the working tree has local changes
+
+        :raise subprocess.CalledProcessError on error
+        :return: the commit hash
+        """
+        revision = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=self.destination_folder, stderr=subprocess.DEVNULL
+        ).decode().strip()
+        if subprocess.check_output(["git", "status", "--porcelain"], cwd=self.destination_folder).strip():
+            revision += "-dirty"
+        return revision
+
 
 class Svn:
     """
@@ -123,39 +179,62 @@ class Svn:
             logging.warning("Could not checkout to commit %(commit)s", dict(commit=commit))
             raise
 
+    def revision(self) -> str:
+        """
+        Gets the revision currently checked out, as given by svnversion
+
+        :raise subprocess.CalledProcessError on error
+        :return: the revision, with an M suffix if the working copy has local changes
+        """
+        return subprocess.check_output(["svnversion"], cwd=self.destination_folder).decode().strip()
 
-def launch_and_log(cmd: list, cwd: str=os.getcwd(), env: dict=os.environ.copy(), error_msg: str=None, **kwargs) -> str:
+
+def launch_and_log(cmd: list, cwd: str=os.getcwd(), env: dict=os.environ.copy(), error_msg: str=None,
+                   log_file: str=None, tail: int=TAIL_LINES, **kwargs) -> str:
     """
-    Launches a process and logs its output, before raising any error it might have encountered
+    Launches a process and logs its output line by line as it is produced, before raising any error it might have
+    encountered. Only the last lines of the output are kept in memory unless tail is None, the whole output can be
+    written to a file. Callers parsing the output need to pass tail=None
 
     :param cmd: the command to launch
     :param cwd: the directory in which the process takes place. Defaults to the current working directory
     :param env: environment variables to use when running the program
     :param error_msg: an error message to add to the error in case of error
-    :param kwargs: additional arguments to pass to check_output
-    :raise subprocess.CalledProcessError on error
-    :return output of given program
+    :param log_file: a file to which to append the whole output, None not to keep it
+    :param tail: the number of last lines of output to keep, None to keep them all
+    :param kwargs: additional arguments to pass to subprocess.Popen
+    :raise subprocess.CalledProcessError on error, with the last lines of output as output
+    :return the last lines of output of given program, or its whole output if tail is None
     """
-    output = None
-
-    try:
-        if kwargs.get("shell", False):
-            logging.debug(" ".join(cmd))
-        else:
-            logging.debug(cmd)  # With shell=True, given input is a string
-
-        output = subprocess.check_output(cmd, cwd=cwd, env=env, stderr=subprocess.STDOUT, **kwargs)
+    logging.debug(cmd)
+    lines = deque(maxlen=tail)
+
+    with ExitStack() as stack:
+        log = None
+        if log_file is not None:
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            log = stack.enter_context(open(log_file, "ab"))
+            log.write("$ {}\n".format(cmd if isinstance(cmd, str) else " ".join(cmd)).encode())
+
+        process = stack.enter_context(
+            subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs)
+        )
+        # lines are read with a bounded length, longer ones being split
+        for chunk in iter(lambda: process.stdout.readline(MAXIMUM_LINE_LENGTH), b""):
+            if log is not None:
+                log.write(chunk)
+            line = chunk.decode(errors="replace").rstrip("\r\n")
+            logging.debug(line)
+            lines.append(line)
 
-    except subprocess.CalledProcessError as exc:
-        output = exc.output
+    output = "\n".join(lines)
+    if process.returncode:
+        exc = subprocess.CalledProcessError(process.returncode, cmd, output=output.encode())
         exc.error_msg = error_msg
+        exc.log_file = log_file
         raise exc
-    else:
-        return output.decode()
 
-    finally:
-        for line in output.decode().split("\n"):
-            logging.debug(line)
+    return output
 
 
 def launch_and_log_as_root(cmd, **kwargs) -> None:
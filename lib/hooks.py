@@ -7,11 +7,13 @@ Interface between the plugins and the framework. This is the only calls the fram
 
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
+from concurrent.futures import ThreadPoolExecutor
 import importlib
 
 from lib import get_subclasses
 from lib.parsers.configuration import get_global_conf
 from lib.plugins import BasePlugin, MainPlugin, MetaPlugin
+from lib.registry import get_registry, resolve
 
 
 JANITORS = list()
@@ -36,21 +38,33 @@ def configure(force: bool) -> None:
 
 def register_for_install(**kwargs) -> None:
     """
-    Allows each plugin to register to be called during the installation phases
+    Allows each plugin to register to be called during the installation phases. Plugins are registered from the
+    manifest of the registry, without being imported
     :param kwargs: keyword arguments to pass to the plugins
     """
-    for plugin in get_subclasses(BasePlugin):
-        plugin.register_for_install(**kwargs)
+    get_registry().register("register_for_install", **kwargs)
 
 
 def create_executables(*args, **kwargs) -> None:
     """
-    Allows each enabled plugin to create a special executable if needed
+    Allows each enabled plugin to create a special executable if needed. As each executable is built in its own tree,
+    up to [install] variant_jobs of them are built in parallel, their makes taking job slots from the jobserver
     :param args: arguments to pass to plugins
     :param kwargs: keyword arguments to pass to plugins
     """
-    for plugin in get_subclasses(MainPlugin):
-        plugin().create_executable(*args, **kwargs)
+    plugins = get_subclasses(MainPlugin)
+    jobs = get_global_conf().getint("install", "variant_jobs")
+    installer = kwargs.get("installer", None)
+
+    # libraries of all variants are installed in the same place, they have to be built one after the other
+    if jobs <= 1 or installer is None or installer.conf.getlist("libraries"):
+        for plugin in plugins:
+            plugin().create_executable(*args, **kwargs)
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for future in [executor.submit(plugin().create_executable, *args, **kwargs) for plugin in plugins]:
+            future.result()
 
 
 def post_install_run(analysis_plugins=None, **kwargs) -> None:
@@ -81,11 +95,20 @@ def post_install_clean(analysis_plugins=None, **kwargs) -> None:
 
 def register_for_trigger(**kwargs) -> None:
     """
-    Allows each plugin to register to be called during the trigger phases
+    Allows each plugin to register to be called during the trigger phases. Plugins are registered from the manifest of
+    the registry, without being imported
     :param kwargs: keyword arguments to pass to the plugins
     """
-    for plugin in get_subclasses(BasePlugin):
-        plugin.register_for_trigger(**kwargs)
+    get_registry().register("register_for_trigger", **kwargs)
+
+
+def resolve_plugins(arguments: dict) -> dict:
+    """
+    Loads the plugins selected in the parsed arguments, and only them
+    :param arguments: the parsed arguments, in which plugins are references
+    :return: the arguments, with the plugins they reference
+    """
+    return {key: resolve(value) for key, value in arguments.items()}
 
 
 def register_for_cleaning(function: callable) -> None:
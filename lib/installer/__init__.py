@@ -7,18 +7,22 @@ A module containing installers from various sources
 
 from abc import ABCMeta, abstractmethod
 from configparser import SectionProxy
-from contextlib import suppress
+from contextlib import contextmanager, suppress
 import logging
 import os
 import re
 import shutil
-import tarfile
+import subprocess
+import threading
+import time
 
-import requests
 
 from lib import constants, helper
+from lib.installer.artifacts import ArtifactStore
+from lib.installer.cache import BuildCache, hash_file
 from lib.installer.context_managers import FileLock
 from lib.installer.dependency_installer import DependenciesInstaller
+from lib.installer.extract import copy_tree, unpack
 from lib.parsers.configuration import get_global_conf, get_compiler_conf
 
 
@@ -44,6 +48,8 @@ class Installer:
         self.patches_path = os.path.join(self.program_path, "patches")
         self.force_installation = force_installation
         self.env = self.prepare_env()
+        self.jobserver = None
+        self.__job_slot__ = threading.Lock()
 
     @property
     @abstractmethod
@@ -59,6 +65,23 @@ class Installer:
         The absolute path to where the sources are stored
         """
 
+    @property
+    def variants_dir(self) -> str:
+        """
+        The absolute path to where the build trees of plugin-specific executables are kept
+        """
+        return os.path.join(
+            get_global_conf().getdir("install", "build_directory"), "variants", self.conf["display_name"]
+        )
+
+    @property
+    def pristine_dir(self) -> str:
+        """
+        The absolute path to a copy of the working directory taken before configuration, from which the build trees of
+        plugin-specific executables are created
+        """
+        return os.path.join(self.variants_dir, ".pristine")
+
     @abstractmethod
     def download_sources(self) -> bool:
         """
@@ -73,6 +96,14 @@ class Installer:
         Should prepare the sources and place them in self.working_dir
         """
 
+    def source_fingerprint(self) -> str:  # pylint: disable=no-self-use
+        """
+        Identifies the version of the sources, to find previous builds in the build cache
+
+        :return: a string changing whenever the sources change, or None if builds of these sources cannot be cached
+        """
+        return None
+
     @staticmethod
     def factory(conf: SectionProxy, force_installation: bool):
         """
@@ -132,6 +163,28 @@ class Installer:
             env["CXX"] = "wllvm++"
         return env
 
+    @property
+    def logs_dir(self) -> str:
+        """
+        The directory in which the output of each build step is kept, None if [install] build_logs is empty
+        """
+        directory = get_global_conf().get("install", "build_logs", fallback="")
+        return os.path.join(os.path.expanduser(directory), self.conf["name"]) if directory else None
+
+    def step_log(self, step: str, directory: str=None) -> str:
+        """
+        :param step: the name of a build step
+        :param directory: the directory in which the step runs. Steps run in the build tree of a plugin-specific
+                          executable have their own log, named after the tree
+        :return: the file in which to keep the output of the step, None if it is not kept
+        """
+        if self.logs_dir is None:
+            return None
+
+        if directory is not None and os.path.dirname(directory) == self.variants_dir:
+            step = "{}-{}".format(step, os.path.basename(directory))
+        return os.path.join(self.logs_dir, step + ".log")
+
     def patch(self, patches: list, directory: str, reverse: bool=False, patches_path=None) -> None:
         """
         Applies different patches to the sources or the installed files
@@ -149,21 +202,28 @@ class Installer:
             if reverse:
                 cmd.insert(2, "-R")
 
-            helper.launch_and_log(cmd, cwd=directory, error_msg="A patch failed to apply")
+            helper.launch_and_log(
+                cmd, cwd=directory, error_msg="A patch failed to apply", log_file=self.step_log("patch", directory)
+            )
 
-    def configure(self) -> None:
+    def configure(self, directory: str=None) -> None:
         """
         Configures the sources
+
+        :param directory: the build tree to configure, the working directory by default. Programs built in their sources
+                          are configured from the copy of the sources in that tree
         """
+        build_dir = directory or self.working_dir
+        sources_dir = build_dir if self.sources_dir == self.working_dir else self.sources_dir
         if self.conf["configure"] == "configure":
             cmd = [
-                os.path.join(self.sources_dir, "configure"),
+                os.path.join(sources_dir, "configure"),
                 "--prefix={}".format(self.install_dir)
             ]
         elif self.conf["configure"] == "cmake":
             cmd = [
                 "cmake",
-                self.sources_dir
+                sources_dir
             ]
         else:
             logging.verbose("{} does not need configuration".format(self.conf["display_name"]))
@@ -172,23 +232,74 @@ class Installer:
         cmd += self.conf.getlist("configure_args", [])
         logging.info("Configuring %(name)s", dict(name=self.conf["display_name"]))
 
-        self.env["WLLVM_CONFIGURE_ONLY"] = "1"
-        helper.launch_and_log(cmd, cwd=self.working_dir, env=self.env, error_msg="Configuration failed")
-        del self.env["WLLVM_CONFIGURE_ONLY"]
+        # plugin-specific executables are configured concurrently, the environment of the installer is not modified
+        env = self.env.copy()
+        env["WLLVM_CONFIGURE_ONLY"] = "1"
+        helper.launch_and_log(
+            cmd, cwd=build_dir, env=env, error_msg="Configuration failed",
+            log_file=self.step_log("configure", directory)
+        )
 
-    def make(self) -> None:
+    @contextmanager
+    def job_slot(self) -> None:
         """
-        runs 'make'
+        Holds a job slot while a make runs, when a jobserver is set. The first make takes the token the scheduler holds
+        for the installation, the makes of plugin-specific executables running at the same time take theirs from the
+        jobserver. Both are polled, for a make waiting on the jobserver to use the token of the installation as soon as
+        it is free
+        """
+        if self.jobserver is None:
+            yield
+            return
+
+        while True:
+            if self.__job_slot__.acquire(blocking=False):
+                release = self.__job_slot__.release
+                break
+            if self.jobserver.try_acquire():
+                release = self.jobserver.release
+                break
+            time.sleep(0.1)
+
+        try:
+            yield
+        finally:
+            release()
+
+    def make(self, directory: str=None) -> None:
+        """
+        runs 'make'. When a jobserver is set, make takes its job slots from it instead of using [install] make_args -j,
+        and holds one while it runs
+
+        :param directory: the build tree in which to run, the working directory by default
         """
         logging.info("Compiling %(name)s", dict(name=self.conf["display_name"]))
         cmd = ["make"] + get_global_conf().getlist("install", "make_args")
         if self.conf.getlist("make_args", None):
             cmd += self.conf.getlist("make_args")
-        helper.launch_and_log(cmd, cwd=self.working_dir, env=self.env, error_msg="Compilation failed")
 
-    def install(self) -> None:
+        if self.jobserver is None:
+            helper.launch_and_log(
+                cmd, cwd=directory or self.working_dir, env=self.env, error_msg="Compilation failed",
+                log_file=self.step_log("make", directory)
+            )
+            return
+
+        # a -j on the command line would make make ignore the jobserver
+        cmd = [arg for arg in cmd if not arg.startswith("-j") and not arg.startswith("--jobs")]
+        env = self.env.copy()
+        env["MAKEFLAGS"] = " ".join(filter(None, [env.get("MAKEFLAGS", ""), self.jobserver.makeflags]))
+        with self.job_slot():
+            helper.launch_and_log(
+                cmd, cwd=directory or self.working_dir, env=env, error_msg="Compilation failed",
+                pass_fds=self.jobserver.fds, log_file=self.step_log("make", directory)
+            )
+
+    def install(self, directory: str=None) -> None:
         """
         Runs 'make install'
+
+        :param directory: the build tree from which to install, the working directory by default
         """
         logging.info("Installing %(name)s", dict(name=self.conf["display_name"]))
         if self.conf.get("install", None) == "copy":
@@ -196,7 +307,8 @@ class Installer:
 
         else:
             helper.launch_and_log(
-                ["make", "install"], cwd=self.working_dir, env=self.env, error_msg="Installation failed"
+                ["make", "install"], cwd=directory or self.working_dir, env=self.env, error_msg="Installation failed",
+                log_file=self.step_log("install", directory)
             )
 
     def extract_bitcode(self) -> None:
@@ -207,7 +319,9 @@ class Installer:
         source = os.path.join(self.working_dir, self.conf["bitcode_file"].lstrip("/"))
         cmd = "{}/wllvm/extract-bc {}".format(get_global_conf().getdir("utilities", "install_directory"), source)
 
-        helper.launch_and_log(cmd.split(" "), env=self.env, error_msg="Bitcode extraction failed")
+        helper.launch_and_log(
+            cmd.split(" "), env=self.env, error_msg="Bitcode extraction failed", log_file=self.step_log("bitcode")
+        )
 
         shutil.copy(source + ".bc", self.install_dir + "/bin/")
 
@@ -229,8 +343,9 @@ class Installer:
         """
         The main program, handles everything
         """
-        with suppress(FileNotFoundError):
-            shutil.rmtree(self.working_dir)
+        for directory in filter(None, [self.working_dir, self.variants_dir, self.logs_dir]):
+            with suppress(FileNotFoundError):
+                shutil.rmtree(directory)
 
         with FileLock(os.path.join("/tmp/", "." + self.conf.get("name") + ".build")):
             if not self.download_sources():
@@ -248,11 +363,18 @@ class Installer:
                 )
                 shutil.rmtree(self.install_dir)
 
+        build_cache = BuildCache(self) if BuildCache.enabled() else None
+        if build_cache is not None and build_cache.restore():
+            return
+
         logging.info("Treating " + self.conf["display_name"])
         self.prepare_sources()
 
         self.patch(self.conf.getlist("patches_pre_config", []), self.working_dir)
 
+        # plugin-specific executables are configured in copies of the unconfigured tree, nothing refers to its path yet
+        copy_tree(self.working_dir, self.pristine_dir)
+
         self.configure()
 
         self.patch(self.conf.getlist("patches_post_config", []), self.working_dir)
@@ -274,6 +396,9 @@ class Installer:
         if os.path.exists(os.path.join(self.patches_path, self.conf["display_name"] + ".patch")):
             self.patch([self.conf["display_name"] + ".patch"], self.working_dir, True)
 
+        if build_cache is not None:
+            build_cache.store()
+
         logging.info("finished installing %(name)s", dict(name=self.conf["display_name"]))
 
 
@@ -298,8 +423,25 @@ class GitInstaller(Installer):
             os.path.join(get_global_conf().get("install", "source_directory"), self.conf["name"]))
 
     def download_sources(self) -> bool:
-        """ clones the git repository or updates it if it is already there """
-        git = helper.Git(self.sources_dir, self.conf["git_repo"])
+        """
+        clones the git repository or updates it if it is already there. Only the commit needed is fetched, unless
+        [install] git_depth is 0, and the repository is taken from a local mirror when there is one
+        """
+        store = ArtifactStore()
+        reference = os.path.join(
+            get_global_conf().getdir("install", "git_reference_directory"), os.path.basename(self.conf["git_repo"])
+        )
+        git = helper.Git(
+            self.sources_dir, store.repository(self.conf["git_repo"]),
+            reference=reference if os.path.isdir(reference) else None
+        )
+
+        depth = get_global_conf().getint("install", "git_depth")
+        if depth:
+            if not git.fetch(self.conf.get("commit", "master"), depth):
+                return 1
+            return
+
         output = git.update()
 
         if "Already up-to-date" in output or "not currently on a branch" in output:
@@ -311,6 +453,14 @@ class GitInstaller(Installer):
         if "Your branch is up-to-date" in output:
             return 1
 
+    def source_fingerprint(self) -> str:
+        """
+        The sources are identified by the commit checked out
+        """
+        with suppress(subprocess.CalledProcessError, FileNotFoundError):
+            return "git:" + helper.Git(self.sources_dir, self.conf["git_repo"]).revision()
+        return None
+
     def prepare_sources(self):
         """
         clones the git repo or updates it if it is already there
@@ -341,6 +491,14 @@ class SVNInstaller(GitInstaller):
         if not os.path.exists(self.working_dir):
             os.makedirs(self.working_dir)
 
+    def source_fingerprint(self) -> str:
+        """
+        The sources are identified by the revision checked out
+        """
+        with suppress(subprocess.CalledProcessError, FileNotFoundError):
+            return "svn:" + helper.Svn(self.sources_dir, self.conf["svn_repo"]).revision()
+        return None
+
 
 class SourceInstaller(Installer):
     """
@@ -382,13 +540,19 @@ class SourceInstaller(Installer):
         Extracts the file from self.src_path+self.conf["src_name"] to self.extract_dir
         """
         logging.verbose("unpacking file in " + self.extract_dir)
-        tar = tarfile.open(self.source_storage_path)
-        tar.extractall(self.extract_dir)
-        tar.close()
+        unpack(self.source_storage_path, self.extract_dir)
 
     def download_sources(self) -> bool:
         return True
 
+    def source_fingerprint(self) -> str:
+        """
+        The sources are identified by the hash of their archive
+        """
+        with suppress(FileNotFoundError):
+            return "archive:" + hash_file(self.source_storage_path).hexdigest()
+        return None
+
 
 class DownloadableSourceInstaller(SourceInstaller):
     """
@@ -405,28 +569,29 @@ class DownloadableSourceInstaller(SourceInstaller):
         return os.path.join(get_global_conf().get("install", "source_directory"), self.conf["name"], self.source_name)
 
     def download_sources(self) -> bool:
+        """
+        Gets the archive from the artifact store, which downloads it from the mirrors or its url if needed. The
+        archive is verified against the sha256 option of the program, when given
+        """
         if os.path.exists(self.source_storage_path):
             return True
 
-        logging.verbose("Downloading %(file)s", dict(file=self.conf["url"]))
         logging.getLogger("urllib3").setLevel(logging.WARNING)
         logging.getLogger("requests").setLevel(logging.WARNING)
 
-        response = requests.get(self.conf["url"], stream=True)
-        if response.status_code != requests.codes.ok:
-            raise response.raise_for_status()
-
-        os.makedirs(os.path.dirname(self.source_storage_path), exist_ok=True)
-        with open(self.source_storage_path, "wb") as _file_:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:  # this is to filter out keepalive chunks
-                    _file_.write(chunk)
+        ArtifactStore().fetch(self.conf["url"], self.source_storage_path, self.conf.get("sha256", None))
 
 
 class LicensedSourceInstaller(SourceInstaller):
     """
     This installer handles cases when a license has to be accepted before the sources are downloaded
     """
+    def source_fingerprint(self) -> str:
+        """
+        The archive is only known once the license is accepted, these builds are not cached
+        """
+        return None
+
     def prepare_sources(self) -> None:
         source_directory = os.path.join(
             get_global_conf().getdir("install", "source_directory"),
@@ -453,7 +618,5 @@ class LicensedSourceInstaller(SourceInstaller):
                 print("Could not find the archive, please ensures that the name matches", self.conf.get("source"))
                 return self.prepare_sources()
 
-        tar = tarfile.open(os.path.join(source_directory, archive_found[0]))
-        tar.extractall(self.extract_dir)
-        tar.close()
+        unpack(os.path.join(source_directory, archive_found[0]), self.extract_dir)
         self.conf["source"] = archive_found[0]
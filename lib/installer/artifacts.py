@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+A content addressed store of downloaded sources. Archives are fetched once, from local or remote mirrors before their
+original location, verified against their checksum and shared by every installation needing them
+"""
+
+from contextlib import suppress
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from urllib.parse import urlparse
+
+from lib.exceptions import InstallationErrorException
+from lib.installer.context_managers import FileLock
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class ArtifactStore:
+    """
+    Stores artifacts under their sha256 in <directory>/sha256/ and keeps a link to each of them by name in
+    <directory>/by-name/. The first checksum seen for a name is kept, and any later copy of the same name has to match
+    it. A store can be copied from another machine to install programs without network access
+
+    :param directory: the directory of the store, [install] artifact_store by default
+    :param mirrors: the mirror roots to try before the original location, [install] mirrors by default
+    """
+    def __init__(self, directory: str=None, mirrors: list=None):
+        self.directory = directory or get_global_conf().getdir("install", "artifact_store")
+        self.mirrors = mirrors if mirrors is not None else get_global_conf().getlist("install", "mirrors", [])
+        self.chunk_size = get_global_conf().getint("install", "download_chunk_size")
+
+    def blob(self, checksum: str) -> str:
+        """
+        :param checksum: the sha256 of an artifact
+        :return: the path where the artifact with this checksum is stored
+        """
+        return os.path.join(self.directory, "sha256", checksum)
+
+    def link(self, name: str) -> str:
+        """
+        :param name: the file name of an artifact
+        :return: the path of the link to the artifact with this name
+        """
+        return os.path.join(self.directory, "by-name", name)
+
+    def known_checksum(self, name: str) -> str:
+        """
+        :param name: the file name of an artifact
+        :return: the checksum of the stored artifact with this name, None if there is none
+        """
+        if os.path.islink(self.link(name)):
+            return os.path.basename(os.readlink(self.link(name)))
+        return None
+
+    def lookup(self, name: str, checksum: str=None) -> str:
+        """
+        Finds an artifact in the store
+
+        :param name: the file name of the artifact
+        :param checksum: the expected sha256 of the artifact, if known
+        :return: the path to the stored artifact, None if it is not in the store
+        """
+        checksum = checksum or self.known_checksum(name)
+        if checksum is not None and os.path.exists(self.blob(checksum)):
+            return self.blob(checksum)
+        return None
+
+    def sources(self, url: str) -> list:
+        """
+        :param url: the original location of an artifact
+        :return: the locations from which to try getting the artifact, in order
+        """
+        name = os.path.basename(urlparse(url).path)
+        return ["{}/{}".format(mirror.rstrip("/"), name) for mirror in self.mirrors] + [url]
+
+    def download(self, url: str, destination: str) -> str:
+        """
+        Copies the artifact at the given location to a file, hashing it on the way
+
+        :param url: where to get the artifact, a file://, http:// or https:// url
+        :param destination: the file in which to write the artifact
+        :raise OSError if the artifact cannot be fetched, requests errors being OSErrors too
+        :return: the sha256 of the artifact
+        """
+        digest = hashlib.sha256()
+        with open(destination, "wb") as _file_:
+            if urlparse(url).scheme in ("", "file"):
+                with open(urlparse(url).path, "rb") as source:
+                    for chunk in iter(lambda: source.read(self.chunk_size), b""):
+                        digest.update(chunk)
+                        _file_.write(chunk)
+            else:
+                # requests is slow to import, and only needed when something is downloaded
+                import requests
+                response = requests.get(url, stream=True)
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    digest.update(chunk)
+                    _file_.write(chunk)
+
+        return digest.hexdigest()
+
+    def add(self, url: str, checksum: str=None) -> str:
+        """
+        Gets an artifact into the store, from the first mirror having it with the right checksum
+
+        :param url: the original location of the artifact
+        :param checksum: the expected sha256 of the artifact, if known
+        :raise InstallationErrorException if no location provides the artifact
+        :return: the path to the stored artifact
+        """
+        name = os.path.basename(urlparse(url).path)
+        checksum = checksum or self.known_checksum(name)
+        for directory in ["sha256", "by-name"]:
+            os.makedirs(os.path.join(self.directory, directory), exist_ok=True)
+
+        with FileLock(os.path.join(self.directory, ".{}.lock".format(name))):
+            stored = self.lookup(name, checksum)
+            if stored is not None:
+                return stored
+
+            for source in self.sources(url):
+                logging.verbose("Downloading %(file)s", dict(file=source))
+                descriptor, staging = tempfile.mkstemp(prefix=".{}-".format(name), dir=self.directory)
+                os.close(descriptor)
+                try:
+                    found = self.download(source, staging)
+                except OSError as exc:
+                    logging.verbose("Could not get %(file)s : %(error)s", dict(file=source, error=exc))
+                    os.remove(staging)
+                    continue
+
+                if checksum is not None and found != checksum:
+                    logging.warning("%(file)s does not match its checksum, ignoring it", dict(file=source))
+                    os.remove(staging)
+                    continue
+
+                os.rename(staging, self.blob(found))
+                with suppress(FileNotFoundError):
+                    os.remove(self.link(name))
+                os.symlink(os.path.join("..", "sha256", found), self.link(name))
+                return self.blob(found)
+
+        raise InstallationErrorException("Could not get {} from any of {}".format(name, ", ".join(self.sources(url))))
+
+    def fetch(self, url: str, destination: str, checksum: str=None) -> None:
+        """
+        Puts an artifact at the given destination, getting it into the store first if needed
+
+        :param url: the original location of the artifact
+        :param destination: where to put the artifact
+        :param checksum: the expected sha256 of the artifact, if known
+        :raise InstallationErrorException if the artifact cannot be found
+        """
+        stored = self.add(url, checksum)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with suppress(FileNotFoundError):
+            os.remove(destination)
+
+        try:
+            os.link(stored, destination)
+        except OSError:
+            shutil.copy2(stored, destination)
+
+    def repository(self, upstream: str) -> str:
+        """
+        Finds a local mirror of a repository, named like the upstream repository in a file:// mirror root
+
+        :param upstream: the upstream repository
+        :return: the path to the local mirror if there is one, the upstream repository otherwise
+        """
+        name = os.path.basename(upstream.rstrip("/"))
+        for mirror in self.mirrors:
+            if urlparse(mirror).scheme not in ("", "file"):
+                continue
+
+            for candidate in [name, name[:-len(".git")] if name.endswith(".git") else name + ".git"]:
+                path = os.path.join(urlparse(mirror).path, candidate)
+                if os.path.isdir(path):
+                    return path
+
+        return upstream
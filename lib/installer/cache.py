@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+A content addressed cache of builds. A build is identified by everything that can change its result : the sources, the
+patches and additional files, the program configuration, the compiler and the build environment
+"""
+
+from contextlib import suppress
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from lib.installer.context_managers import FileLock
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+# changed whenever the content of an entry changes, for entries stored by older versions not to be restored
+FORMAT_VERSION = 2
+
+# environment variables that change the output of a build
+BUILD_ENVIRONMENT = [
+    "CC", "CXX", "CPP", "CFLAGS", "CXXFLAGS", "CPPFLAGS", "LDFLAGS", "LIBS", "LLVM_COMPILER", "PREFIX", "PATH"
+]
+
+
+def hash_file(path: str, digest: object=None) -> object:
+    """
+    Adds the content of a file to a digest
+
+    :param path: the file to hash
+    :param digest: the hashlib digest to update, a new sha256 by default
+    :return: the digest
+    """
+    digest = digest or hashlib.sha256()
+    with open(path, "rb") as _file_:
+        for chunk in iter(lambda: _file_.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest
+
+
+def hash_tree(path: str, digest: object) -> None:
+    """
+    Adds the names and contents of all files under a directory to a digest, in a deterministic order
+
+    :param path: the directory to hash
+    :param digest: the hashlib digest to update
+    """
+    for directory, directories, files in os.walk(path):
+        directories.sort()
+        for name in sorted(files):
+            digest.update(os.path.relpath(os.path.join(directory, name), path).encode())
+            hash_file(os.path.join(directory, name), digest)
+
+
+class BuildCache:
+    """
+    Stores and restores the install and build trees of an installer. The build tree and the copy of the sources taken
+    before configuration are kept too, as plugins rebuild instrumented versions of the program from them after
+    installation
+
+    :param installer: the lib.installer.Installer for which to cache builds
+    :param directory: where to store the builds, [install] build_cache_directory by default
+    """
+    def __init__(self, installer, directory: str=None):
+        self.installer = installer
+        self.directory = directory or get_global_conf().getdir("install", "build_cache_directory")
+        self.__key__ = None
+
+    @staticmethod
+    def enabled() -> bool:
+        """
+        :return: whether builds should be cached
+        """
+        return get_global_conf().getboolean("install", "build_cache")
+
+    @property
+    def key(self) -> str:
+        """
+        The hash identifying the build, or None if the sources cannot be identified
+        """
+        if self.__key__ is None:
+            fingerprint = self.installer.source_fingerprint()
+            if fingerprint is None:
+                return None
+
+            digest = hashlib.sha256("{}:{}".format(FORMAT_VERSION, fingerprint).encode())
+            for directory in [self.installer.patches_path, self.installer.additional_sources_path]:
+                hash_tree(directory, digest)
+
+            for name, value in sorted(self.installer.conf.items()):
+                digest.update("{}={}\n".format(name, value).encode())
+
+            for name in ["compiler", "llvm_bitcode", "make_args"]:
+                digest.update("{}={}\n".format(name, get_global_conf().get("install", name)).encode())
+
+            for name in BUILD_ENVIRONMENT:
+                digest.update("{}={}\n".format(name, self.installer.env.get(name)).encode())
+
+            digest.update(self.installer.working_dir.encode())
+            digest.update(self.compiler_version().encode())
+            self.__key__ = digest.hexdigest()
+
+        return self.__key__
+
+    def compiler_version(self) -> str:
+        """
+        The version of the compiler used, to invalidate builds when the compiler is updated
+        :return: the output of $CC --version
+        """
+        with suppress(OSError, subprocess.CalledProcessError):
+            return subprocess.check_output(
+                [self.installer.env.get("CC", "cc"), "--version"], env=self.installer.env, stderr=subprocess.DEVNULL
+            ).decode(errors="replace")
+        return ""
+
+    @property
+    def entry(self) -> str:
+        """
+        The directory in which the build is stored
+        """
+        return os.path.join(self.directory, self.key)
+
+    def restore(self) -> bool:
+        """
+        Copies the cached build in place of the install and build directories, if there is one
+
+        :return: True if the build was restored
+        """
+        if self.key is None or not os.path.exists(self.entry):
+            return False
+
+        logging.info("Restoring %(name)s from the build cache", dict(name=self.installer.conf["display_name"]))
+        for name, destination in [
+                ("install", self.installer.install_dir), ("build", self.installer.working_dir),
+                ("sources", self.installer.pristine_dir)
+        ]:
+            with suppress(FileNotFoundError):
+                shutil.rmtree(destination)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copytree(os.path.join(self.entry, name), destination, symlinks=True)
+
+        return True
+
+    def store(self) -> None:
+        """
+        Saves the install and build directories in the cache. The entry is built aside and moved in place, so that a
+        concurrent reader never sees a partial build
+        """
+        if self.key is None or os.path.exists(self.entry):
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        with FileLock(os.path.join(self.directory, ".{}.lock".format(self.key))):
+            if os.path.exists(self.entry):
+                return
+
+            staging = tempfile.mkdtemp(prefix=".{}-".format(self.key), dir=self.directory)
+            try:
+                shutil.copytree(self.installer.install_dir, os.path.join(staging, "install"), symlinks=True)
+                shutil.copytree(self.installer.working_dir, os.path.join(staging, "build"), symlinks=True)
+                shutil.copytree(self.installer.pristine_dir, os.path.join(staging, "sources"), symlinks=True)
+                os.rename(staging, self.entry)
+            except OSError as exc:
+                logging.warning("Could not store %(name)s in the build cache : %(error)s",
+                                dict(name=self.installer.conf["display_name"], error=exc))
+                shutil.rmtree(staging, ignore_errors=True)
@@ -7,8 +7,11 @@ Some context Managers to safely modify installers during creation of custom vers
 
 # pylint: disable=too-few-public-methods
 
+from contextlib import suppress
+import hashlib
 import os
 import fcntl
+import shutil
 
 from lib import constants
 
@@ -67,6 +70,61 @@ class ExtensionPatcherManager:
         self.installer.patch(self.patch, self.directory, reverse=True, patches_path=self.patches_path)
 
 
+class VariantBuildManager(ExtensionPatcherManager):
+    """
+    A manager keeping a separate build tree for a given extension. The tree is a copy of the sources taken before
+    configuration, patched and configured in place once, and kept across installations of the plugin, so that make
+    only rebuilds what the patch changed. Being configured where it lies, nothing in the tree refers to the working
+    directory. The tree is recreated when the patch changes, and removed when the program is rebuilt
+    """
+    STAMP = ".variant"
+
+    def __init__(self, installer, extension: str):
+        super().__init__(installer, extension, os.path.join(installer.variants_dir, extension))
+
+    @property
+    def stamp(self) -> str:
+        """
+        Identifies the patch applied on the build tree
+        """
+        digest = hashlib.sha256()
+        for patch in self.patch:
+            with open(os.path.join(self.patches_path, patch), "rb") as _file_:
+                digest.update(_file_.read())
+        return digest.hexdigest()
+
+    def is_up_to_date(self) -> bool:
+        """
+        :return: whether the build tree exists and was patched with the current patch
+        """
+        with suppress(OSError):
+            with open(os.path.join(self.directory, self.STAMP)) as _file_:
+                return _file_.read() == self.stamp
+        return False
+
+    def __enter__(self):
+        if self.is_up_to_date():
+            return self
+
+        with suppress(FileNotFoundError):
+            shutil.rmtree(self.directory)
+
+        shutil.copytree(self.installer.pristine_dir, self.directory, symlinks=True)
+        self.installer.patch(self.patch, self.directory, patches_path=self.patches_path)
+        self.installer.configure(self.directory)
+        self.installer.patch(self.installer.conf.getlist("patches_post_config", []), self.directory)
+
+        with open(os.path.join(self.directory, self.STAMP), "w") as _file_:
+            _file_.write(self.stamp)
+
+        return self
+
+    # noinspection PyUnusedLocal
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # the patch is kept, the tree being only used for this extension
+        pass
+
+
 class LastAccessManager:
     """
     A manager to touch a list of file at entrance and exit
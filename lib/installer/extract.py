@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Extraction of source archives. Archives are decompressed by parallel external tools when they are installed and
+streamed to disk member by member, and extracted trees are cached to be unpacked only once
+"""
+
+from contextlib import suppress
+import logging
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+
+from lib.installer.cache import hash_file
+from lib.installer.context_managers import FileLock
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+# decompressors to use for each compression, in order of preference
+DECOMPRESSORS = {
+    ".gz": ["pigz", "gzip"],
+    ".tgz": ["pigz", "gzip"],
+    ".bz2": ["lbzip2", "pbzip2", "bzip2"],
+    ".xz": ["pixz", "xz"],
+}
+
+
+def decompressor(archive: str) -> list:
+    """
+    Finds an external program able to decompress the archive, parallel ones being preferred
+
+    :param archive: the archive to decompress
+    :return: the command decompressing the archive to its standard output, None if there is none
+    """
+    for extension, programs in DECOMPRESSORS.items():
+        if archive.endswith(extension):
+            for program in programs:
+                if shutil.which(program) is not None:
+                    return [program, "-d", "-c", archive]
+    return None
+
+
+def extract(archive: str, destination: str) -> None:
+    """
+    Extracts a tar archive. The archive is piped from an external decompressor to tar when both are available, and is
+    otherwise read as a stream by tarfile, one member after the other, without loading it whole
+
+    :param archive: the archive to extract
+    :param destination: the directory in which to extract it
+    :raise subprocess.CalledProcessError|tarfile.TarError if the archive cannot be extracted
+    """
+    os.makedirs(destination, exist_ok=True)
+    command = decompressor(archive)
+
+    if command is not None and shutil.which("tar") is not None:
+        logging.debug("%(command)s | tar -x -f - -C %(destination)s",
+                      dict(command=" ".join(command), destination=destination))
+        decompression = subprocess.Popen(command, stdout=subprocess.PIPE)
+        try:
+            subprocess.check_call(["tar", "-x", "-f", "-", "-C", destination], stdin=decompression.stdout)
+        finally:
+            decompression.stdout.close()
+            if decompression.wait():
+                raise subprocess.CalledProcessError(decompression.returncode, command)
+        return
+
+    with tarfile.open(archive, "r|*") as tar:
+        tar.extractall(destination)
+
+
+def copy_tree(source: str, destination: str) -> None:
+    """
+    Copies the content of a directory into another one, sharing data blocks with the source when the file system
+    supports it (reflinks) and doing a plain copy otherwise. Files are never hard linked, builds modifying files in
+    place
+
+    :param source: the directory to copy
+    :param destination: the directory in which to copy it, merged with its content if it exists
+    """
+    os.makedirs(destination, exist_ok=True)
+    with suppress(OSError, subprocess.CalledProcessError):
+        subprocess.check_call(
+            ["cp", "-a", "--reflink=auto", os.path.join(source, "."), destination], stderr=subprocess.DEVNULL
+        )
+        return
+
+    shutil.copytree(source, destination, symlinks=True, dirs_exist_ok=True)
+
+
+class ExtractionCache:
+    """
+    A cache of extracted archives, keyed by the hash of the archive. Trees in the cache must never be modified : they
+    are either read in place or copied
+
+    :param directory: where to keep extracted trees, [install] extraction_cache_directory by default
+    """
+    def __init__(self, directory: str=None):
+        self.directory = directory or get_global_conf().getdir("install", "extraction_cache_directory")
+
+    @staticmethod
+    def enabled() -> bool:
+        """
+        :return: whether extracted archives should be cached
+        """
+        return get_global_conf().getboolean("install", "extraction_cache")
+
+    def tree(self, archive: str) -> str:
+        """
+        Gets the extracted tree of an archive, extracting it if it is not in the cache yet
+
+        :param archive: the archive to extract
+        :return: the directory containing the content of the archive, to be used read-only
+        """
+        entry = os.path.join(self.directory, hash_file(archive).hexdigest())
+        if os.path.exists(entry):
+            return entry
+
+        os.makedirs(self.directory, exist_ok=True)
+        with FileLock(entry + ".lock"):
+            if not os.path.exists(entry):
+                logging.verbose("Extracting %(archive)s to the extraction cache", dict(archive=archive))
+                staging = tempfile.mkdtemp(prefix=".{}-".format(os.path.basename(entry)), dir=self.directory)
+                try:
+                    extract(archive, staging)
+                    os.rename(staging, entry)
+                except Exception:
+                    shutil.rmtree(staging, ignore_errors=True)
+                    raise
+
+        return entry
+
+    def extract(self, archive: str, destination: str) -> None:
+        """
+        Puts the content of an archive in the given directory, from the cache
+
+        :param archive: the archive to extract
+        :param destination: the directory in which to extract it
+        """
+        copy_tree(self.tree(archive), destination)
+
+
+def unpack(archive: str, destination: str) -> None:
+    """
+    Extracts an archive to a directory, through the extraction cache if it is enabled
+
+    :param archive: the archive to extract
+    :param destination: the directory in which to extract it
+    """
+    if ExtractionCache.enabled():
+        ExtractionCache().extract(archive, destination)
+    else:
+        extract(archive, destination)
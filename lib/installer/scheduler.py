@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+A scheduler installing the sections of programs as a dependency graph, sharing a pool of job tokens between every
+build in the style of the GNU make jobserver
+"""
+
+import logging
+import multiprocessing
+import os
+import re
+import select
+import subprocess
+import traceback
+
+from lib import constants, hooks
+from lib.exceptions import InstallationErrorException
+from lib.trigger.scheduler import Task, TaskProcess, wait_for_reports
+from lib.helper import show_progress
+import lib.logger
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+SECTION_REFERENCE = re.compile(r"\$\{(\w+):")
+
+
+class JobServer:
+    """
+    A pool of job tokens, shared with the make processes through the GNU make jobserver protocol. Each running build
+    holds one token, which is the implicit job slot of its make, and make takes additional tokens from the pool for the
+    jobs it runs in parallel. The total number of jobs running on the machine thus never exceeds the size of the pool
+
+    :param jobs: the number of tokens
+    """
+    def __init__(self, jobs: int):
+        self.jobs = max(1, jobs)
+        self.read_fd, self.write_fd = os.pipe()
+        os.write(self.write_fd, b"+" * self.jobs)
+
+    @property
+    def fds(self) -> tuple:
+        """
+        The file descriptors child processes need to inherit to take part in the pool
+        """
+        return self.read_fd, self.write_fd
+
+    @property
+    def makeflags(self) -> str:
+        """
+        The MAKEFLAGS telling make to use the pool. Both the old and new names of the option are given, for all
+        versions of make to understand it
+        """
+        return "-j --jobserver-fds={0},{1} --jobserver-auth={0},{1}".format(self.read_fd, self.write_fd)
+
+    def acquire(self) -> None:
+        """
+        Takes a token from the pool, waiting for one to be available
+        """
+        while True:
+            try:
+                if os.read(self.read_fd, 1):
+                    return
+            except InterruptedError:
+                continue
+
+    def try_acquire(self) -> bool:
+        """
+        Takes a token if one is in the pool. A make may take it first, in which case this waits for the next one, which
+        that make gives back as soon as its job ends
+
+        :return: whether a token was taken
+        """
+        readable, _, _ = select.select([self.read_fd], [], [], 0)
+        if not readable:
+            return False
+
+        self.acquire()
+        return True
+
+    def release(self) -> None:
+        """
+        Gives a token back to the pool
+        """
+        os.write(self.write_fd, b"+")
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    # noinspection PyUnusedLocal
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def close(self) -> None:
+        """
+        Closes the pool
+        """
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+class InstallNode:  # pylint: disable=too-few-public-methods
+    """
+    A section of a program to install
+
+    :param program: the program to which the section belongs
+    :param section: the name of the section in the program's install.conf
+    :param installer: the installer for the section
+    :param dependencies: keys of the nodes that have to be installed before this one
+    """
+    def __init__(self, program: str, section: str, installer, dependencies: set):
+        self.program = program
+        self.section = section
+        self.installer = installer
+        self.dependencies = dependencies
+
+    @property
+    def key(self) -> tuple:
+        """
+        Identifies the node in the graph
+        """
+        return self.program, self.section
+
+
+def section_dependencies(program_conf, section: str) -> set:
+    """
+    Finds the sections of a program that a section needs : its libraries and every section it refers to in its
+    configuration, like ${APACHE:install_directory}
+
+    :param program_conf: the program configuration parser
+    :param section: the section for which to find dependencies
+    :return: the names of the sections needed
+    """
+    dependencies = set(program_conf[section].getlist("libraries", []))
+    for option in program_conf.options(section):
+        dependencies.update(SECTION_REFERENCE.findall(program_conf.get(section, option, raw=True)))
+
+    dependencies.discard(section)
+    return dependencies & set(program_conf.sections())
+
+
+def build_graph(programs: dict) -> list:
+    """
+    Creates the nodes to install for the given programs
+
+    :param programs: a dictionary {program name: (program configuration parser, {section: installer})}
+    :return: the list of nodes, in the order the sections were given
+    """
+    nodes = []
+    for program, (program_conf, installers) in programs.items():
+        for section, installer in installers.items():
+            nodes.append(InstallNode(
+                program, section, installer,
+                {(program, dependency) for dependency in section_dependencies(program_conf, section)}
+            ))
+    return nodes
+
+
+def install_node(node: InstallNode, jobserver: JobServer, **kwargs) -> int:
+    """
+    Installs a section and creates its plugin-specific executables. The scheduler holds a token of the jobserver for
+    the node all along, which is the implicit job slot of its make
+
+    :param node: the node to install
+    :param jobserver: the pool of job tokens
+    :param kwargs: additional parameters to pass to the plugins
+    :return: 0|constants.INSTALL_FAIL on success|failure
+    """
+    error = 0
+    node.installer.jobserver = jobserver
+    try:
+        if (not node.installer.run()) and node.installer.conf.get("executable", None):
+            hooks.create_executables(installer=node.installer)
+            hooks.post_install_run(installer=node.installer, **kwargs)
+    except InstallationErrorException as exception:
+        logging.error(exception.error_message)
+        logging.error("Won't install %(program)s", dict(program=node.installer.conf.get("name")))
+        error = constants.INSTALL_FAIL
+    except subprocess.CalledProcessError as exc:
+        error = constants.INSTALL_FAIL
+        logging.error(
+            "%(message)s : %(error)s", dict(message=getattr(exc, "error_msg", None) or "A step failed", error=exc)
+        )
+        for line in exc.output.decode(errors="replace").splitlines():
+            logging.error(line)
+        if getattr(exc, "log_file", None) is not None:
+            logging.error("The whole output is in %(log)s", dict(log=exc.log_file))
+    except Exception as exc:  # pylint: disable=broad-except
+        error = constants.INSTALL_FAIL
+        logging.error(exc)
+        logging.debug("".join(traceback.format_tb(exc.__traceback__)))
+    finally:
+        logging.verbose("Cleaning environment")
+        hooks.post_install_clean(**kwargs)
+
+    return error
+
+
+class InstallScheduler:
+    """
+    Installs nodes as soon as all their dependencies are installed and a token of the jobserver is free. Every node runs
+    in its own process, the scheduler holding its token until the process reported or exited, so that the token is
+    given back exactly once however the process ends
+
+    :param jobs: the number of job tokens available
+    """
+    def __init__(self, jobs: int):
+        self.jobs = max(1, jobs)
+
+    @staticmethod
+    def ready(nodes: list, done: set, failed: set) -> (list, list):
+        """
+        Sorts the nodes waiting to be installed
+
+        :param nodes: the nodes waiting
+        :param done: keys of the nodes successfully installed
+        :param failed: keys of the nodes that failed or were skipped
+        :return: the nodes that can start and the nodes that will never be able to
+        """
+        startable, skipped = [], []
+        for node in nodes:
+            if node.dependencies & failed:
+                skipped.append(node)
+            elif node.dependencies <= done:
+                startable.append(node)
+        return startable, skipped
+
+    def run(self, nodes: list, **kwargs) -> dict:
+        """
+        Installs all the nodes
+
+        :param nodes: the nodes to install
+        :param kwargs: additional parameters to pass to the plugins
+        :return: a dictionary {program: 0|constants.INSTALL_FAIL}
+        """
+        keys = {node.key for node in nodes}
+        for node in nodes:
+            node.dependencies &= keys
+
+        results = {node.program: 0 for node in nodes}
+        pending = list(nodes)
+        running = {}
+        done, failed = set(), set()
+        started_programs = set()
+        jobserver = JobServer(self.jobs)
+        report_queue = multiprocessing.Queue()  # pylint: disable=no-member
+
+        try:
+            while pending or running:
+                startable, skipped = self.ready(pending, done, failed)
+                for node in skipped:
+                    logging.error("Won't install %(section)s of %(program)s, a dependency failed",
+                                  dict(section=node.section, program=node.program))
+                    pending.remove(node)
+                    failed.add(node.key)
+                    results[node.program] = constants.INSTALL_FAIL
+
+                if not startable and not skipped and not running:
+                    for node in pending:
+                        logging.error("Won't install %(section)s of %(program)s, its dependencies form a cycle",
+                                      dict(section=node.section, program=node.program))
+                        failed.add(node.key)
+                        results[node.program] = constants.INSTALL_FAIL
+                    pending.clear()
+
+                for node in startable:
+                    if not jobserver.try_acquire():
+                        break
+
+                    pending.remove(node)
+                    if node.program not in started_programs:
+                        started_programs.add(node.program)
+                        lib.logger.start_new_log_section(node.program, "installation")
+
+                    index = nodes.index(node)
+                    process = TaskProcess(
+                        index, Task(install_node, dict(node=node, jobserver=jobserver, **kwargs)), report_queue, ()
+                    )
+                    process.start()
+                    running[index] = process
+
+                if not running:
+                    continue
+
+                reports, lost = wait_for_reports(report_queue, running)
+                for index in lost:
+                    logging.error("An installation process died unexpectedly with code %(code)s",
+                                  dict(code=running[index].exitcode))
+                    reports.append((index, constants.INSTALL_FAIL, None))
+
+                for index, value, _ in reports:
+                    if index not in running:
+                        logging.debug("Ignoring the late report of node %(index)s", dict(index=index))
+                        continue
+
+                    running.pop(index).join()
+                    jobserver.release()
+                    node = nodes[index]
+                    if value:
+                        failed.add(node.key)
+                        results[node.program] = value
+                    else:
+                        done.add(node.key)
+
+                    show_progress(len(done) + len(failed), len(nodes))
+
+        finally:
+            for process in running.values():
+                process.terminate()
+            jobserver.close()
+
+        return results
@@ -49,15 +49,22 @@ def logging_verbose(msg: str, *args, **kwargs) -> None:
     logging.root.verbose(msg, *args, **kwargs)
 
 
-def setup_logging() -> None:
+def register_verbose_level() -> None:
     """
-    Sets up the logging module to have a verbose option and formats the Console handler and File handler
+    Adds the verbose level and its logging functions to the logging module, without configuring any handler
     """
     logging.addLevelName(VERBOSE, "VERBOSE")
     logging.Logger.verbose = logger_verbose
     logging.verbose = logging_verbose
     logging.VERBOSE = VERBOSE
 
+
+def setup_logging() -> None:
+    """
+    Sets up the logging module to have a verbose option and formats the Console handler and File handler
+    """
+    register_verbose_level()
+
     # define console handler
     console_handler = ConsoleHandler(sys.stderr)
     if hasattr(console_handler, "_column_color"):
@@ -9,14 +9,16 @@ Multiple helper class for plugins creation. All plugins implemented are required
 # noinspection PyProtectedMember
 from argparse import _SubParsersAction, ArgumentParser
 from abc import abstractmethod, ABCMeta
+from configparser import SectionProxy
+from contextlib import suppress
 import logging
 import os
 import shutil
 
 from lib.installer import Installer
-from lib.installer.context_managers import ExtensionPatcherManager
-from lib.parsers.configuration import get_global_conf
+from lib.installer.context_managers import VariantBuildManager
 from lib.trigger import RawTrigger
+from lib.trigger.workloads import WorkloadManager
 
 
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
@@ -115,6 +117,16 @@ class MainPlugin(BasePlugin, metaclass=ABCMeta):
         parser.set_defaults(main_plugin=cls())  # pylint: disable=abstract-class-instantiated
         return parser
 
+    def get_locks(self, conf: SectionProxy) -> set:  # pylint: disable=no-self-use,unused-argument
+        """
+        Gets the host resources a run of the given program under this plugin needs for itself, in addition to the
+        ones of its trigger
+
+        :param conf: the configuration of the program
+        :return: a set of lock names
+        """
+        return set()
+
     @abstractmethod
     def check_trigger_success(self, trigger: RawTrigger, error: int, *args, **kwargs) -> int:
         """
@@ -134,7 +146,9 @@ class MainPlugin(BasePlugin, metaclass=ABCMeta):
                           *args, **kwargs) -> int:
         """
         Creates a special executable to run for this plugin if needed. If a patch is supplied by the form
-        "program-name-version-extension.patch", it will automatically get used to create a new version
+        "program-name-version-extension.patch", it will automatically get used to create a new version. Each version is
+        built in its own build tree, configured from a copy of the sources and kept between runs, so that only what the
+        patch changed is recompiled
 
         :param installer: the installer instance that is used
         :param extension: the extension to add to the binary, usually the plugin name
@@ -146,32 +160,38 @@ class MainPlugin(BasePlugin, metaclass=ABCMeta):
         """
         extension = extension or self.extension
         executable_suffix = "{}-{}".format(extension, version_number) if version_number else extension
-
-        for lib in installer.conf.getlist("libraries"):
-            lib_installer = Installer.factory(installer.conf.get_library(lib), False)
-            with ExtensionPatcherManager(lib_installer, extension) as lib_patcher:
-                if lib_patcher.is_patched or force:
-                    lib_installer.configure()
-                    lib_installer.make()
-                    lib_installer.install()
-                    force = True
-
-        with ExtensionPatcherManager(installer, extension) as patcher:
-            if not patcher.is_patched and not force:
-                logging.verbose("No need to create special executable for {}".format(extension))
-                return
-
-            installer.make()
-            executable = os.path.join(installer.working_dir, installer.conf.get("bitcode_file"))
+        libraries = [
+            Installer.factory(installer.conf.get_library(lib), False) for lib in installer.conf.getlist("libraries")
+        ]
+        relink = False
+
+        for lib_installer in libraries:
+            lib_variant = VariantBuildManager(lib_installer, extension)
+            if lib_variant.is_patched or force:
+                with lib_variant:
+                    lib_installer.make(lib_variant.directory)
+                    lib_installer.install(lib_variant.directory)
+                    force = relink = True
+
+        variant = VariantBuildManager(installer, extension)
+        if not variant.is_patched and not force:
+            logging.verbose("No need to create special executable for {}".format(extension))
+            return
+
+        with variant:
+            executable = os.path.join(variant.directory, installer.conf.get("bitcode_file"))
+            if relink:
+                # the installed libraries are not dependencies make knows about
+                with suppress(FileNotFoundError):
+                    os.remove(executable)
+
+            installer.make(variant.directory)
             destination = "{}-{}".format(installer.conf.get_executable(), executable_suffix)
             logging.verbose("Copying {} to {}".format(executable, os.path.join(installer.install_dir, destination)))
             shutil.copy(executable, os.path.join(installer.install_dir, destination))
 
-        for lib in installer.conf.getlist("libraries"):
-            lib_installer = Installer.factory(installer.conf.get_library(lib), False)
-            if force:
-                lib_installer.configure()
-                lib_installer.make()
+        if relink:
+            for lib_installer in libraries:
                 lib_installer.install()
 
         return 0
@@ -296,17 +316,7 @@ def create_big_file(size: int=1) -> str:
     """
     Used to create a very big file to use for some processing
 
-    :param size: the number of times to duplicate the file, increasing its size
+    :param size: the size of the file, in MiB
     :return: the file path
     """
-    return_file = os.path.join(get_global_conf().getdir("trigger", "workloads"), "{}-{}.tar".format("workloads", size))
-    if os.path.exists(return_file):
-        return return_file
-
-    os.makedirs(os.path.dirname(return_file), exist_ok=True)
-
-    with open(return_file, "w") as big_file:
-        for _ in range(size):
-            big_file.write("0" * (1024 ** 2))
-
-    return return_file
+    return WorkloadManager().get(size, "zeros")
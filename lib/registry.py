@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Registry of the enabled plugins. Registering plugins on the argument parsers requires importing every plugin module,
+and with them every library they use, even though a run only uses a few of them. What each plugin registers is
+therefore recorded once in a manifest, along with its name, kind and options, and replayed on later runs without
+importing any plugin. Plugins appear in the parsed arguments as references, and only the modules of the ones selected
+on the command line are imported.
+
+The manifest is built in a separate interpreter, for only the enabled plugins to be found, and is rebuilt whenever the
+enabled plugins or any file they were loaded from changes. Plugins registering anything that cannot be recorded are
+imported and registered as before on every run
+"""
+
+from contextlib import suppress
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+from lib.constants import ROOT_PATH
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+MANIFEST_VERSION = 1
+HOOKS = ["register_for_trigger", "register_for_install"]
+BUILTINS = {"int": int, "float": float, "str": str, "bool": bool}
+
+REGISTRY = None
+
+
+class PluginReference:
+    """
+    Stands for a plugin class, or for an instance of it, in the arguments parsed with a replayed manifest, until the
+    plugin is loaded
+
+    :param module: the module defining the plugin
+    :param name: the name of the plugin class in its module
+    :param instance: whether the reference stands for an instance of the plugin instead of its class
+    """
+    def __init__(self, module: str, name: str, instance: bool=False):
+        self.module = module
+        self.name = name
+        self.instance = instance
+
+    def load(self):
+        """
+        Imports the module of the plugin
+        :return: the plugin class, or a new instance of it
+        """
+        plugin = getattr(importlib.import_module(self.module), self.name)
+        return plugin() if self.instance else plugin
+
+    def __eq__(self, other):
+        return isinstance(other, PluginReference) and \
+            (self.module, self.name, self.instance) == (other.module, other.name, other.instance)
+
+    def __hash__(self):
+        return hash((self.module, self.name, self.instance))
+
+    def __repr__(self):
+        return "<{}{} from {}>".format(self.name, "()" if self.instance else "", self.module)
+
+
+class ParserRecorder:
+    """
+    Takes the place of an argument parser while a plugin registers, and records the calls made on it and on everything
+    they return. Each call is stored as [target, method, args, kwargs], the target being either the name of the parser
+    or the index of the call that returned the object called
+
+    :param calls: the list in which to record calls
+    :param target: what the recorder stands for
+    """
+    def __init__(self, calls: list, target):
+        self.__calls__ = calls
+        self.__target__ = target
+
+    def __getattr__(self, method: str):
+        if method.startswith("__"):
+            raise AttributeError(method)
+
+        def record(*args, **kwargs):
+            """
+            Records the call
+            :raise TypeError if the arguments cannot be stored in the manifest
+            :return: a recorder for the object the call returns
+            """
+            self.__calls__.append(
+                [self.__target__, method, encode(list(args)), {key: encode(item) for key, item in kwargs.items()}]
+            )
+            return ParserRecorder(self.__calls__, len(self.__calls__) - 1)
+
+        return record
+
+
+def encode(value):
+    """
+    :param value: an argument given to a parser
+    :raise TypeError if the value cannot be stored in the manifest
+    :return: the value as json
+    """
+    from lib.plugins import BasePlugin
+
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {"tuple": [encode(item) for item in value]}
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {"dict": {key: encode(item) for key, item in value.items()}}
+    if any(value is builtin for builtin in BUILTINS.values()):
+        return {"builtin": value.__name__}
+    if isinstance(value, type) and issubclass(value, BasePlugin):
+        return {"plugin": [value.__module__, value.__qualname__], "instance": False}
+    if isinstance(value, BasePlugin):
+        return {"plugin": [type(value).__module__, type(value).__qualname__], "instance": True}
+    raise TypeError("{!r} cannot be stored in the plugins manifest".format(value))
+
+
+def decode(value):
+    """
+    :param value: an argument as stored in the manifest
+    :return: the argument to give to the parser, with plugins replaced by references
+    """
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    if isinstance(value, dict):
+        if "tuple" in value:
+            return tuple(decode(item) for item in value["tuple"])
+        if "dict" in value:
+            return {key: decode(item) for key, item in value["dict"].items()}
+        if "builtin" in value:
+            return BUILTINS[value["builtin"]]
+        return PluginReference(*value["plugin"], instance=value["instance"])
+    return value
+
+
+def resolve(value):
+    """
+    :param value: a parsed argument
+    :return: the argument, with plugin references replaced by the plugins they stand for
+    """
+    if isinstance(value, PluginReference):
+        return value.load()
+    if isinstance(value, list):
+        return [resolve(item) for item in value]
+    return value
+
+
+def build_manifest(plugins: list) -> dict:
+    """
+    Imports the given plugin modules and records what every plugin they define registers. This must run in an
+    interpreter in which no other plugin was imported
+
+    :param plugins: the enabled plugins, as $package.$name
+    :return: the manifest
+    """
+    from lib import get_subclasses
+    from lib.plugins import BasePlugin, MainPlugin, MetaPlugin, AnalysisPlugin, InstallPlugin
+
+    for plugin in plugins:
+        importlib.import_module("plugins.{}".format(plugin))
+
+    kinds = [(MainPlugin, "main"), (MetaPlugin, "meta"), (AnalysisPlugin, "analysis"), (InstallPlugin, "install")]
+    entries = []
+    for plugin in get_subclasses(BasePlugin):
+        entry = {
+            "name": plugin.__name__.lower(),
+            "module": plugin.__module__,
+            "class": plugin.__qualname__,
+            "kind": next((kind for base, kind in kinds if issubclass(plugin, base)), None),
+            "help": plugin.help,
+            "options": plugin.options() if hasattr(plugin, "options") else None,
+            "hooks": {}
+        }
+
+        for hook in HOOKS:
+            calls = []
+            parsers = {name: ParserRecorder(calls, name) for name in ["parser", "subparser"]}
+            try:
+                getattr(plugin, hook)(**parsers)
+            except Exception as exc:  # pylint: disable=broad-except
+                logging.debug(
+                    "%(plugin)s.%(hook)s cannot be recorded, it will always be imported : %(error)s",
+                    dict(plugin=plugin.__name__, hook=hook, error=exc)
+                )
+                calls = None
+            entry["hooks"][hook] = calls
+
+        entries.append(entry)
+
+    files = {}
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None)
+        if path and (name.startswith("plugins.") or name in ("lib.plugins", "lib.registry", "__main__")):
+            files[os.path.abspath(path)] = os.stat(path).st_mtime_ns
+
+    return {"version": MANIFEST_VERSION, "plugins": plugins, "files": files, "entries": entries}
+
+
+class PluginRegistry:
+    """
+    The enabled plugins, as described by the manifest
+
+    :param plugins: the enabled plugins, as $package.$name, [plugins] enabled_plugins by default
+    :param path: where the manifest is kept, [plugins] manifest by default
+    """
+    def __init__(self, plugins: list=None, path: str=None):
+        conf = get_global_conf()
+        self.plugins = plugins if plugins is not None else conf.getlist("plugins", "enabled_plugins")
+        self.path = path or os.path.expanduser(conf.get("plugins", "manifest"))
+        self.__manifest__ = None
+
+    def is_valid(self, manifest: dict) -> bool:
+        """
+        :param manifest: a manifest
+        :return: whether the manifest is for the enabled plugins, and none of the files it was built from changed
+        """
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("plugins") != self.plugins:
+            return False
+
+        for path, mtime in manifest["files"].items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def build(self) -> dict:
+        """
+        Builds the manifest in a new interpreter and stores it
+        :return: the manifest
+        """
+        logging.verbose("Building the plugins manifest")
+        process = subprocess.run(
+            [sys.executable, "-m", "lib.registry"] + self.plugins,
+            cwd=ROOT_PATH, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            if process.returncode:
+                raise ValueError(process.stderr.decode())
+            manifest = json.loads(process.stdout.decode())
+        except ValueError as exc:
+            logging.debug("Could not build the plugins manifest : %(error)s", dict(error=exc))
+            # building it here gives the real error when a plugin cannot be imported
+            manifest = build_manifest(self.plugins)
+
+        with suppress(OSError):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            descriptor, staging = tempfile.mkstemp(prefix=".plugins-", dir=os.path.dirname(self.path))
+            with os.fdopen(descriptor, "w") as _file_:
+                json.dump(manifest, _file_, indent=4)
+            os.chmod(staging, 0o644)
+            os.replace(staging, self.path)
+
+        return manifest
+
+    @property
+    def manifest(self) -> dict:
+        """
+        The manifest of the enabled plugins, rebuilt if it is outdated
+        """
+        if self.__manifest__ is None:
+            manifest = {}
+            with suppress(OSError, ValueError):
+                with open(self.path) as _file_:
+                    manifest = json.load(_file_)
+            if not self.is_valid(manifest):
+                manifest = self.build()
+            self.__manifest__ = manifest
+        return self.__manifest__
+
+    def entries(self, kind: str=None) -> list:
+        """
+        :param kind: the kind of plugins to list, one of main, meta, analysis or install, all by default
+        :return: the description of the plugins, in registration order
+        """
+        return [entry for entry in self.manifest["entries"] if kind is None or entry["kind"] == kind]
+
+    def load(self, name: str, kind: str=None):
+        """
+        Imports a plugin
+
+        :param name: the name of the plugin, its class name in lowercase
+        :param kind: the kind of the plugin, any by default
+        :raise KeyError if no such plugin is enabled
+        :return: the plugin class
+        """
+        for entry in self.entries(kind):
+            if entry["name"] == name:
+                return getattr(importlib.import_module(entry["module"]), entry["class"])
+        raise KeyError("No {}plugin named {} is enabled".format(kind + " " if kind else "", name))
+
+    def register(self, hook: str, **parsers) -> None:
+        """
+        Registers all plugins on the given parsers, replaying the manifest
+
+        :param hook: the registration to do, one of register_for_trigger or register_for_install
+        :param parsers: the parsers to register on, by name
+        """
+        for entry in self.entries():
+            calls = entry["hooks"][hook]
+            if calls is None:
+                getattr(getattr(importlib.import_module(entry["module"]), entry["class"]), hook)(**parsers)
+                continue
+
+            objects = dict(parsers)
+            for index, (target, method, args, kwargs) in enumerate(calls):
+                objects[index] = getattr(objects[target], method)(
+                    *decode(args), **{key: decode(item) for key, item in kwargs.items()}
+                )
+
+
+def get_registry() -> PluginRegistry:
+    """
+    If the registry was not loaded, loads it and returns it
+    :return: the registry of the enabled plugins
+    """
+    global REGISTRY  # pylint: disable=global-statement
+    if REGISTRY is None:
+        REGISTRY = PluginRegistry()
+    return REGISTRY
+
+
+if __name__ == "__main__":
+    json.dump(build_manifest(sys.argv[1:]), sys.stdout)
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+A SQLite store for benchmark results. Every benchmarked run is kept with its raw samples, indexed by bug, plugin,
+compiler, host and time, so that reports only read the entries they need
+"""
+
+from contextlib import closing
+import logging
+import os
+import socket
+import sqlite3
+import time
+
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    bug TEXT NOT NULL,
+    plugin TEXT NOT NULL,
+    compiler TEXT,
+    host TEXT,
+    timestamp REAL NOT NULL,
+    slice_size TEXT,
+    mean REAL,
+    stdev REAL,
+    variance REAL,
+    precision REAL,
+    warmup INTEGER,
+    cpu REAL,
+    rss REAL,
+    voluntary_switches REAL,
+    involuntary_switches REAL,
+    placement TEXT,
+    higher_is_better INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS runs_bug_plugin_timestamp ON runs (bug, plugin, timestamp);
+CREATE INDEX IF NOT EXISTS runs_compiler ON runs (compiler);
+CREATE INDEX IF NOT EXISTS runs_host ON runs (host);
+
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    value REAL NOT NULL,
+    user_time REAL,
+    system_time REAL,
+    max_rss INTEGER,
+    voluntary_switches INTEGER,
+    involuntary_switches INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS samples_run_id ON samples (run_id);
+
+CREATE TABLE IF NOT EXISTS curve (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    concurrency INTEGER NOT NULL,
+    throughput REAL NOT NULL,
+    mean REAL,
+    p50 REAL,
+    p90 REAL,
+    p99 REAL,
+    p999 REAL
+);
+
+CREATE INDEX IF NOT EXISTS curve_run_id ON curve (run_id);
+"""
+
+# columns added to the runs table after its creation, with the statement filling them for older runs
+MIGRATIONS = [
+    ("placement", "TEXT", None),
+    # apache was the only bug benchmarked in requests per second before the direction was stored
+    ("higher_is_better", "INTEGER", "UPDATE runs SET higher_is_better = bug LIKE 'apache-%'"),
+]
+
+# the user_version of databases into which the benchmark.log of older versions was imported
+LEGACY_LOG_IMPORTED = 1
+
+METRICS = {"time": "mean", "cpu": "cpu", "rss": "rss"}
+CURVE_COLUMNS = ["concurrency", "throughput", "mean", "p50", "p90", "p99", "p999"]
+SAMPLE_METRICS = {"time": "samples.value", "cpu": "samples.user_time + samples.system_time", "rss": "samples.max_rss"}
+
+
+class ResultStore:
+    """
+    The benchmark results database. It uses write ahead logging, so that concurrent triggers can add results while
+    reports are read
+
+    :param path: the path to the database, [trigger] results_database by default
+    :param legacy_log: the text log in which older versions kept results, imported the first time the database is
+                       opened. [trigger] exp-results/benchmark.log for the default database, none otherwise
+    """
+    def __init__(self, path: str=None, legacy_log: str=None):
+        if path is None:
+            path = get_global_conf().getdir("trigger", "results_database")
+            legacy_log = legacy_log or os.path.join(get_global_conf().getdir("trigger", "exp-results"), "benchmark.log")
+
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with closing(self.connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self.__migrate__(connection)
+            if legacy_log is not None:
+                self.__import_legacy_log__(connection, legacy_log)
+
+    @staticmethod
+    def __migrate__(connection: sqlite3.Connection) -> None:
+        """
+        Adds the columns that databases created by older versions lack
+
+        :param connection: the connection to the database
+        """
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(runs)")}
+        with connection:
+            for column, kind, backfill in MIGRATIONS:
+                if column not in columns:
+                    connection.execute("ALTER TABLE runs ADD COLUMN {} {}".format(column, kind))
+                    if backfill is not None:
+                        connection.execute(backfill)
+
+    @classmethod
+    def __import_legacy_log__(cls, connection: sqlite3.Connection, path: str) -> None:
+        """
+        Imports the runs older versions appended to a text log, once per database. The log knows neither the compiler,
+        the host nor the time of a run : they are left empty, and runs are dated by the last change of the log, in the
+        order they were written
+
+        :param connection: the connection to the database
+        :param path: the log, with lines formatted as "bug, plugin, slice size, mean, stdev, variance sample sample..."
+        """
+        if connection.execute("PRAGMA user_version").fetchone()[0] >= LEGACY_LOG_IMPORTED:
+            return
+
+        # taking the write lock first, for concurrent triggers opening a new database not to both import the log
+        connection.execute("BEGIN IMMEDIATE")
+        with connection:
+            if connection.execute("PRAGMA user_version").fetchone()[0] >= LEGACY_LOG_IMPORTED:
+                return
+
+            if os.path.exists(path):
+                timestamp = os.path.getmtime(path)
+                imported = skipped = 0
+                with open(path) as _file_:
+                    for line in _file_:
+                        try:
+                            bug, plugin, slice_size, mean, stdev, rest = line.strip().split(", ", 5)
+                            variance, *samples = rest.split(" ")
+                            summary = [float(mean), float(stdev), float(variance)]
+                            samples = [float(sample) for sample in samples]
+                        except ValueError:
+                            skipped += 1
+                            continue
+
+                        run_id = connection.execute(
+                            "INSERT INTO runs (bug, plugin, timestamp, slice_size, mean, stdev, variance, "
+                            "higher_is_better) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            # apache was the only bug benchmarked in requests per second by older versions
+                            [bug, plugin, timestamp, None if slice_size == "None" else slice_size] + summary +
+                            [bug.startswith("apache-")]
+                        ).lastrowid
+                        connection.executemany(
+                            "INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            [cls.__sample_row__(run_id, "warm", sample) for sample in samples]
+                        )
+                        imported += 1
+
+                logging.info("Imported %(imported)s runs from %(path)s", dict(imported=imported, path=path))
+                if skipped:
+                    logging.warning("Skipped %(skipped)s malformed lines of %(path)s", dict(skipped=skipped, path=path))
+
+            connection.execute("PRAGMA user_version = {}".format(LEGACY_LOG_IMPORTED))
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Opens a new connection to the database
+        :return: the connection
+        """
+        connection = sqlite3.connect(self.path, timeout=60)
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def add_run(self, bug: str, plugin: str, samples: list, summary: dict, cold_samples: list=(), curve: list=(),
+                helper_samples: list=(), slice_size: str=None, compiler: str=None, host: str=None,
+                timestamp: float=None) -> int:
+        """
+        Saves a benchmarked run and its samples
+
+        :param bug: the bug that was benchmarked
+        :param plugin: the main plugin under which it ran
+        :param samples: the kept results of the run, either timings or lib.trigger.measures.Measure
+        :param summary: aggregated values for the run, keys being columns of the runs table (mean, stdev, cpu, ...),
+                        with higher_is_better set if the samples are throughputs instead of timings
+        :param cold_samples: results of runs done on a freshly started server, if any
+        :param curve: the throughput and latency percentiles at each concurrency level of a load generator, as dicts
+                      with the keys of CURVE_COLUMNS, if any
+        :param helper_samples: the time each helper took to report its result, if any
+        :param slice_size: the slice size the plugin ran with, if any
+        :param compiler: the compiler used to build the bug, [install] compiler by default
+        :param host: the machine on which the run was done, the current host by default
+        :param timestamp: when the run ended, now by default
+        :return: the id of the run
+        """
+        columns = ["bug", "plugin", "compiler", "host", "timestamp", "slice_size"]
+        values = [
+            bug, plugin, compiler or get_global_conf().get("install", "compiler"), host or socket.gethostname(),
+            timestamp or time.time(), None if slice_size is None else str(slice_size)
+        ]
+        for key, value in summary.items():
+            columns.append(key)
+            values.append(value)
+
+        with closing(self.connect()) as connection, connection:
+            run_id = connection.execute(
+                "INSERT INTO runs ({}) VALUES ({})".format(", ".join(columns), ", ".join("?" * len(values))), values
+            ).lastrowid
+
+            connection.executemany(
+                "INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [self.__sample_row__(run_id, "warm", sample) for sample in samples] +
+                [self.__sample_row__(run_id, "cold", sample) for sample in cold_samples] +
+                [self.__sample_row__(run_id, "helper", sample) for sample in helper_samples]
+            )
+            connection.executemany(
+                "INSERT INTO curve (run_id, {}) VALUES (?, {})".format(
+                    ", ".join(CURVE_COLUMNS), ", ".join("?" * len(CURVE_COLUMNS))
+                ),
+                [[run_id] + [point.get(column) for column in CURVE_COLUMNS] for point in curve]
+            )
+
+        return run_id
+
+    @staticmethod
+    def __sample_row__(run_id: int, kind: str, sample: object) -> tuple:
+        """
+        Formats a sample as a row of the samples table
+
+        :param run_id: the id of the run the sample belongs to
+        :param kind: warm, cold or helper
+        :param sample: a timing or a lib.trigger.measures.Measure
+        :return: the row to insert
+        """
+        return (
+            run_id, kind, float(sample), getattr(sample, "user_time", None), getattr(sample, "system_time", None),
+            getattr(sample, "max_rss", None), getattr(sample, "voluntary_switches", None),
+            getattr(sample, "involuntary_switches", None)
+        )
+
+    def latest(self, bugs: list, plugins: list, metric: str="time", compiler: str=None, host: str=None,
+               placement: str=None) -> dict:
+        """
+        Gets the most recent value of a metric for every bug and plugin given
+
+        :param bugs: the bugs for which to get results
+        :param plugins: the names of the plugins for which to get results
+        :param metric: one of time, cpu or rss
+        :param compiler: only consider runs done with this compiler
+        :param host: only consider runs done on this host
+        :param placement: only consider runs done with this lib.trigger.placement.Placement key
+        :return: a dictionary {bug: {plugin: value}}, with missing entries when no value is known
+        """
+        query = "SELECT {} FROM runs WHERE bug = ? AND plugin = ?".format(METRICS[metric])
+        filters = []
+        for column, value in (("compiler", compiler), ("host", host), ("placement", placement)):
+            if value is not None:
+                query += " AND {} = ?".format(column)
+                filters.append(value)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT 1"
+
+        entries = {}
+        with closing(self.connect()) as connection:
+            for bug in bugs:
+                for plugin in plugins:
+                    row = connection.execute(query, [bug, plugin] + filters).fetchone()
+                    if row is not None and row[0] is not None:
+                        entries.setdefault(bug, {})[plugin] = row[0]
+
+        return entries
+
+    def history(self, bug: str, plugin: str, metric: str="time", since: float=None, until: float=None,
+                compiler: str=None, host: str=None, placement: str=None) -> list:
+        """
+        Gets the raw warm samples of all runs of a bug and plugin in a time range
+
+        :param bug: the bug for which to get samples
+        :param plugin: the name of the plugin for which to get samples
+        :param metric: one of time, cpu or rss
+        :param since: only consider runs done at or after this timestamp
+        :param until: only consider runs done before this timestamp
+        :param compiler: only consider runs done with this compiler
+        :param host: only consider runs done on this host
+        :param placement: only consider runs done with this lib.trigger.placement.Placement key
+        :return: the list of values, samples without this metric being skipped
+        """
+        query = "SELECT {} FROM samples JOIN runs ON samples.run_id = runs.id " \
+                "WHERE runs.bug = ? AND runs.plugin = ? AND samples.kind = 'warm'".format(SAMPLE_METRICS[metric])
+        parameters = [bug, plugin]
+        for condition, value in (
+                ("runs.timestamp >= ?", since), ("runs.timestamp < ?", until),
+                ("runs.compiler = ?", compiler), ("runs.host = ?", host), ("runs.placement = ?", placement)
+        ):
+            if value is not None:
+                query += " AND " + condition
+                parameters.append(value)
+
+        with closing(self.connect()) as connection:
+            return [row[0] for row in connection.execute(query, parameters) if row[0] is not None]
+
+    def higher_is_better(self, bug: str, plugin: str, metric: str="time") -> bool:
+        """
+        Tells in which direction a metric improves. Cpu time and memory are always costs, while the main value of a
+        run is either a timing or a throughput, as recorded with the latest run of the bug and plugin
+
+        :param bug: the bug that was benchmarked
+        :param plugin: the name of the plugin under which it ran
+        :param metric: one of time, cpu or rss
+        :return: True if higher values are better, False if lower ones are or nothing is known
+        """
+        if metric != "time":
+            return False
+
+        with closing(self.connect()) as connection:
+            row = connection.execute(
+                "SELECT higher_is_better FROM runs WHERE bug = ? AND plugin = ? "
+                "ORDER BY timestamp DESC, id DESC LIMIT 1", (bug, plugin)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def samples(self, run_id: int, kind: str="warm") -> list:
+        """
+        Gets the raw values of a run
+
+        :param run_id: the id of the run
+        :param kind: warm, cold or helper
+        :return: the list of values, in the order they were saved
+        """
+        with closing(self.connect()) as connection:
+            return [
+                row[0] for row in connection.execute(
+                    "SELECT value FROM samples WHERE run_id = ? AND kind = ? ORDER BY rowid", (run_id, kind)
+                )
+            ]
+
+    def curve(self, run_id: int) -> list:
+        """
+        Gets the throughput and latency percentiles a run measured at each concurrency level
+
+        :param run_id: the id of the run
+        :return: a list of dicts with the keys of CURVE_COLUMNS, by increasing concurrency
+        """
+        with closing(self.connect()) as connection:
+            return [
+                dict(zip(CURVE_COLUMNS, row)) for row in connection.execute(
+                    "SELECT {} FROM curve WHERE run_id = ? ORDER BY concurrency".format(", ".join(CURVE_COLUMNS)),
+                    (run_id,)
+                )
+            ]
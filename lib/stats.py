@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Statistical helpers for benchmark results : steady state detection, confidence intervals and comparisons
+"""
+
+import math
+import statistics
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+def student_quantile(probability: float, degrees: int) -> float:
+    """
+    Computes the quantile of the Student t distribution. Exact for one and two degrees of freedom, and using the
+    Cornish-Fisher expansion (Abramowitz & Stegun 26.7.5) otherwise, which is precise to 1e-3 from 3 degrees on
+
+    :param probability: the cumulative probability, between 0 and 1
+    :param degrees: the degrees of freedom
+    :return: the value t such that P(T < t) = probability
+    """
+    if degrees == 1:
+        return math.tan(math.pi * (probability - 0.5))
+    if degrees == 2:
+        return (2 * probability - 1) / math.sqrt(2 * probability * (1 - probability))
+
+    z = statistics.NormalDist().inv_cdf(probability)
+    return (
+        z +
+        (z ** 3 + z) / (4 * degrees) +
+        (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * degrees ** 2) +
+        (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * degrees ** 3) +
+        (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * degrees ** 4)
+    )
+
+
+def mean_confidence_interval(samples: list, confidence: float=0.95) -> (float, float):
+    """
+    Computes the confidence interval of the mean of the samples, assuming they are independent
+
+    :param samples: at least two values
+    :param confidence: the confidence level of the interval
+    :return: the mean and the half width of the interval
+    """
+    mean = statistics.mean(samples)
+    quantile = student_quantile(1 - (1 - confidence) / 2, len(samples) - 1)
+    return mean, quantile * statistics.stdev(samples) / math.sqrt(len(samples))
+
+
+def median_confidence_interval(samples: list, confidence: float=0.95) -> (float, float):
+    """
+    Computes a distribution free confidence interval of the median of the samples, from their order statistics
+
+    :param samples: at least two values
+    :param confidence: the confidence level of the interval
+    :return: the median and the half width of the interval
+    """
+    ordered = sorted(samples)
+    size = len(ordered)
+    z = statistics.NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    offset = z * math.sqrt(size) / 2
+
+    low = max(0, math.floor(size / 2 - offset))
+    high = min(size - 1, math.ceil(size / 2 + offset) - 1)
+    return statistics.median(ordered), (ordered[high] - ordered[low]) / 2
+
+
+CONFIDENCE_INTERVALS = {"mean": mean_confidence_interval, "median": median_confidence_interval}
+
+
+def relative_precision(samples: list, confidence: float=0.95, statistic: str="mean") -> float:
+    """
+    Computes the relative half width of the confidence interval of the samples
+
+    :param samples: the values
+    :param confidence: the confidence level of the interval
+    :param statistic: mean or median
+    :return: the half width of the interval divided by the statistic, infinity if it cannot be computed
+    """
+    if len(samples) < 2:
+        return math.inf
+
+    center, half_width = CONFIDENCE_INTERVALS[statistic](samples, confidence)
+    if center == 0:
+        return math.inf if half_width else 0
+
+    return abs(half_width / center)
+
+
+def warmup_length(samples: list) -> int:
+    """
+    Detects the end of the warm-up period with the MSER rule (White, 1997) : the truncation point minimizing the
+    standard error of the remaining samples. Only the first half of the samples is considered for truncation
+
+    :param samples: the values, in the order they were measured
+    :return: the number of leading samples to discard
+    """
+    size = len(samples)
+    if size < 4:
+        return 0
+
+    best_length = 0
+    best_error = math.inf
+
+    # suffix sums to compute the variance of every tail in linear time
+    total = 0.0
+    total_squares = 0.0
+    tails = [None] * (size + 1)
+    for index in range(size - 1, -1, -1):
+        total += samples[index]
+        total_squares += samples[index] ** 2
+        tails[index] = (total, total_squares)
+
+    for length in range(size // 2 + 1):
+        remaining = size - length
+        total, total_squares = tails[length]
+        error = max(0.0, total_squares - total ** 2 / remaining) / remaining ** 2
+        if error < best_error:
+            best_length, best_error = length, error
+
+    return best_length
+
+
+def mann_whitney(first: list, second: list) -> float:
+    """
+    One sided Mann-Whitney U test, using the normal approximation with tie and continuity corrections. It makes no
+    assumption on the distribution of the values, which suits timings with long tails
+
+    :param first: the first set of values
+    :param second: the second set of values
+    :return: the p-value of the hypothesis that values of first are not greater than those of second
+    """
+    size_first, size_second = len(first), len(second)
+    if not size_first or not size_second:
+        return 1.0
+
+    values = sorted([(value, 0) for value in first] + [(value, 1) for value in second])
+    ranks_first = 0.0
+    tie_correction = 0.0
+    index = 0
+    while index < len(values):
+        end = index
+        while end + 1 < len(values) and values[end + 1][0] == values[index][0]:
+            end += 1
+
+        rank = (index + end) / 2 + 1
+        ties = end - index + 1
+        tie_correction += ties ** 3 - ties
+        ranks_first += rank * sum(1 for position in range(index, end + 1) if values[position][1] == 0)
+        index = end + 1
+
+    u_statistic = ranks_first - size_first * (size_first + 1) / 2
+    total = size_first + size_second
+    variance = size_first * size_second / 12 * ((total + 1) - tie_correction / (total * (total - 1)))
+    if variance <= 0:
+        return 1.0
+
+    z = (u_statistic - size_first * size_second / 2 - 0.5) / math.sqrt(variance)
+    return 1 - statistics.NormalDist().cdf(z)
+
+
+def wilson_interval(successes: int, trials: int, confidence: float=0.95) -> (float, float):
+    """
+    Computes the Wilson score interval of a proportion, which stays within [0, 1] and remains meaningful for few trials
+    and proportions close to 0 or 1, unlike the normal approximation
+
+    :param successes: the number of successful trials
+    :param trials: the number of trials
+    :param confidence: the confidence level of the interval
+    :return: the lower and upper bounds of the interval, (0, 1) if there were no trials
+    """
+    if not trials:
+        return 0.0, 1.0
+
+    z = statistics.NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    proportion = successes / trials
+    denominator = 1 + z ** 2 / trials
+    center = (proportion + z ** 2 / (2 * trials)) / denominator
+    half_width = z / denominator * math.sqrt(proportion * (1 - proportion) / trials + z ** 2 / (4 * trials ** 2))
+    return max(0.0, center - half_width), min(1.0, center + half_width)
@@ -9,9 +9,8 @@ __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 
 from abc import ABCMeta, abstractmethod
+from configparser import SectionProxy
 from contextlib import suppress
-import queue
-import multiprocessing
 import logging
 import os
 import re
@@ -22,20 +21,30 @@ import time
 
 from lib.helper import launch_and_log
 from lib.trigger.benchmark import BenchmarkWithHelper, ApacheBenchmark, RawBenchmark, BaseBenchmark
+from lib.trigger.channel import ResultsChannel, run_helpers
+from lib.trigger.hang import HangDetector
 from lib.trigger.helper import BaseHelper, UrlFetcherHelper
-from lib.parsers.configuration import get_trigger_conf
+from lib.trigger.probes import PidfileProbe, TcpProbe, wait_ready, wait_stopped
+from lib.trigger.resources import Port
+from lib.trigger.supervisor import Supervisor
+from lib.parsers.configuration import get_global_conf, get_trigger_conf
 
 
 class RawTrigger(metaclass=ABCMeta):
     """
     The base trigger for the bugs. All bug triggers should inherit it
     """
+    # The lib.trigger.resources.Resource this trigger needs. Each run gets its own instance of them
+    resources = []
+
     def __init__(self):
         """
         Fetches the configuration of the program and stores it in conf.
         """
         self.__cmd__ = None
         self.__returned_information__ = None
+        self.__returned_metadata__ = {}
+        self.__resources__ = {}
         self.conf = get_trigger_conf(self.program)
 
     @property  # pragma nocover
@@ -95,6 +104,56 @@ class RawTrigger(metaclass=ABCMeta):
         """
         self.__returned_information__ = returned_information
 
+    @property
+    def returned_metadata(self) -> dict:
+        """
+        Additional information about the run that analysis plugins can report next to returned_information, such as
+        the cold start timings of a benchmark
+        """
+        return self.__returned_metadata__
+
+    @classmethod
+    def get_locks(cls, conf: SectionProxy) -> set:
+        """
+        Gets the host resources this trigger needs for itself while running
+        :param conf: the configuration of the program
+        :return: a set of lock names
+        """
+        return {_resource.lock(conf) for _resource in cls.resources if _resource.lock(conf) is not None}
+
+    @classmethod
+    def get_cpus(cls) -> int:
+        """
+        Gets the number of cpus this trigger keeps busy while running
+        :return: the number of cpus used, at least one
+        """
+        return max(1, sum(_resource.cpus for _resource in cls.resources))
+
+    def resource(self, name: str) -> object:
+        """
+        Gets the instance of a declared resource for this run, creating it on first access
+        :param name: the name of the resource
+        :raise KeyError if no such resource is declared
+        :return: the value of the resource
+        """
+        if name not in self.__resources__:
+            for _resource in self.resources:
+                if _resource.name == name:
+                    self.__resources__[name] = _resource.acquire(self)
+                    break
+            else:
+                raise KeyError("{} does not declare a resource named {}".format(self.program, name))
+
+        return self.__resources__[name]
+
+    def release_resources(self) -> None:
+        """
+        Frees all resources that were acquired for this run
+        """
+        for _resource in self.resources:
+            if _resource.name in self.__resources__:
+                _resource.release(self.__resources__.pop(_resource.name))
+
     @staticmethod
     def __preexec_fn__() -> None:
         """
@@ -176,6 +235,15 @@ class BaseTrigger(RawTrigger, metaclass=ABCMeta):
 
         return self.check_success(error_code=error_code)
 
+    def wait_for_deadlock(self, process: subprocess.Popen) -> bool:
+        """
+        Waits for a process of the trigger to either exit or deadlock. Programs can set how long they must stay blocked
+        with hang_timeout in their install.conf
+        :param process: the process to watch
+        :return: True if the process deadlocked, False if it exited
+        """
+        return HangDetector(process.pid, self.conf.getfloat("hang_timeout", fallback=None)).wait(process)
+
 
 # noinspection PyAbstractClass
 class TriggerWithHelper(RawTrigger, metaclass=ABCMeta):
@@ -185,33 +253,38 @@ class TriggerWithHelper(RawTrigger, metaclass=ABCMeta):
     class Server(Thread):
         """
         Thread to launch the subprocess for the server, in case some server don't go in background
+
+        :param command: the command starting the server
+        :param supervisor: the supervisor to start the server under
+        :param preexec_fn: the function to call in the server before it starts, setting the core limit by default
         """
-        def __init__(self, command: str):
+        def __init__(self, command: str, supervisor: Supervisor=None, preexec_fn: callable=None):
             super().__init__()
             self.__output__ = None
             self.command = command
+            self.supervisor = supervisor
+            self.preexec_fn = preexec_fn or TriggerWithHelper.__preexec_fn__
 
         def run(self):
             """
             Launches the command and waits for the output
             """
+            kwargs = self.supervisor.popen_kwargs() if self.supervisor is not None else {}
             with suppress(subprocess.CalledProcessError):
-                launch_and_log(self.command.split(" "), preexec_fn=TriggerWithHelper.__preexec_fn__)
+                launch_and_log(self.command.split(" "), preexec_fn=self.preexec_fn, **kwargs)
 
     def __init__(self):
         super().__init__()
         self.__cmd__ = self.start_cmd
+        self.__clients__ = None
+        self.__iterations__ = None
+        self.supervisor = Supervisor()
 
     @property  # pragma nocover
     @abstractmethod
     def helper(self) -> BaseHelper:
         """ The helper to use """
 
-    @property  # pragma nocover
-    @abstractmethod
-    def delay(self) -> int:
-        """ The delay to wait between each program call, to let the server time to set up correctly """
-
     @property  # pragma nocover
     @abstractmethod
     def helper_commands(self) -> list:
@@ -222,10 +295,13 @@ class TriggerWithHelper(RawTrigger, metaclass=ABCMeta):
     def start_cmd(self) -> str:
         """ A function that will be executed by subprocess to start the server """
 
-    @property  # pragma nocover
-    @abstractmethod
-    def stop_cmd(self) -> str:
-        """ A function that will be executed by subprocess. This should start the server """
+    @property
+    def stop_cmd(self) -> str:  # pylint: disable=no-self-use
+        """
+        A command stopping the server gracefully, None to stop it with signals only. Whatever is left of the server
+        afterwards is stopped by the supervisor
+        """
+        return None
 
     @property
     def benchmark(self) -> BenchmarkWithHelper:
@@ -241,6 +317,43 @@ class TriggerWithHelper(RawTrigger, metaclass=ABCMeta):
         """
         return None
 
+    @property
+    def probes(self) -> list:  # pylint: disable=no-self-use
+        """
+        The lib.trigger.probes.Probe to poll to know when the server is up or down. If there are none, the trigger
+        waits for delay seconds instead
+        """
+        return []
+
+    @property
+    def delay(self) -> int:  # pylint: disable=no-self-use
+        """
+        The delay to wait after starting or stopping the server when no probes are defined
+        """
+        return 2
+
+    def wait_until_ready(self) -> bool:
+        """
+        Waits until the server is ready to handle requests
+        :return: False if the server did not come up in time
+        """
+        if not self.probes:
+            time.sleep(self.delay)
+            return True
+
+        return wait_ready(self.probes)
+
+    def wait_until_stopped(self) -> bool:
+        """
+        Waits until the server is completely stopped, so that it can be started again
+        :return: False if the server did not stop in time
+        """
+        if not self.probes:
+            time.sleep(self.delay)
+            return True
+
+        return wait_stopped(self.probes)
+
     @property
     def named_helper_args(self) -> dict:  # pylint: disable=no-self-use
         """
@@ -248,6 +361,58 @@ class TriggerWithHelper(RawTrigger, metaclass=ABCMeta):
         """
         return {}
 
+    def clean_logs(self) -> None:
+        """
+        Removes the logs of a previous run of the server, if the errors it reports are looked for. Does nothing by
+        default
+        """
+        pass
+
+    def scale(self, clients: int=None, iterations: int=None) -> None:
+        """
+        Changes the load the helpers put on the server, for sweeps over client and iteration counts
+
+        :param clients: the number of helpers to run, cycling through helper_commands, None for helper_commands as is
+        :param iterations: the number of iterations each helper does, None for the one of named_helper_args
+        """
+        self.__clients__ = clients
+        self.__iterations__ = iterations
+
+    @property
+    def active_helper_commands(self) -> list:
+        """
+        The commands of the helpers to run, scaled to the number of clients if one was set
+        """
+        commands = self.helper_commands
+        if self.__clients__ is None:
+            return commands
+
+        return [commands[index % len(commands)] for index in range(self.__clients__)]
+
+    @property
+    def active_helper_args(self) -> dict:
+        """
+        The arguments to pass to the helpers, with the number of iterations if one was set
+        """
+        arguments = dict(self.named_helper_args)
+        if self.__iterations__ is not None:
+            arguments["iterations"] = self.__iterations__
+
+        return arguments
+
+    def stop_server(self) -> bool:
+        """
+        Stops the server with stop_cmd if there is one, and then every process it left behind, with SIGTERM and then
+        SIGKILL, so that the next run starts from a clean slate
+        :return: False if some processes could not be stopped
+        """
+        if self.stop_cmd is not None:
+            with suppress(subprocess.CalledProcessError):
+                launch_and_log(self.stop_cmd.split(" "))
+            self.supervisor.wait(get_global_conf().getfloat("trigger", "shutdown_timeout"))
+
+        return self.supervisor.stop()
+
     def run(self) -> int:
         """
         Main function. Calls every other one in order to make the bug trigger
@@ -255,36 +420,27 @@ class TriggerWithHelper(RawTrigger, metaclass=ABCMeta):
         """
         try:
             logging.verbose(self.cmd)
-            proc_start = self.Server(self.cmd)  # this is not a typo. Using cmd is REQUIRED for the sake of plugins
+            # this is not a typo. Using cmd is REQUIRED for the sake of plugins
+            proc_start = self.Server(self.cmd, self.supervisor)
             proc_start.start()
 
-            time.sleep(self.delay)
-
-            triggers = []
-            results_queue = multiprocessing.Queue()  # pylint: disable=no-member
-            for command in self.helper_commands:
-                # noinspection PyCallingNonCallable
-                triggers.append(self.helper(command, results=results_queue, **self.named_helper_args))
-
-            for thread in triggers:
-                thread.start()
-
-            for thread in triggers:
-                thread.join(self.timeout)
+            if not self.wait_until_ready():
+                return None
 
-            for thread in triggers:
-                thread.terminate()
+            commands = self.active_helper_commands
+            channel = ResultsChannel(len(commands))
+            # noinspection PyCallingNonCallable
+            helpers = [
+                self.helper(command, results=channel.slot(index), **self.active_helper_args)
+                for index, command in enumerate(commands)
+            ]
+            run_helpers(helpers, channel, self.timeout)
 
         finally:
-            with suppress(subprocess.CalledProcessError):
-                launch_and_log(self.stop_cmd.split(" "))
-
-        results = []
-        for _ in triggers:
-            with suppress(queue.Empty):
-                results.append(results_queue.get_nowait())
+            self.stop_server()
 
-        time.sleep(self.delay)
+        results = channel.results()
+        self.wait_until_stopped()
         return self.check_success(results=results)
 
 
@@ -293,6 +449,8 @@ class ApacheTrigger(TriggerWithHelper):
     """
     A trigger specifically designed for apache
     """
+    resources = [Port("port", option="listening_port")]
+
     @property  # pragma nocover
     @abstractmethod
     def error_pattern(self) -> str:
@@ -338,11 +496,14 @@ class ApacheTrigger(TriggerWithHelper):
         return _env_
 
     @property
-    def delay(self) -> int:
+    def probes(self) -> list:
         """
-        A delay of 2 should be sufficient for all apache's instance
+        Apache is up once it wrote its pidfile and accepts connections. It removes its pidfile when it exits
         """
-        return 2
+        return [
+            PidfileProbe(os.path.join(self.conf.getdir("install_directory"), "logs/httpd.pid")),
+            TcpProbe(self.resource("port"))
+        ]
 
     @property
     def named_helper_args(self) -> dict:
@@ -350,7 +511,7 @@ class ApacheTrigger(TriggerWithHelper):
         Adds the listening port and the number of iteration to do to the arguments passed to the helper
         """
         return {
-            "port": self.conf["listening_port"],
+            "port": self.resource("port"),
             "iterations": 1000
         }
 
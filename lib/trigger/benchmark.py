@@ -6,16 +6,18 @@ Benchmark helper for triggers. Each benchmark is linked to a trigger class from
 """
 
 from abc import abstractmethod, ABCMeta
-from contextlib import suppress
 import logging
-import multiprocessing
-import os
 import subprocess
-import timeit
 import time
+import timeit
 
-from lib.helper import launch_and_log, show_progress
+from lib.helper import show_progress
 from lib.parsers.configuration import get_global_conf
+from lib.stats import relative_precision, warmup_length
+from lib.trigger.channel import ResultsChannel, run_helpers
+from lib.trigger.load import LoadGenerator, LoadResult
+from lib.trigger.measures import Measure, measure_command
+from lib.trigger.placement import Placement
 
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
@@ -24,8 +26,12 @@ class RawBenchmark(metaclass=ABCMeta):
     """
     The base benchmarking class. Defines the bare minimum to run the benchmarks
     """
+    # whether the results are throughputs, for which higher is better, instead of timings
+    higher_is_better = False
+
     def __init__(self, trigger):
         self.trigger = trigger
+        self.__placement__ = None
 
     @abstractmethod
     def run(self, *args, **kwargs) -> int:
@@ -44,6 +50,13 @@ class RawBenchmark(metaclass=ABCMeta):
         """
         pass
 
+    @property
+    def placement(self) -> Placement:
+        """ Where to run the program and the helpers, set by [benchmark] program_cpus, helper_cpus and memory_limit """
+        if self.__placement__ is None:
+            self.__placement__ = Placement.from_conf()
+        return self.__placement__
+
     @property
     def expected_results(self) -> int:
         """ The number of positive results awaited """
@@ -59,21 +72,89 @@ class RawBenchmark(metaclass=ABCMeta):
         """ The total number of run kept """
         return get_global_conf().getint("benchmark", "kept_runs")
 
+    @property
+    def adaptive(self) -> bool:
+        """ Whether to sample until the results are precise enough instead of a fixed number of times """
+        return get_global_conf().getboolean("benchmark", "adaptive")
+
+    def needs_more_results(self, results: list, start_time: float) -> bool:
+        """
+        Checks whether more results are needed. In adaptive mode, this is until the confidence interval of the steady
+        state results is narrow enough or the time budget is spent
+        :param results: the results obtained so far
+        :param start_time: the time.monotonic() at which the benchmark started
+        :return: True if the benchmark should continue
+        """
+        if not self.adaptive:
+            return len(results) < self.expected_results
+
+        conf = get_global_conf()
+        if time.monotonic() - start_time > conf.getfloat("benchmark", "time_budget"):
+            logging.warning("Benchmark time budget spent, stopping with %(count)s results", dict(count=len(results)))
+            return False
+
+        # results can be Measures, which the statistics need as plain numbers
+        values = [float(result) for result in results]
+        steady_values = values[warmup_length(values):]
+        if len(steady_values) < conf.getint("benchmark", "minimum_results"):
+            return True
+
+        precision = relative_precision(
+            steady_values,
+            confidence=conf.getfloat("benchmark", "confidence"), statistic=conf.get("benchmark", "statistic")
+        )
+        return precision > conf.getfloat("benchmark", "target_precision")
+
+    def keep_results(self, results: list) -> int:
+        """
+        Stores the steady state results in the trigger, and the precision they achieved and the placement of the
+        processes in its returned_metadata
+        :param results: all the results obtained
+        :return: 0|1 on success|failure
+        """
+        self.trigger.returned_metadata["placement"] = self.placement.key
+        self.trigger.returned_metadata["higher_is_better"] = self.higher_is_better
+        if self.adaptive:
+            warmup = warmup_length([float(result) for result in results])
+        else:
+            if len(results) < self.expected_results:
+                return 1
+            warmup = self.expected_results - self.kept_runs
+
+        kept = results[warmup:]
+        if not kept:
+            return 1
+
+        conf = get_global_conf()
+        self.trigger.returned_information = kept
+        self.trigger.returned_metadata["warmup"] = warmup
+        self.trigger.returned_metadata["precision"] = relative_precision(
+            [float(result) for result in kept],
+            confidence=conf.getfloat("benchmark", "confidence"), statistic=conf.get("benchmark", "statistic")
+        )
+        return 0
+
 
 class BaseBenchmark(RawBenchmark):
     """
     Basic benchmarking class for program that require nothing external to trigger
     """
-    def benchmark_helper(self) -> None:
+    def benchmark_helper(self) -> Measure:
         """
-        Launches the trigger command
+        Launches the trigger command and measures the resources it used
         :raise subprocess.CalledProcessError
+        :return: the measure of the run
         """
-        subprocess.check_call(self.trigger.cmd.split(" "), stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        returncode, measure = measure_command(self.trigger.cmd.split(" "), preexec_fn=self.placement.preexec_fn())
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, self.trigger.cmd)
+
+        return measure
 
     def run(self, *args, **kwargs) -> int:
         """
-        Benchmarks the execution 20 times and stores the last 10 results (to avoid side effects) in self.trigger.result.
+        Benchmarks the execution 20 times and stores the last 10 measures (to avoid side effects) in
+        self.trigger.returned_information.
         Runs at most 100 times before deciding the run is a failure.
         :param args: additional arguments
         :param kwargs: additional keyword arguments
@@ -82,83 +163,127 @@ class BaseBenchmark(RawBenchmark):
         logging.verbose(self.trigger.cmd)
         results = []
         tries = 0
-        while len(results) < self.expected_results and tries < self.maximum_tries:
-            try:
-                results += timeit.repeat(self.benchmark_helper, repeat=1, number=1)
-            except subprocess.CalledProcessError:
-                logging.warning("A trigger failed, retrying one more time")
-            tries += 1
+        start_time = time.monotonic()
+        with self.placement:
+            while self.needs_more_results(results, start_time) and tries < self.maximum_tries:
+                try:
+                    results.append(self.benchmark_helper())
+                except subprocess.CalledProcessError:
+                    logging.warning("A trigger failed, retrying one more time")
+                tries += 1
 
-            show_progress(len(results), self.expected_results, section="trigger")
+                show_progress(len(results), self.expected_results, section="trigger")
 
-        if tries >= 100:
-            # We failed in 100 iterations
-            return 1
-
-        logging.verbose("Run times : %(time)s secs", dict(time=results))
-        self.trigger.returned_information = results[self.expected_results - self.kept_runs:]
-        return 0
+        logging.verbose("Run times : %(time)s secs", dict(time=[float(result) for result in results]))
+        return self.keep_results(results)
 
 
-class BenchmarkWithHelper(RawBenchmark):
+class ServerBenchmark(RawBenchmark, metaclass=ABCMeta):
     """
-    Benchmarking class for program with a client-server scheme
+    Base benchmarking class for client-server programs. Servers are either restarted for every measure or, if
+    [benchmark] persistent_server is set, kept alive across measures and only restarted when they crash
     """
-    def __init__(self, trigger) -> None:
-        super().__init__(trigger)
-        self.triggers = []
+    @property
+    def persistent_server(self) -> bool:
+        """ Whether to keep the server alive between measures """
+        return get_global_conf().getboolean("benchmark", "persistent_server")
 
-    def client_run(self) -> None:
+    @abstractmethod
+    def measure(self) -> (list, bool):
         """
-        Launches all client threads and waits for them to finish
-        :trigger lib.trigger.RawTrigger
+        Runs the clients once against a running server
+        :return: the measured values and whether the server behaved correctly
         """
-        for thread in self.triggers:
-            thread.start()
 
-        for thread in self.triggers:
-            thread.join()
+    def start_server(self) -> bool:
+        """
+        Cleans the server's logs, so that errors from a previous instance are not reported, starts the server and
+        waits for it to be ready
+        :return: False if the server did not come up
+        """
+        self.trigger.clean_logs()
+        proc_start = self.trigger.Server(
+            self.trigger.cmd, self.trigger.supervisor, self.placement.preexec_fn(self.trigger.__preexec_fn__)
+        )
+        proc_start.start()
+        return self.trigger.wait_until_ready()
 
-    def run(self, *args, **kwargs) -> int:
+    def stop_server(self) -> None:
         """
-        Benchmarks the execution time of 20 runs and stores the last 10 results (to avoid side effects) in
-        self.trigger.result.
-        Runs at most 100 times before deciding the run is a failure.
-        :param args: additional arguments
-        :param kwargs: additional keyword arguments
+        Stops the server and every process it left behind, and waits for it to exit
+        """
+        self.trigger.stop_server()
+        self.trigger.wait_until_stopped()
+
+    def persistent_run(self) -> int:
+        """
+        Measures rounds against a single server instance, restarting it only when a round fails. The first round after
+        each start is reported separately in self.trigger.returned_metadata["cold"]
+        :return: 0|1 on success|failure
+        """
+        results = []
+        cold = []
+        tries = 0
+        running = False
+        first_round = False
+        start_time = time.monotonic()
+
+        try:
+            while self.needs_more_results(results, start_time) and tries < self.maximum_tries:
+                tries += 1
+                if not running:
+                    first_round = True
+                    running = self.start_server()
+                    if not running:
+                        logging.warning("Server did not start, retrying")
+                        self.stop_server()
+                        continue
+
+                result, success = self.measure()
+                if not success:
+                    logging.warning("Trigger did not work, restarting the server")
+                    self.stop_server()
+                    running = False
+                    continue
+
+                if first_round:
+                    cold += result
+                    first_round = False
+                    continue
+
+                results += result
+                show_progress(len(results), self.expected_results, section="trigger")
+
+        finally:
+            if running:
+                self.stop_server()
+
+        logging.verbose("Warm results : %(warm)s, cold results : %(cold)s", dict(warm=results, cold=cold))
+        self.trigger.returned_metadata["cold"] = cold
+        return self.keep_results(results)
+
+    def restarting_run(self) -> int:
+        """
+        Measures rounds against a freshly started server each
         :return: 0|1 on success|failure
         """
         results = []
         tries = 0
+        start_time = time.monotonic()
 
-        while len(results) < self.expected_results and tries < self.maximum_tries:
+        while self.needs_more_results(results, start_time) and tries < self.maximum_tries:
             tries += 1
+            success = False
             try:
-                proc_start = self.trigger.Server(self.trigger.cmd)
-                proc_start.start()
+                if not self.start_server():
+                    logging.warning("Server did not start, retrying")
+                    continue
 
-                time.sleep(self.trigger.delay)
-                results_queue = multiprocessing.Queue()  # pylint: disable=no-member
-
-                self.triggers = []
-                for command in self.trigger.helper_commands:
-                    self.triggers.append(
-                        self.trigger.helper(command, results=results_queue, **self.trigger.named_helper_args)
-                    )
-
-                result = timeit.repeat(self.client_run, number=1, repeat=1)
+                result, success = self.measure()
             finally:
-                with suppress(subprocess.CalledProcessError):
-                    launch_and_log(self.trigger.stop_cmd.split(" "))
-
-                for thread in self.triggers:
-                    thread.terminate()
+                self.stop_server()
 
-            values = []
-            for _ in self.triggers:
-                values.append(results_queue.get_nowait())
-
-            if self.trigger.check_success(values) != 0:
+            if not success:
                 logging.warning("Trigger did not work, retrying")
                 continue
 
@@ -166,86 +291,110 @@ class BenchmarkWithHelper(RawBenchmark):
 
             show_progress(len(results), self.expected_results, section="trigger")
 
-            time.sleep(2)
-
-        if tries >= 100:
-            return 1
-
-        logging.verbose("Run times : {} secs".format(results))
-        self.trigger.returned_information = results[self.expected_results - self.kept_runs:]
-        return 0
-
+        logging.verbose("Results : %(results)s", dict(results=results))
+        return self.keep_results(results)
 
-class ApacheBenchmark(RawBenchmark):
-    """
-    Benchmarking class specific to Apache, using apache-bench utility
-    """
-    def run(self, *args, run_number: int=0, **kwargs) -> int:
+    def run(self, *args, **kwargs) -> int:
         """
-        Benchmarks the number of requests per second an apache server can handle
-        Runs at most 100 times before deciding the run is a failure
+        Benchmarks the server until [benchmark] wanted_results results are obtained, or until they are precise enough
+        in adaptive mode, and keeps the steady state ones in self.trigger.returned_information.
+        Runs at most [benchmark] maximum_tries times before deciding the run is a failure
         :param args: additional arguments
-        :param run_number: the number of time the benchmark has run
         :param kwargs: additional keyword arguments
-        :return: 0|1|None on success|failure|unexpected result
+        :return: 0|1 on success|failure
         """
-        proc_start = self.trigger.Server(self.trigger.cmd)
-        proc_start.start()
+        with self.placement:
+            if self.persistent_server:
+                return self.persistent_run()
+            return self.restarting_run()
 
-        time.sleep(self.trigger.delay)
-        cmd = "ab -n 30000 -c 1 {}".format(self.trigger.benchmark_url).split(" ")
-        logging.verbose(cmd)
-
-        try:
-            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT, **kwargs)
-        except subprocess.CalledProcessError as exc:
-            for line in exc.output.decode().split("\n"):
-                logging.debug(line)
-
-            return self.retry(*args, run_number=run_number, **kwargs)
-
-        else:
-            success = self.trigger.check_success()
-            if success:
-                return self.retry(*args, run_number=run_number, **kwargs)
 
-            self.trigger.result = []
-            for line in output.decode().split("\n"):
-                if line.startswith("Requests per second:"):
-                    self.trigger.returned_information = [float(line.split(":")[1].strip().split(" ")[0])]
-
-            with suppress(subprocess.CalledProcessError):
-                launch_and_log(self.trigger.stop_cmd.split(" "))
+class BenchmarkWithHelper(ServerBenchmark):
+    """
+    Benchmarking class for program with a client-server scheme
+    """
+    def measure(self) -> (list, bool):
+        """
+        Runs and times the helpers once. When they succeed, the time each helper that reported took is added to
+        self.trigger.returned_metadata["helpers"], which the benchmark plugin stores with the run
+        :return: the run time and whether the helpers got the expected results
+        """
+        commands = self.trigger.active_helper_commands
+        channel = ResultsChannel(len(commands))
+        helpers = [
+            self.trigger.helper(command, results=channel.slot(index), **self.trigger.active_helper_args)
+            for index, command in enumerate(commands)
+        ]
+
+        result = timeit.repeat(lambda: run_helpers(helpers, channel), number=1, repeat=1)
+        success = self.trigger.check_success(channel.results()) == 0
+        if success:
+            self.trigger.returned_metadata.setdefault("helpers", []).extend(
+                duration for duration in channel.durations() if duration is not None
+            )
+        return result, success
+
+
+class ApacheBenchmark(ServerBenchmark):
+    """
+    Benchmarking class specific to Apache. Requests are sent by the built-in load generator, at each of the
+    [benchmark] http_concurrency levels, either as fast as apache answers or at [benchmark] http_rate requests per
+    second. The throughput at the first level is the result of each measure, while the latency percentiles and the
+    throughput at every level of the last measure are kept in self.trigger.returned_metadata["curve"], which the
+    benchmark plugin stores with the run
+    """
+    higher_is_better = True
 
-            if len(self.trigger.returned_information) == 0:
-                return self.retry(*args, run_number=run_number, **kwargs)
+    @property
+    def concurrency_levels(self) -> list:
+        """ The numbers of concurrent clients with which to measure apache """
+        return [int(level) for level in get_global_conf().getlist("benchmark", "http_concurrency")]
 
-        logging.verbose("Requests per second : {}".format(self.trigger.returned_information[0]))
+    @property
+    def requests(self) -> int:
+        """ The number of requests to send at each concurrency level """
+        return get_global_conf().getint("benchmark", "http_requests")
 
-        return success
+    @property
+    def rate(self) -> float:
+        """ The number of requests to send per second, None to send them as fast as possible """
+        return get_global_conf().getfloat("benchmark", "http_rate") or None
 
-    def retry(self, *args, run_number: int=0, **kwargs) -> int:
+    def load(self, concurrency: int) -> LoadResult:
         """
-        Updates the number of time the program has run and relaunches it
-
-        :param args: additional arguments
-        :param run_number: the number of time the benchmark has run
-        :param kwargs: additional keyword arguments
-        :return: 0|1|None on success|failure|unexpected result
+        Sends requests to the server from the given number of clients
+        :param concurrency: the number of concurrent clients
+        :return: the result of the load
         """
-        with suppress(subprocess.CalledProcessError):
-            launch_and_log(self.trigger.stop_cmd.split(" "))
-
-            with suppress(FileNotFoundError), \
-                    open(os.path.join(self.trigger.conf.getdir("install", "install_directory"))) as httpd_pid:
-                pid = int(httpd_pid.read())
-                launch_and_log(["kill", str(pid)])
-
-        run_number += 1
-        if run_number > self.maximum_tries:
-            return 1
-
-        logging.warning("An error occurred while launching apache, retrying")
+        return LoadGenerator(
+            [self.trigger.benchmark_url], concurrency=concurrency, requests=self.requests, rate=self.rate,
+            max_errors=0
+        ).run()
 
-        self.trigger.clean_logs()
-        return self.run(*args, run_number=run_number, **kwargs)
+    def measure(self) -> (list, bool):
+        """
+        Loads the server once at every concurrency level
+        :return: the number of requests per second at the first level and whether all requests were answered without
+                 apache logging an error
+        """
+        curve = []
+        for concurrency in self.concurrency_levels:
+            result = self.load(concurrency)
+            if result.errors:
+                logging.debug("%(errors)s requests failed with %(concurrency)s clients",
+                              dict(errors=result.errors, concurrency=concurrency))
+                return [], False
+
+            point = dict(concurrency=concurrency, throughput=result.throughput, statuses=dict(result.statuses))
+            point.update(result.histogram.summary())
+            logging.verbose(
+                "%(concurrency)s clients : %(throughput).1f requests per second, latency p50 %(p50).6f, "
+                "p90 %(p90).6f, p99 %(p99).6f, p999 %(p999).6f secs", point
+            )
+            curve.append(point)
+
+        if not curve:
+            return [], False
+
+        self.trigger.returned_metadata["curve"] = curve
+        return [curve[0]["throughput"]], not self.trigger.check_success()
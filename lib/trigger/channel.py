@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+A channel for helpers to report their result to the trigger. Each helper owns a slot of an array in shared memory,
+allocated before the helpers start, so that results are written in place and can all be read once the helpers exited,
+whether they ended by themselves or were terminated
+"""
+
+import ctypes
+import multiprocessing
+import time
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+EMPTY, VALUE, NONE = 0, 1, 2
+
+
+class Slot(ctypes.Structure):  # pylint: disable=too-few-public-methods
+    """
+    The result of a helper, as stored in shared memory. The state is written last, a slot being complete as soon as it
+    is not EMPTY
+    """
+    _fields_ = [("state", ctypes.c_int), ("value", ctypes.c_double), ("start", ctypes.c_double),
+                ("end", ctypes.c_double)]
+
+
+class ResultSlot:
+    """
+    The end of the channel given to a helper. It has the put() method of a queue, each helper putting a single result
+
+    :param slots: the shared array of slots
+    :param index: the slot of the helper
+    """
+    def __init__(self, slots, index: int):
+        self.slots = slots
+        self.index = index
+
+    def put(self, value: float or None) -> None:
+        """
+        Reports the result of the helper, and the time at which it finished
+
+        :param value: a number or None
+        :raise TypeError|ValueError if the value is not a number
+        """
+        slot = self.slots[self.index]
+        if value is None:
+            slot.state = NONE
+            slot.end = time.monotonic()
+            return
+
+        slot.value = float(value)
+        slot.end = time.monotonic()
+        slot.state = VALUE
+
+
+class ResultsChannel:
+    """
+    The results of a set of helpers, with the time each of them took. Times are taken from the monotonic clock, which
+    is shared by all processes of the machine
+
+    :param size: the number of helpers
+    """
+    def __init__(self, size: int):
+        self.slots = multiprocessing.RawArray(Slot, size)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def slot(self, index: int) -> ResultSlot:
+        """
+        :param index: the index of a helper
+        :return: the end of the channel to give to this helper
+        """
+        return ResultSlot(self.slots, index)
+
+    def started(self, index: int) -> None:
+        """
+        Records that a helper is starting
+
+        :param index: the index of the helper
+        """
+        self.slots[index].start = time.monotonic()
+
+    def results(self) -> list:
+        """
+        :return: the results of the helpers that reported one, in the order of the helpers
+        """
+        return [None if slot.state == NONE else slot.value for slot in self.slots if slot.state != EMPTY]
+
+    def durations(self) -> list:
+        """
+        :return: the time each helper took to report its result, in seconds, None for helpers that did not report one
+        """
+        return [slot.end - slot.start if slot.state != EMPTY else None for slot in self.slots]
+
+
+def run_helpers(helpers: list, channel: ResultsChannel, timeout: float=None) -> None:
+    """
+    Runs helpers to completion, terminating those still running after the timeout. Every helper has exited when this
+    returns, so that the channel holds all the results that were reported
+
+    :param helpers: the helper processes, the one at index i reporting in slot i of the channel
+    :param channel: the channel of the helpers
+    :param timeout: the time to wait for each helper, in seconds, None to wait until they finish
+    """
+    try:
+        for index, helper in enumerate(helpers):
+            channel.started(index)
+            helper.start()
+
+        for helper in helpers:
+            helper.join(timeout)
+    finally:
+        for helper in helpers:
+            if helper.is_alive():
+                helper.terminate()
+            if helper.pid is not None:
+                helper.join()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Collection of the coredumps of triggered bugs. The arrival of a core is waited for with inotify instead of guessing how
+long the kernel takes to write it, and cores are archived once per distinct crash, identified by the hash of their stack
+"""
+
+from contextlib import suppress
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import shutil
+import struct
+import time
+
+from lib.configuration.core_handler import metadata_path
+from lib.installer.context_managers import FileLock
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+EVENT = struct.Struct("iIII")
+
+
+class DirectoryWatcher:
+    """
+    Notifies of files appearing in a directory, with inotify
+
+    :param directory: the directory to watch
+    :raise OSError if inotify is not available
+    """
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        try:
+            self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except AttributeError:
+            raise OSError("inotify is not available")
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Could not initialize inotify")
+
+        if libc.inotify_add_watch(self.fd, directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "Could not watch {}".format(directory))
+
+    def wait(self, timeout: float) -> list:
+        """
+        Waits for files to appear
+
+        :param timeout: the maximum time to wait, in seconds
+        :return: the names of the files that appeared or were written, empty if none did in time
+        """
+        readable, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not readable:
+            return []
+
+        names = []
+        with suppress(BlockingIOError):
+            data = os.read(self.fd, 64 * 1024)
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT.unpack_from(data, offset)
+                names.append(data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0").decode())
+                offset += EVENT.size + length
+        return names
+
+    def close(self) -> None:
+        """
+        Stops watching the directory
+        """
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    # noinspection PyUnusedLocal
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def wait_for_core(paths: list, timeout: float) -> str:
+    """
+    Waits for one of the given cores to appear. All of them must be in the same directory
+
+    :param paths: the paths where the core may appear, in order of preference
+    :param timeout: the maximum time to wait, in seconds
+    :return: the path of the core, None if none appeared in time
+    """
+    def found():
+        for path in paths:
+            if os.path.isfile(path):
+                return path
+        return None
+
+    directory = os.path.dirname(paths[0])
+    if not os.path.isdir(directory):
+        return None
+
+    deadline = time.monotonic() + timeout
+    try:
+        watcher = DirectoryWatcher(directory)
+    except OSError as exc:
+        logging.debug("Cannot use inotify, polling for cores instead : %(error)s", dict(error=exc))
+        while found() is None and time.monotonic() < deadline:
+            time.sleep(get_global_conf().getfloat("trigger", "probe_interval"))
+        return found()
+
+    with watcher:
+        # checking after the watch is set, for no core to be missed in between
+        while found() is None and time.monotonic() < deadline:
+            watcher.wait(deadline - time.monotonic())
+        return found()
+
+
+def core_metadata(core: str) -> dict:
+    """
+    :param core: the path of a core
+    :return: the description of the crash written by the core handler, empty if there is none
+    """
+    with suppress(OSError, ValueError):
+        with open(metadata_path(core)) as _file_:
+            return json.load(_file_)
+    return {}
+
+
+def remove_core(core: str) -> None:
+    """
+    Removes a core and its description
+
+    :param core: the path of the core
+    """
+    for path in [core, metadata_path(core)]:
+        with suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def archive_core(core: str, directory: str) -> str:
+    """
+    Moves a core to the archive of a bug, unless a core of the same crash is already there. The number of times each
+    crash was seen is kept in crashes.json in the archive
+
+    :param core: the path of the core
+    :param directory: the archive of the bug
+    :return: the path of the archived core of this crash
+    """
+    os.makedirs(directory, exist_ok=True)
+    metadata = core_metadata(core)
+    stack_hash = metadata.get("stack_hash")
+
+    if stack_hash is None:
+        destination = os.path.join(directory, os.path.basename(core))
+        shutil.move(core, destination)
+        with suppress(FileNotFoundError):
+            shutil.move(metadata_path(core), metadata_path(destination))
+        return destination
+
+    with FileLock(os.path.join(directory, ".crashes.lock")):
+        index_path = os.path.join(directory, "crashes.json")
+        crashes = {}
+        with suppress(OSError, ValueError):
+            with open(index_path) as _file_:
+                crashes = json.load(_file_)
+
+        crash = crashes.setdefault(stack_hash, {"count": 0, "signal": metadata.get("signal")})
+        crash["count"] += 1
+        crash["last_seen"] = metadata.get("time", time.time())
+
+        destination = os.path.join(directory, crash.get("core", "{}-{}".format(stack_hash, os.path.basename(core))))
+        if os.path.exists(destination):
+            logging.verbose("Crash %(hash)s was already archived, dropping its core", dict(hash=stack_hash))
+            remove_core(core)
+        else:
+            shutil.move(core, destination)
+            with suppress(FileNotFoundError):
+                shutil.move(metadata_path(core), metadata_path(destination))
+            crash["core"] = os.path.basename(destination)
+
+        with open(index_path, "w") as _file_:
+            json.dump(crashes, _file_, indent=4, sort_keys=True)
+
+    return destination
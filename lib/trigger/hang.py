@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Detection of deadlocked processes from /proc. A process is deadlocked when all its threads are asleep waiting on a
+futex and it did not use any cpu time for a while. The exit of the process is waited for on a pidfd between samples, so
+that it is noticed at once
+"""
+
+from contextlib import suppress
+import logging
+import os
+import platform
+import select
+import subprocess
+import time
+
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+# numbers of the futex and futex_waitv system calls
+FUTEX_SYSCALLS = {
+    "x86_64": {202, 449},
+    "aarch64": {98, 449},
+    "i386": {240, 449},
+    "i686": {240, 449},
+    "armv7l": {240, 449},
+}
+
+
+class ThreadSample:  # pylint: disable=too-few-public-methods
+    """
+    The state of a thread at some point
+
+    :param state: the scheduling state of the thread, as in /proc/<pid>/stat
+    :param cpu_time: the cpu time used by the thread, in clock ticks
+    :param wchan: the kernel function the thread is waiting in, None if unknown
+    :param syscall: the number of the system call the thread is blocked in, None if it is running or unknown
+    """
+    def __init__(self, state: str, cpu_time: int, wchan: str=None, syscall: int=None):
+        self.state = state
+        self.cpu_time = cpu_time
+        self.wchan = wchan
+        self.syscall = syscall
+
+    @property
+    def waiting_on_futex(self) -> bool:
+        """
+        Whether the thread sleeps on a futex. A sleeping thread for which the kernel does not tell where it waits is
+        considered to
+        """
+        if self.state != "S":
+            return False
+        if self.wchan is None and self.syscall is None:
+            return True
+        return "futex" in (self.wchan or "") or self.syscall in FUTEX_SYSCALLS.get(platform.machine(), set())
+
+
+def read_thread(task: str) -> ThreadSample:
+    """
+    :param task: the /proc directory of the thread
+    :raise OSError if the thread does not exist anymore
+    :return: the current state of the thread
+    """
+    with open(os.path.join(task, "stat")) as _file_:
+        # the name of the program, in parentheses, can contain spaces
+        fields = _file_.read().rpartition(")")[2].split()
+    sample = ThreadSample(fields[0], int(fields[11]) + int(fields[12]))
+
+    with suppress(OSError):
+        with open(os.path.join(task, "wchan")) as _file_:
+            wchan = _file_.read().strip()
+        if wchan not in ("", "0"):
+            sample.wchan = wchan
+
+    with suppress(OSError, ValueError, IndexError):
+        with open(os.path.join(task, "syscall")) as _file_:
+            sample.syscall = int(_file_.read().split()[0])
+
+    return sample
+
+
+def read_threads(pid: int) -> dict:
+    """
+    :param pid: the process to inspect
+    :return: the state of each thread of the process by thread id, empty if the process does not exist anymore
+    """
+    threads = {}
+    tasks = "/proc/{}/task".format(pid)
+    with suppress(OSError):
+        for tid in os.listdir(tasks):
+            with suppress(OSError, ValueError, IndexError):
+                threads[int(tid)] = read_thread(os.path.join(tasks, tid))
+    return threads
+
+
+class HangDetector:
+    """
+    Watches a process for deadlocks
+
+    :param pid: the process to watch
+    :param timeout: how long the process must stay blocked to be deadlocked, in seconds, [trigger] hang_timeout by
+                    default
+    :param interval: the time between two samples of the process, in seconds, [trigger] probe_interval by default
+    """
+    def __init__(self, pid: int, timeout: float=None, interval: float=None):
+        self.pid = pid
+        self.timeout = timeout if timeout is not None else get_global_conf().getfloat("trigger", "hang_timeout")
+        self.interval = interval if interval is not None else get_global_conf().getfloat("trigger", "probe_interval")
+        self.__previous__ = None
+        self.__blocked_since__ = None
+
+    def blocked(self) -> bool:
+        """
+        Samples the process
+        :return: whether all its threads wait on a futex and none used cpu time since the last sample
+        """
+        threads = read_threads(self.pid)
+        cpu_times = {tid: thread.cpu_time for tid, thread in threads.items()}
+        progressed = cpu_times != self.__previous__
+        self.__previous__ = cpu_times
+
+        return bool(threads) and not progressed and all(thread.waiting_on_futex for thread in threads.values())
+
+    def sample(self) -> bool:
+        """
+        Samples the process
+        :return: whether the process has been blocked for longer than the timeout
+        """
+        now = time.monotonic()
+        if not self.blocked():
+            self.__blocked_since__ = None
+            return False
+
+        if self.__blocked_since__ is None:
+            self.__blocked_since__ = now
+        return now - self.__blocked_since__ >= self.timeout
+
+    def wait(self, process: subprocess.Popen) -> bool:
+        """
+        Waits for the process to either exit or deadlock
+
+        :param process: the watched process
+        :return: True if the process deadlocked, False if it exited
+        """
+        descriptor = None
+        with suppress(AttributeError, OSError):
+            descriptor = os.pidfd_open(process.pid)
+
+        try:
+            while process.poll() is None:
+                if self.sample():
+                    logging.verbose("Process %(pid)s is deadlocked", dict(pid=self.pid))
+                    return True
+
+                if descriptor is not None:
+                    select.select([descriptor], [], [], self.interval)
+                else:
+                    time.sleep(self.interval)
+            return False
+        finally:
+            if descriptor is not None:
+                os.close(descriptor)
@@ -7,10 +7,13 @@ Helpers for trigger requiring client-server operations
 
 
 from abc import abstractmethod, ABCMeta
-from http.client import BadStatusLine, IncompleteRead
 import logging
 import multiprocessing
 
+from lib.parsers.configuration import get_global_conf
+from lib.trigger.channel import ResultSlot
+from lib.trigger.load import LoadGenerator
+
 
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
@@ -29,38 +32,41 @@ class BaseHelper(multiprocessing.Process, metaclass=ABCMeta):  # pylint: disable
 
 class UrlFetcherHelper(BaseHelper):  # pylint: disable=too-few-public-methods
     """
-    A Helper that fetches a http address in loop
+    A Helper that fetches a http address in loop, from [trigger] load_concurrency clients keeping their connection
+    alive, at [trigger] load_rate requests per second if set
     """
-    def __init__(self, url: str, iterations: int=1, **kwargs) -> None:
+    def __init__(self, url: str, iterations: int=1, results: ResultSlot=None, **kwargs) -> None:
         """
         Sets up the threading pool and assigns the values to be able to use them later
         :param url: the url to fetch
         :param iterations: how many time to fetch it
+        :param results: the slot of the results channel in which to put the number of requests answered, if any
         :param kwargs: others arguments to pass. Will be added in formatting the url
         """
         super().__init__()
         self.url = url
         self.iterations = iterations
+        self.results = results
         self.kwargs = kwargs
 
     def run(self) -> None:
         """
         Fetches the url given by init a given number of time. Formats each url with the number of iteration as
-         {iteration} and adds it the kwargs from init
+         {iteration} and adds it the kwargs from init. Gives up after 20 failed requests, the server having probably
+         crashed
         """
-        import requests
-        from requests import exceptions
+        result = LoadGenerator(
+            [self.url],
+            concurrency=get_global_conf().getint("trigger", "load_concurrency"),
+            requests=self.iterations,
+            rate=get_global_conf().getfloat("trigger", "load_rate") or None,
+            max_errors=20,
+            **self.kwargs
+        ).run()
 
-        logging.getLogger("requests").setLevel(logging.WARNING)
-        logging.getLogger("urllib3").setLevel(logging.WARNING)
-        error_counter = 0
-        for i in range(self.iterations):
-            try:
-                requests.get(self.url.format(iteration=i, **self.kwargs))
-            except (BadStatusLine, IncompleteRead, ConnectionResetError, requests.exceptions.ChunkedEncodingError,
-                    exceptions.ConnectionError):
-                error_counter += 1
+        logging.debug("%(url)s : %(requests)s requests, %(errors)s errors, latencies %(latencies)s", dict(
+            url=self.url, requests=result.requests, errors=result.errors, latencies=result.histogram.summary()
+        ))
 
-                if error_counter > 20:
-                    break
-        return
+        if self.results is not None:
+            self.results.put(result.requests)
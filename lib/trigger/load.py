@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+An asynchronous HTTP load generator. Each client keeps its connections alive between requests, clients run
+concurrently in a single process, either as fast as the server answers (closed loop) or at a fixed request rate (open
+loop), and the latency of every request is recorded in a histogram
+"""
+
+import asyncio
+from collections import Counter
+import math
+import random
+import time
+from urllib.parse import urlsplit
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies with logarithmic buckets, each one 1% wider than the previous one. Percentiles are thus
+    known within 1% whatever the range of values, in constant memory
+
+    :param precision: the relative width of the buckets
+    """
+    def __init__(self, precision: float=0.01):
+        self.precision = precision
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+
+    def bucket(self, value: float) -> int:
+        """
+        :param value: a latency, in seconds
+        :return: the index of the bucket in which the latency falls
+        """
+        return math.floor(math.log(max(value, 1e-9)) / math.log1p(self.precision))
+
+    def record(self, value: float) -> None:
+        """
+        Adds a latency to the histogram
+
+        :param value: the latency, in seconds
+        """
+        self.buckets[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other) -> None:
+        """
+        Adds the latencies of another histogram with the same precision to this one
+
+        :param other: the histogram to add
+        """
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def mean(self) -> float:
+        """
+        The mean latency, in seconds
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """
+        :param percentile: the percentile wanted, between 0 and 100
+        :return: the latency under which this percentage of requests were answered, in seconds
+        """
+        if not self.count:
+            return 0.0
+
+        rank = math.ceil(percentile / 100 * self.count)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.maximum, max(self.minimum, (1 + self.precision) ** (bucket + 1)))
+        return self.maximum
+
+    def summary(self) -> dict:
+        """
+        :return: the usual statistics of the latencies, in seconds
+        """
+        return {
+            "count": self.count, "mean": self.mean, "min": self.minimum if self.count else 0.0, "max": self.maximum,
+            "p50": self.percentile(50), "p90": self.percentile(90), "p99": self.percentile(99),
+            "p999": self.percentile(99.9)
+        }
+
+
+class LoadResult:  # pylint: disable=too-few-public-methods
+    """
+    The outcome of a load generation
+
+    :param histogram: the latencies of successful requests
+    :param errors: the number of requests that failed
+    :param statuses: the number of responses for each HTTP status
+    :param elapsed: the duration of the run, in seconds
+    """
+    def __init__(self, histogram: LatencyHistogram, errors: int, statuses: Counter, elapsed: float):
+        self.histogram = histogram
+        self.errors = errors
+        self.statuses = statuses
+        self.elapsed = elapsed
+
+    @property
+    def requests(self) -> int:
+        """
+        The number of requests that got an answer
+        """
+        return self.histogram.count
+
+    @property
+    def throughput(self) -> float:
+        """
+        The number of requests answered per second
+        """
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+
+class HttpConnection:
+    """
+    A persistent HTTP/1.1 connection to a server
+
+    :param host: the host to connect to
+    :param port: the port to connect to
+    """
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.served = 0
+
+    async def open(self) -> None:
+        """
+        Connects to the server if the connection is not open
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    def close(self) -> None:
+        """
+        Closes the connection, a new one being opened on the next request
+        """
+        if self.writer is not None:
+            self.writer.close()
+        self.reader, self.writer = None, None
+        self.served = 0
+
+    async def read_body(self, status: int, headers: dict, closing: bool) -> None:
+        """
+        Reads the body of a response and discards it. Without a length, the body only ends with the connection, which
+        is then read to its end if the server is closing it and otherwise deemed empty
+
+        :param status: the status of the response, 1xx, 204 and 304 responses having no body
+        :param headers: the headers of the response, with lower case names
+        :param closing: whether the server closes the connection after this response
+        """
+        if status < 200 or status in (204, 304):
+            return
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    return
+
+        elif "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+
+        elif closing:
+            await self.reader.read()
+
+    async def get(self, target: str) -> int:
+        """
+        Sends a GET request and reads the whole response
+
+        :param target: the path and query to request
+        :raise ConnectionError|asyncio.IncompleteReadError|ValueError if the server does not answer correctly
+        :return: the status of the response
+        """
+        await self.open()
+        self.writer.write(
+            "GET {} HTTP/1.1\r\nHost: {}:{}\r\nConnection: keep-alive\r\n\r\n".format(target, self.host, self.port)
+            .encode()
+        )
+        await self.writer.drain()
+
+        while True:
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionResetError("The server closed the connection")
+            version, status = status_line.split(b" ")[:2]
+            status = int(status)
+
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            if status >= 200:
+                break
+
+        # HTTP/1.0 servers close the connection unless they explicitly keep it alive
+        connection = headers.get("connection", "").lower()
+        closing = connection == "close" or (version == b"HTTP/1.0" and connection != "keep-alive")
+        await self.read_body(status, headers, closing)
+        self.served += 1
+        if closing:
+            self.close()
+        return status
+
+
+class LoadGenerator:
+    """
+    Sends HTTP requests from concurrent clients, each one reusing its connections. Urls are picked from the given mix
+    and formatted with the index of the request as {iteration} and the additional keyword arguments. Without a rate,
+    each client sends its next request as soon as it gets an answer. With a rate, requests are sent on a fixed
+    schedule and their latency counts from when they should have been sent, so that a slow server is not hidden by
+    clients waiting for it
+
+    :param urls: the urls to request
+    :param concurrency: the number of concurrent clients
+    :param requests: the number of requests to send in total, None to only stop after duration
+    :param duration: the maximum duration of the run in seconds, None to only stop after the number of requests
+    :param rate: the number of requests to send per second, None to send them as fast as possible
+    :param weights: the relative frequency of each url, all urls being as frequent by default
+    :param max_errors: the number of failed requests after which to stop, None to never stop
+    :param timeout: the time to wait for a response, in seconds
+    :param seed: the seed used to pick urls
+    :param url_kwargs: values to format the urls with
+    """
+    def __init__(self, urls: list, concurrency: int=1, requests: int=None, duration: float=None, rate: float=None,
+                 weights: list=None, max_errors: int=None, timeout: float=30, seed: int=0, **url_kwargs):
+        if requests is None and duration is None:
+            raise ValueError("A number of requests or a duration is needed to know when to stop")
+
+        self.urls = urls
+        self.concurrency = max(1, concurrency)
+        self.requests = requests
+        self.duration = duration
+        self.rate = rate
+        self.weights = weights
+        self.max_errors = max_errors
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.url_kwargs = url_kwargs
+
+        self.__next_request__ = 0
+        self.__start__ = None
+        self.__errors__ = 0
+        self.__statuses__ = Counter()
+        self.__histogram__ = LatencyHistogram()
+
+    def next_request(self) -> (int, str):
+        """
+        Takes the next request to send
+
+        :return: the index of the request and its url, or None if there are no more requests to send
+        """
+        index = self.__next_request__
+        if self.requests is not None and index >= self.requests:
+            return None
+        if self.duration is not None and time.monotonic() - self.__start__ >= self.duration:
+            return None
+        if self.max_errors is not None and self.__errors__ > self.max_errors:
+            return None
+
+        self.__next_request__ += 1
+        url = self.random.choices(self.urls, weights=self.weights)[0]
+        return index, url.format(iteration=index, **self.url_kwargs)
+
+    async def send(self, connection: HttpConnection, target: str) -> int:
+        """
+        Sends a request on a connection. A connection that already served requests may have been closed by the server
+        in the meantime, the request is then sent again on a new connection
+
+        :param connection: the connection to use
+        :param target: the path and query to request
+        :return: the status of the response, None if the request failed
+        """
+        while True:
+            reused = connection.served > 0
+            try:
+                return await asyncio.wait_for(connection.get(target), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+                connection.close()
+                if not reused:
+                    return None
+
+    async def client(self) -> None:
+        """
+        Sends requests until there are none left
+        """
+        connections = {}
+        try:
+            while True:
+                request = self.next_request()
+                if request is None:
+                    return
+
+                index, url = request
+                sent = time.monotonic()
+                if self.rate:
+                    sent = self.__start__ + index / self.rate
+                    await asyncio.sleep(max(0.0, sent - time.monotonic()))
+
+                parts = urlsplit(url)
+                origin = (parts.hostname, parts.port or 80)
+                connection = connections.setdefault(origin, HttpConnection(*origin))
+                status = await self.send(connection, (parts.path or "/") + ("?" + parts.query if parts.query else ""))
+                if status is None:
+                    self.__errors__ += 1
+                    continue
+
+                self.__histogram__.record(time.monotonic() - sent)
+                self.__statuses__[status] += 1
+        finally:
+            for connection in connections.values():
+                connection.close()
+
+    async def __run__(self) -> LoadResult:
+        """
+        Runs all the clients
+        :return: the result of the run
+        """
+        self.__start__ = time.monotonic()
+        await asyncio.gather(*[self.client() for _ in range(self.concurrency)])
+        return LoadResult(self.__histogram__, self.__errors__, self.__statuses__, time.monotonic() - self.__start__)
+
+    def run(self) -> LoadResult:
+        """
+        Sends all the requests
+        :return: the result of the run
+        """
+        return asyncio.run(self.__run__())
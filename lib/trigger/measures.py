@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Resource accounting for benchmarked processes
+"""
+
+from collections import namedtuple
+import os
+import subprocess
+import time
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class Measure(namedtuple("Measure", [
+        "wall_time", "user_time", "system_time", "max_rss", "voluntary_switches", "involuntary_switches"
+])):
+    """
+    The resources used by a single run of a program. Times are in seconds, max_rss in kilobytes. Converting a measure
+    to float gives its wall time, so that it can be used where plain timings are expected
+    """
+    __slots__ = ()
+
+    def __float__(self) -> float:
+        return self.wall_time
+
+    @property
+    def cpu_time(self) -> float:
+        """ The total cpu time used, in user and kernel space """
+        return self.user_time + self.system_time
+
+
+def measure_command(cmd: list or str, **kwargs) -> (int, Measure):
+    """
+    Runs the command to completion, and measures the resources it and all its waited for children used. The child is
+    reaped with os.wait4, so the accounting is exact even when other processes are running concurrently
+
+    :param cmd: the command to run, passed to subprocess.Popen
+    :param kwargs: additional keyword arguments to pass to subprocess.Popen
+    :return: the return code of the command and its measure
+    """
+    kwargs.setdefault("stdout", subprocess.DEVNULL)
+    kwargs.setdefault("stderr", subprocess.DEVNULL)
+
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, **kwargs)
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start
+
+    # the process was reaped by wait4, subprocess must not try to wait for it anymore
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    return process.returncode, Measure(
+        wall_time=wall_time,
+        user_time=rusage.ru_utime,
+        system_time=rusage.ru_stime,
+        max_rss=rusage.ru_maxrss,
+        voluntary_switches=rusage.ru_nvcsw,
+        involuntary_switches=rusage.ru_nivcsw
+    )
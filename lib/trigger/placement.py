@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Placement of benchmarked processes on the machine. The program under test runs on its own cpus, while bugbase and the
+helpers generating load run on others, and the memory of the program can be limited with a cgroup. The placement is
+recorded with the results, so that only measures taken under the same conditions are compared
+"""
+
+from contextlib import suppress
+import json
+import logging
+import os
+import uuid
+
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+def parse_cpus(text: str) -> list:
+    """
+    :param text: a list of cpus, as 0-3,6
+    :raise ValueError if the list is malformed
+    :return: the sorted cpu numbers
+    """
+    cpus = set()
+    for part in text.replace(" ", "").split(","):
+        if part:
+            first, _, last = part.partition("-")
+            cpus.update(range(int(first), int(last or first) + 1))
+    return sorted(cpus)
+
+
+def format_cpus(cpus: list) -> str:
+    """
+    :param cpus: cpu numbers
+    :return: the cpus as a list of ranges, as 0-3,6
+    """
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(first) if first == last else "{}-{}".format(first, last) for first, last in ranges)
+
+
+class MemoryCGroup:
+    """
+    A cgroup v2 limiting the memory the processes put in it can use
+
+    :param limit: the memory limit, in MiB
+    :param root: where the cgroup v2 hierarchy is mounted
+    """
+    def __init__(self, limit: int, root: str="/sys/fs/cgroup"):
+        self.limit = limit
+        self.root = root
+        self.path = os.path.join(root, "bugbase-{}".format(uuid.uuid4().hex[:12]))
+
+    def create(self) -> bool:
+        """
+        Creates the cgroup, enabling the memory controller for it if needed
+        :return: False if the memory controller cannot be used
+        """
+        try:
+            with open(os.path.join(self.root, "cgroup.controllers")) as _file_:
+                if "memory" not in _file_.read().split():
+                    raise OSError("The memory controller is not available")
+
+            with open(os.path.join(self.root, "cgroup.subtree_control")) as _file_:
+                enabled = _file_.read().split()
+            if "memory" not in enabled:
+                with open(os.path.join(self.root, "cgroup.subtree_control"), "w") as _file_:
+                    _file_.write("+memory")
+
+            os.mkdir(self.path)
+            with open(os.path.join(self.path, "memory.max"), "w") as _file_:
+                _file_.write(str(self.limit * 1024 ** 2))
+        except OSError as exc:
+            logging.warning("Cannot limit memory with a cgroup, running without limit : %(error)s", dict(error=exc))
+            self.remove()
+            return False
+
+        return True
+
+    def join(self) -> None:
+        """
+        Moves the calling process to the cgroup
+        """
+        with open(os.path.join(self.path, "cgroup.procs"), "w") as _file_:
+            _file_.write("0")
+
+    def remove(self) -> None:
+        """
+        Removes the cgroup, once all its processes exited
+        """
+        with suppress(OSError):
+            os.rmdir(self.path)
+
+
+class Placement:
+    """
+    Pins the program under test and the helpers to separate cpus, and limits the memory of the program. While the
+    placement is entered, bugbase itself runs on the helper cpus, which the helpers it starts inherit, and programs
+    started with its preexec_fn run on the program cpus
+
+    :param program_cpus: the cpus on which to run the program, all by default
+    :param helper_cpus: the cpus on which to run bugbase and the helpers, the ones not given to the program by default
+    :param memory_limit: the memory the program can use, in MiB, None for no limit
+    :raise ValueError if some cpus are not available to bugbase
+    """
+    def __init__(self, program_cpus: list=None, helper_cpus: list=None, memory_limit: int=None):
+        available = os.sched_getaffinity(0)
+        unavailable = (set(program_cpus or []) | set(helper_cpus or [])) - available
+        if unavailable:
+            raise ValueError("Cpus {} are not available".format(format_cpus(unavailable)))
+
+        if program_cpus and not helper_cpus:
+            helper_cpus = sorted(available - set(program_cpus)) or None
+
+        self.program_cpus = sorted(program_cpus) if program_cpus else None
+        self.helper_cpus = sorted(helper_cpus) if helper_cpus else None
+        self.memory_limit = memory_limit or None
+        self.__cgroup__ = None
+        self.__affinity__ = None
+
+    @classmethod
+    def from_conf(cls):
+        """
+        :return: the placement set by [benchmark] program_cpus, helper_cpus and memory_limit
+        """
+        conf = get_global_conf()
+        return cls(
+            parse_cpus(conf.get("benchmark", "program_cpus", fallback="")),
+            parse_cpus(conf.get("benchmark", "helper_cpus", fallback="")),
+            conf.getint("benchmark", "memory_limit", fallback=0)
+        )
+
+    def describe(self) -> dict:
+        """
+        :return: the placement, with cpus as lists of ranges
+        """
+        return {
+            "program_cpus": format_cpus(self.program_cpus) if self.program_cpus else None,
+            "helper_cpus": format_cpus(self.helper_cpus) if self.helper_cpus else None,
+            "memory_limit": self.memory_limit
+        }
+
+    @property
+    def key(self) -> str:
+        """
+        The placement as stored with results, None if nothing is pinned nor limited
+        """
+        description = self.describe()
+        if not any(description.values()):
+            return None
+        return json.dumps(description, sort_keys=True)
+
+    def preexec_fn(self, preexec_fn: callable=None) -> callable:
+        """
+        :param preexec_fn: another function to call in the program before it starts
+        :return: the function to give to subprocess to place the program
+        """
+        cpus = self.program_cpus
+        cgroup = self.__cgroup__
+
+        def place() -> None:
+            """
+            Moves the program to its cpus and cgroup
+            """
+            if preexec_fn is not None:
+                preexec_fn()
+            if cpus is not None:
+                os.sched_setaffinity(0, cpus)
+            if cgroup is not None:
+                cgroup.join()
+
+        return place
+
+    def __enter__(self):
+        if self.helper_cpus is not None:
+            self.__affinity__ = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, self.helper_cpus)
+
+        if self.memory_limit is not None:
+            cgroup = MemoryCGroup(self.memory_limit)
+            if cgroup.create():
+                self.__cgroup__ = cgroup
+
+        logging.debug("Benchmarking with placement %(placement)s", dict(placement=self.describe()))
+        return self
+
+    # noinspection PyUnusedLocal
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.__affinity__ is not None:
+            os.sched_setaffinity(0, self.__affinity__)
+            self.__affinity__ = None
+
+        if self.__cgroup__ is not None:
+            self.__cgroup__.remove()
+            self.__cgroup__ = None
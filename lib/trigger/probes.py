@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Readiness probes for servers. They are polled until the server is up, or down, instead of waiting a fixed delay
+"""
+
+from abc import ABCMeta, abstractmethod
+import logging
+import os
+import re
+import socket
+import time
+
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class Probe(metaclass=ABCMeta):
+    """
+    The base probe. A probe checks the state of a server without blocking
+    """
+    @abstractmethod
+    def is_ready(self) -> bool:
+        """
+        :return: True if the server is ready to handle requests
+        """
+
+    @abstractmethod
+    def is_stopped(self) -> bool:
+        """
+        :return: True if the server is not running anymore
+        """
+
+
+class TcpProbe(Probe):
+    """
+    Probes a server by connecting to the port it listens on
+
+    :param port: the port on which the server listens
+    :param host: the address on which the server listens
+    """
+    def __init__(self, port: int, host: str="127.0.0.1"):
+        self.port = port
+        self.host = host
+
+    def is_ready(self) -> bool:
+        """
+        :return: True if a connection to the port succeeded
+        """
+        try:
+            with socket.create_connection((self.host, self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def is_stopped(self) -> bool:
+        """
+        :return: True if nothing accepts connections on the port anymore
+        """
+        return not self.is_ready()
+
+
+class PidfileProbe(Probe):
+    """
+    Probes a server through the file it writes its pid in
+
+    :param path: the path to the pidfile
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def pid(self) -> int:
+        """
+        :return: the pid written in the pidfile or None if there is none
+        """
+        try:
+            with open(self.path) as pidfile:
+                return int(pidfile.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def is_ready(self) -> bool:
+        """
+        :return: True if the pidfile contains the pid of a living process
+        """
+        pid = self.pid()
+        if pid is None:
+            return False
+
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+
+        return True
+
+    def is_stopped(self) -> bool:
+        """
+        :return: True if there is no pidfile or if its process is dead
+        """
+        return not self.is_ready()
+
+
+class LogProbe(Probe):
+    """
+    Probes a server by waiting for a line in its log file. A log cannot tell when the server stops, so this is
+    considered stopped as soon as asked
+
+    :param path: the path to the log file
+    :param pattern: a regular expression a line of the log must match when the server is ready
+    """
+    def __init__(self, path: str, pattern: str):
+        self.path = path
+        self.pattern = re.compile(pattern)
+
+    def is_ready(self) -> bool:
+        """
+        :return: True if a line matching the pattern is in the log
+        """
+        try:
+            with open(self.path, errors="replace") as log:
+                return any(self.pattern.search(line) for line in log)
+        except FileNotFoundError:
+            return False
+
+    def is_stopped(self) -> bool:
+        """
+        :return: True
+        """
+        return True
+
+
+def wait_for(condition: callable, timeout: float, interval: float=None) -> bool:
+    """
+    Polls the given condition until it is true or the timeout expires
+
+    :param condition: a callable returning a boolean
+    :param timeout: the maximum time to wait in seconds
+    :param interval: the time to sleep between two polls, [trigger] probe_interval by default
+    :return: True if the condition was met, False on timeout
+    """
+    if interval is None:
+        interval = get_global_conf().getfloat("trigger", "probe_interval")
+
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+    return True
+
+
+def wait_ready(probes: list, timeout: float=None) -> bool:
+    """
+    Waits until all probes consider the server ready
+
+    :param probes: the list of probes to poll
+    :param timeout: the maximum time to wait in seconds, [trigger] startup_timeout by default
+    :return: True if the server is ready, False on timeout
+    """
+    if timeout is None:
+        timeout = get_global_conf().getfloat("trigger", "startup_timeout")
+
+    if not wait_for(lambda: all(probe.is_ready() for probe in probes), timeout):
+        logging.warning("The server did not come up after %(timeout)s seconds", dict(timeout=timeout))
+        return False
+
+    return True
+
+
+def wait_stopped(probes: list, timeout: float=None) -> bool:
+    """
+    Waits until all probes consider the server stopped
+
+    :param probes: the list of probes to poll
+    :param timeout: the maximum time to wait in seconds, [trigger] shutdown_timeout by default
+    :return: True if the server stopped, False on timeout
+    """
+    if timeout is None:
+        timeout = get_global_conf().getfloat("trigger", "shutdown_timeout")
+
+    if not wait_for(lambda: all(probe.is_stopped() for probe in probes), timeout):
+        logging.warning("The server did not stop after %(timeout)s seconds", dict(timeout=timeout))
+        return False
+
+    return True
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Estimation of how often a bug reproduces. Triggers are run in batches, in parallel when their resources allow it,
+until the confidence interval of the reproduction rate is narrow enough
+"""
+
+import logging
+
+from lib.stats import wilson_interval
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class ReproductionEstimate:
+    """
+    The outcomes of the runs of a trigger, and the reproduction rate they give
+
+    :param confidence: the confidence level of the interval of the rate
+    """
+    def __init__(self, confidence: float=0.95):
+        self.confidence = confidence
+        self.runs = 0
+        self.reproduced = 0
+        self.errors = []
+
+    def add(self, reproduced: bool) -> None:
+        """
+        Records the outcome of a run
+
+        :param reproduced: whether the run reproduced the bug
+        """
+        self.runs += 1
+        self.reproduced += int(reproduced)
+
+    @property
+    def rate(self) -> float:
+        """
+        The fraction of runs that reproduced the bug
+        """
+        return self.reproduced / self.runs if self.runs else 0.0
+
+    @property
+    def interval(self) -> (float, float):
+        """
+        The Wilson confidence interval of the reproduction rate
+        """
+        return wilson_interval(self.reproduced, self.runs, self.confidence)
+
+    @property
+    def half_width(self) -> float:
+        """
+        Half the width of the confidence interval of the rate
+        """
+        low, high = self.interval
+        return (high - low) / 2
+
+
+def estimate_reproduction(run_batch: callable, batch_size: int, max_runs: int, min_runs: int=10,
+                          precision: float=0.05, confidence: float=0.95) -> ReproductionEstimate:
+    """
+    Runs a trigger until its reproduction rate is known precisely enough or max_runs runs were done
+
+    :param run_batch: a callable taking a number of runs to do and returning one (return value, exception) per run,
+                      the value being what the trigger's run returned, 1 meaning that the bug showed
+    :param batch_size: the number of runs to do at once
+    :param max_runs: the maximum number of runs to do
+    :param min_runs: the number of runs to do before stopping early
+    :param precision: the half width of the confidence interval under which to stop
+    :param confidence: the confidence level of the interval
+    :return: the estimate of the reproduction rate. Runs that raised an exception are not counted, and the estimation
+             stops at the first of them
+    """
+    estimate = ReproductionEstimate(confidence)
+    while estimate.runs < max_runs:
+        for value, exc in run_batch(min(max(1, batch_size), max_runs - estimate.runs)):
+            if exc is not None:
+                estimate.errors.append(exc)
+            else:
+                estimate.add(value == 1)
+
+        if estimate.errors:
+            break
+
+        low, high = estimate.interval
+        logging.verbose(
+            "Reproduced %(reproduced)s times out of %(runs)s, rate in [%(low).3f, %(high).3f]",
+            dict(reproduced=estimate.reproduced, runs=estimate.runs, low=low, high=high)
+        )
+        if estimate.runs >= min_runs and estimate.half_width <= precision:
+            break
+
+    return estimate
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Declarative resources for triggers. A trigger lists the resources it needs and gets a private instance of each of them
+for every run, which allows to run multiple triggers at once on the same machine. Resources that cannot be duplicated
+(a port hardcoded in the program, a server stopped by its name) are instead locked for the duration of the run.
+"""
+
+from abc import ABCMeta, abstractmethod
+from configparser import SectionProxy
+from contextlib import suppress
+import os
+import shutil
+import socket
+import tempfile
+
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class Resource(metaclass=ABCMeta):
+    """
+    The base resource declaration. Declarations are shared between all trigger instances, the values they give are not
+
+    :param name: the name under which the trigger accesses the resource
+    """
+    cpus = 0
+
+    def __init__(self, name: str):
+        self.name = name
+
+    # noinspection PyMethodMayBeStatic
+    # pylint: disable=unused-argument,no-self-use
+    def lock(self, conf: SectionProxy) -> str:
+        """
+        The name of the host resource to lock if this resource cannot be duplicated
+
+        :param conf: the configuration of the program
+        :return: the name of the lock or None if every run gets its own instance
+        """
+        return None
+
+    @abstractmethod
+    def acquire(self, trigger) -> object:
+        """
+        Creates a new instance of the resource for the given trigger
+
+        :param trigger: the trigger for which to create the resource
+        :return: the value of the resource
+        """
+
+    def release(self, value: object) -> None:
+        """
+        Frees the instance of the resource once the run is done
+
+        :param value: the value that was returned by acquire
+        """
+        pass
+
+
+class Port(Resource):
+    """
+    A TCP port on which a server listens. If the port is set in the program's configuration, it is locked, otherwise a
+    free port is given for each run
+
+    :param name: the name of the resource
+    :param option: the option of the program's configuration containing the port, if it is fixed
+    """
+    def __init__(self, name: str="port", option: str=None):
+        super().__init__(name)
+        self.option = option
+
+    def lock(self, conf: SectionProxy) -> str:
+        """
+        Locks the port if it is fixed by the configuration
+
+        :param conf: the configuration of the program
+        :return: port:number or None
+        """
+        if self.option:
+            return "port:{}".format(conf[self.option])
+        return None
+
+    def acquire(self, trigger) -> int:
+        """
+        Gets the configured port or asks the kernel for a free one
+
+        :param trigger: the trigger for which to get the port
+        :return: the port to use
+        """
+        if self.option:
+            return int(trigger.conf[self.option])
+
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+
+class ScratchDirectory(Resource):
+    """
+    A private temporary directory, removed after the run
+    """
+    def acquire(self, trigger) -> str:
+        """
+        Creates a new directory in the scratch directory
+
+        :param trigger: the trigger for which to create the directory
+        :return: the path to the directory
+        """
+        scratch_directory = get_global_conf().getdir("trigger", "scratch_directory")
+        os.makedirs(scratch_directory, exist_ok=True)
+        return tempfile.mkdtemp(prefix="{}-{}-".format(trigger.program, self.name), dir=scratch_directory)
+
+    def release(self, value: str) -> None:
+        """
+        Removes the directory and everything in it
+
+        :param value: the directory to remove
+        """
+        with suppress(FileNotFoundError):
+            shutil.rmtree(value)
+
+
+class Cpus(Resource):
+    """
+    The number of cpus a run keeps busy. Used by the scheduler to avoid over subscribing the machine
+
+    :param count: the number of cpus used
+    """
+    def __init__(self, count: int):
+        super().__init__("cpus")
+        self.cpus = count
+
+    def acquire(self, trigger) -> int:
+        """
+        :param trigger: the trigger running
+        :return: the number of cpus reserved
+        """
+        return self.cpus
+
+
+class ProcessName(Resource):
+    """
+    A process name used to control the program, for example when stopping it with pkill. This cannot be shared, so
+    only one run using it can happen at a time
+
+    :param name: the name of the process
+    """
+    def lock(self, conf: SectionProxy) -> str:
+        """
+        :param conf: the configuration of the program
+        :return: process:name
+        """
+        return "process:{}".format(self.name)
+
+    def acquire(self, trigger) -> str:
+        """
+        :param trigger: the trigger running
+        :return: the name of the process
+        """
+        return self.name
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+A scheduler to run independent triggers concurrently, without letting two of them hold the same host resource
+"""
+
+from contextlib import suppress
+import logging
+import multiprocessing
+import queue
+import traceback
+
+from lib import constants
+from lib.helper import show_progress
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class Task:  # pylint: disable=too-few-public-methods
+    """
+    A unit of work for the scheduler
+
+    :param function: the function to call
+    :param kwargs: keyword arguments to call the function with
+    :param locks: names of host resources the task needs for itself (a port, a process name, ...)
+    :param cpus: the number of job slots the task uses while running
+    """
+    def __init__(self, function: callable, kwargs: dict, locks: set=None, cpus: int=1):
+        self.function = function
+        self.kwargs = kwargs
+        self.locks = set(locks or [])
+        self.cpus = cpus
+
+
+class TaskProcess(multiprocessing.Process):  # pylint: disable=no-member
+    """
+    Runs a task in a separate process and reports its outcome
+
+    :param index: the index of the task, used to order results
+    :param task: the task to run
+    :param report_queue: the queue on which to report (index, return value, exception)
+    :param expected_exceptions: exceptions that are part of a normal run and are sent back to the scheduler
+    """
+    def __init__(self, index: int, task: Task, report_queue: multiprocessing.Queue, expected_exceptions: tuple):
+        super().__init__()
+        self.index = index
+        self.task = task
+        self.report_queue = report_queue
+        self.expected_exceptions = expected_exceptions
+
+    def run(self) -> None:
+        """
+        Runs the task and reports its value. A task interrupted or exiting does not report, the scheduler failing it
+        once its process is gone
+        """
+        try:
+            self.report_queue.put((self.index, self.task.function(**self.task.kwargs), None))
+        except self.expected_exceptions as exc:
+            self.report_queue.put((self.index, None, exc))
+        except Exception as exc:  # pylint: disable=broad-except
+            logging.error(exc)
+            logging.debug("".join(traceback.format_tb(exc.__traceback__)))
+            self.report_queue.put((self.index, constants.PROGRAM_TRIGGER_FAIL, None))
+
+
+def _drain(report_queue: multiprocessing.Queue) -> list:
+    """
+    Reads all the reports left in the queue
+
+    :param report_queue: the queue on which tasks report
+    :return: the reports read
+    """
+    reports = []
+    with suppress(queue.Empty):
+        while True:
+            reports.append(report_queue.get(timeout=0.1))
+    return reports
+
+
+def wait_for_reports(report_queue: multiprocessing.Queue, running: dict) -> (list, list):
+    """
+    Waits for running tasks to report, and finds the ones whose process exited without reporting. A process that
+    exited without reporting failed, whatever its exit code. Its report may still be on its way through the queue,
+    which is therefore read again before deciding so
+
+    :param report_queue: the queue on which tasks report (index, ...)
+    :param running: the processes running, by index
+    :return: the reports received, possibly from tasks that are no longer running, and the indexes of the processes
+             that exited without reporting
+    """
+    reports = []
+    with suppress(queue.Empty):
+        reports.append(report_queue.get(timeout=1))
+
+    dead = [index for index, process in running.items() if not process.is_alive()]
+    if not dead:
+        return reports, []
+
+    reports.extend(_drain(report_queue))
+    reported = {report[0] for report in reports}
+    return reports, [index for index in dead if index not in reported]
+
+
+class TriggerScheduler:
+    """
+    Runs tasks in a pool of processes. Tasks sharing a lock are never run at the same time and the sum of cpus used by
+    running tasks never exceeds the number of jobs. Tasks are started in the order they were given
+
+    :param jobs: the number of job slots available
+    :param expected_exceptions: exceptions that are returned with the results instead of being logged as failures
+    """
+    def __init__(self, jobs: int, expected_exceptions: tuple=()):
+        self.jobs = max(1, jobs)
+        self.expected_exceptions = expected_exceptions
+
+    def can_start(self, task: Task, held_locks: set, used_cpus: int) -> bool:
+        """
+        Checks whether a task can start with the current resources in use
+
+        :param task: the task to check
+        :param held_locks: the locks currently held by running tasks
+        :param used_cpus: the number of job slots currently in use
+        :return: True if the task can start now
+        """
+        if task.locks & held_locks:
+            return False
+
+        return used_cpus == 0 or used_cpus + min(task.cpus, self.jobs) <= self.jobs
+
+    def run(self, tasks: list) -> list:
+        """
+        Runs all the tasks and returns their results
+
+        :param tasks: the list of tasks to run
+        :return: a list of (return value, exception) in the same order as tasks
+        """
+        results = [None] * len(tasks)
+        pending = list(enumerate(tasks))
+        running = {}
+        report_queue = multiprocessing.Queue()  # pylint: disable=no-member
+        held_locks = set()
+        used_cpus = 0
+        done = 0
+
+        try:
+            while pending or running:
+                for index, task in pending.copy():
+                    if not self.can_start(task, held_locks, used_cpus):
+                        continue
+
+                    pending.remove((index, task))
+                    held_locks |= task.locks
+                    used_cpus += min(task.cpus, self.jobs)
+
+                    process = TaskProcess(index, task, report_queue, self.expected_exceptions)
+                    process.start()
+                    running[index] = process
+
+                reports, lost = wait_for_reports(report_queue, running)
+                for index in lost:
+                    logging.error("A trigger process died unexpectedly with code %(code)s",
+                                  dict(code=running[index].exitcode))
+                    reports.append((index, constants.PROGRAM_TRIGGER_FAIL, None))
+
+                for index, value, exception in reports:
+                    if index not in running:
+                        logging.debug("Ignoring the late report of task %(index)s", dict(index=index))
+                        continue
+
+                    running.pop(index).join()
+                    held_locks -= tasks[index].locks
+                    used_cpus -= min(tasks[index].cpus, self.jobs)
+                    results[index] = (value, exception)
+
+                    done += 1
+                    show_progress(done, len(tasks), section="trigger")
+
+        finally:
+            for process in running.values():
+                process.terminate()
+
+        return results
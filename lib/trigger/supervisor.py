@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Supervision of the process trees started by triggers. Every process is started in its own session with a token in its
+environment, so that all its descendants can be found in /proc, even the ones that daemonized, and stopped together
+"""
+
+from contextlib import suppress
+import logging
+import os
+import signal
+import time
+import uuid
+
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+def process_table() -> dict:
+    """
+    :return: the parent, process group, session and state of every process, by pid
+    """
+    processes = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        with suppress(OSError, ValueError, IndexError):
+            with open(os.path.join("/proc", name, "stat")) as _file_:
+                # the name of the program, in parentheses, can contain spaces
+                fields = _file_.read().rpartition(")")[2].split()
+            processes[int(name)] = (int(fields[1]), int(fields[2]), int(fields[3]), fields[0])
+    return processes
+
+
+class Supervisor:
+    """
+    Tracks the processes started with its popen_kwargs and all their descendants, and stops them
+
+    :param token: the token identifying the processes of this supervisor, a random one by default
+    """
+    variable = "BUGBASE_SUPERVISOR"
+
+    def __init__(self, token: str=None):
+        self.token = token or uuid.uuid4().hex
+
+    def popen_kwargs(self, env: dict=None) -> dict:
+        """
+        :param env: the environment to run the process with, the current one by default
+        :return: the arguments to give to subprocess to start a supervised process
+        """
+        environment = dict(os.environ if env is None else env)
+        environment[self.variable] = self.token
+        return {"env": environment, "start_new_session": True}
+
+    def tagged(self, pid: int) -> bool:
+        """
+        :param pid: a process
+        :return: whether the process has the token of this supervisor in its environment
+        """
+        with suppress(OSError):
+            with open("/proc/{}/environ".format(pid), "rb") as _file_:
+                return "{}={}".format(self.variable, self.token).encode() in _file_.read().split(b"\0")
+        return False
+
+    def processes(self) -> set:
+        """
+        Finds the supervised processes : the ones having the token, the ones in their sessions or process groups, and
+        all their descendants. Processes that exited but were not reaped yet are left out
+        :return: the pids of the supervised processes that are still running
+        """
+        table = process_table()
+        table.pop(os.getpid(), None)
+        members = {pid for pid in table if self.tagged(pid)}
+        groups = {table[pid][1] for pid in members} | {table[pid][2] for pid in members}
+        # processes started without a session of their own must not drag the whole of bugbase with them
+        groups -= {os.getpgid(0), os.getsid(0)}
+
+        members |= {pid for pid, (_, group, session, _) in table.items() if group in groups or session in groups}
+        added = members
+        while added:
+            added = {pid for pid, (parent, _, _, _) in table.items() if parent in added and pid not in members}
+            members |= added
+
+        return {pid for pid in members if table[pid][3] not in ("Z", "X")}
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits for all supervised processes to exit by themselves
+
+        :param timeout: the maximum time to wait, in seconds
+        :return: True if they all exited
+        """
+        deadline = time.monotonic() + timeout
+        while self.processes():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(get_global_conf().getfloat("trigger", "probe_interval"))
+        return True
+
+    def stop(self, timeout: float=None) -> bool:
+        """
+        Stops all supervised processes, first with SIGTERM and then with SIGKILL for the ones still running after the
+        timeout. Processes forked in the meantime are signaled too
+
+        :param timeout: the time to give processes to exit after each signal, [trigger] shutdown_timeout by default
+        :return: True if all processes stopped
+        """
+        if timeout is None:
+            timeout = get_global_conf().getfloat("trigger", "shutdown_timeout")
+
+        for signum in [signal.SIGTERM, signal.SIGKILL]:
+            signaled = set()
+            deadline = time.monotonic() + timeout
+            while True:
+                pids = self.processes()
+                if not pids:
+                    return True
+                if time.monotonic() >= deadline:
+                    break
+
+                for pid in pids - signaled:
+                    with suppress(ProcessLookupError, PermissionError):
+                        os.kill(pid, signum)
+                signaled |= pids
+                time.sleep(get_global_conf().getfloat("trigger", "probe_interval"))
+
+        logging.warning("Processes %(pids)s could not be stopped", dict(pids=", ".join(map(str, sorted(pids)))))
+        return False
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Sweeps of client/server triggers over a grid of client and iteration counts. At each point of the grid the bug is
+triggered several times and the helpers are timed once, telling how often the bug shows up and how much work the
+server does per second as the load grows
+"""
+
+import logging
+
+from lib.trigger.benchmark import BenchmarkWithHelper
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class SweepPoint:
+    """
+    The results at one point of a sweep
+
+    :param clients: the number of helpers run concurrently
+    :param iterations: the number of iterations each helper did, None for the trigger's default
+    """
+    def __init__(self, clients: int, iterations: int=None):
+        self.clients = clients
+        self.iterations = iterations
+        self.runs = 0
+        self.triggered = 0
+        self.unexpected = 0
+        self.throughput = None
+
+    @property
+    def probability(self) -> float:
+        """
+        The fraction of runs in which the bug was triggered
+        """
+        return self.triggered / self.runs if self.runs else 0.0
+
+    def as_dict(self) -> dict:
+        """
+        :return: the results at this point, to be reported
+        """
+        return {
+            "clients": self.clients, "iterations": self.iterations, "runs": self.runs, "triggered": self.triggered,
+            "unexpected": self.unexpected, "probability": self.probability, "throughput": self.throughput
+        }
+
+
+def grid(clients: list, iterations: list) -> list:
+    """
+    :param clients: the numbers of clients to try
+    :param iterations: the numbers of iterations to try, empty to keep the trigger's default
+    :return: the points of the grid, fewer clients first
+    """
+    return [SweepPoint(client, iteration) for client in clients for iteration in iterations or [None]]
+
+
+def measure_throughput(trigger) -> float:
+    """
+    Times the helpers once against a fresh server
+
+    :param trigger: the lib.trigger.TriggerWithHelper to time, already scaled
+    :return: the number of helper iterations done per second, None if the helpers failed
+    """
+    benchmark = BenchmarkWithHelper(trigger)
+    try:
+        if not benchmark.start_server():
+            return None
+        timings, success = benchmark.measure()
+    finally:
+        benchmark.stop_server()
+
+    if not success or not timings or not timings[0]:
+        return None
+
+    work = len(trigger.active_helper_commands) * trigger.active_helper_args.get("iterations", 1)
+    return work / timings[0]
+
+
+def sweep(trigger, run, points: list, runs: int) -> list:
+    """
+    Triggers the bug and measures the throughput at every point
+
+    :param trigger: the lib.trigger.TriggerWithHelper to sweep
+    :param run: the callable triggering the bug once, returning 0|1|None on success|failure|unexpected event
+    :param points: the SweepPoint to visit
+    :param runs: the number of times to trigger the bug at each point
+    :return: the points, with their results
+    """
+    try:
+        for point in points:
+            trigger.scale(point.clients, point.iterations)
+            for _ in range(runs):
+                error = run()
+                point.runs += 1
+                if error is None:
+                    point.unexpected += 1
+                elif error:
+                    point.triggered += 1
+
+            point.throughput = measure_throughput(trigger)
+            logging.verbose(
+                "%(clients)s clients, %(iterations)s iterations : triggered %(triggered)s/%(runs)s times, "
+                "%(throughput)s iterations per second", point.as_dict()
+            )
+    finally:
+        trigger.scale()
+
+    return points
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Generation and reuse of the big input files some benchmarks work on. Workloads are identified by their generator,
+size and seed, kept in the workloads directory with their metadata, and removed when they have not been used for long
+"""
+
+from contextlib import suppress
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+from lib.installer.context_managers import FileLock
+from lib.parsers.configuration import get_global_conf
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+CHUNK_SIZE = 1024 ** 2
+
+WORDS = [
+    "static", "int", "return", "struct", "const", "char", "void", "unsigned", "while", "for", "if", "else", "NULL",
+    "buffer", "length", "size", "error", "the", "of", "and", "to", "a", "in", "is", "that", "data", "file", "value"
+]
+
+
+def sparse(_file_, size: int, _: random.Random) -> None:
+    """
+    Creates a file with no data allocated, reading as zeros. Reading it does not touch the disk
+
+    :param _file_: the file to fill, opened in binary mode
+    :param size: the size of the file, in bytes
+    """
+    _file_.truncate(size)
+
+
+def zeros(_file_, size: int, _: random.Random) -> None:
+    """
+    Creates a file full of zeros, allocated on disk at once when the file system supports it
+
+    :param _file_: the file to fill, opened in binary mode
+    :param size: the size of the file, in bytes
+    """
+    try:
+        os.posix_fallocate(_file_.fileno(), 0, size)
+    except OSError:
+        chunk = bytes(CHUNK_SIZE)
+        for offset in range(0, size, CHUNK_SIZE):
+            _file_.write(chunk[:size - offset])
+
+
+def pseudo_random(_file_, size: int, generator: random.Random) -> None:
+    """
+    Creates a file of seeded pseudo-random bytes, which cannot be compressed
+
+    :param _file_: the file to fill, opened in binary mode
+    :param size: the size of the file, in bytes
+    :param generator: the seeded random generator to use
+    """
+    for offset in range(0, size, CHUNK_SIZE):
+        _file_.write(generator.randbytes(min(CHUNK_SIZE, size - offset)))
+
+
+def mixed(_file_, size: int, generator: random.Random) -> None:
+    """
+    Creates a file mixing chunks of random bytes, text-like data and repetitive data, which compresses like real world
+    data does rather than like zeros
+
+    :param _file_: the file to fill, opened in binary mode
+    :param size: the size of the file, in bytes
+    :param generator: the seeded random generator to use
+    """
+    texts = []
+    for _ in range(8):
+        text = " ".join(generator.choices(WORDS, k=CHUNK_SIZE // 4)).encode()
+        texts.append((text * 2)[:CHUNK_SIZE])
+
+    for offset in range(0, size, CHUNK_SIZE):
+        length = min(CHUNK_SIZE, size - offset)
+        kind = generator.random()
+        if kind < 0.3:
+            chunk = generator.randbytes(length)
+        elif kind < 0.8:
+            chunk = generator.choice(texts)[:length]
+        else:
+            chunk = (generator.randbytes(generator.randint(1, 64)) * (length // 64 + 1))[:length]
+        _file_.write(chunk)
+
+
+GENERATORS = {"sparse": sparse, "zeros": zeros, "random": pseudo_random, "mixed": mixed}
+
+
+class WorkloadManager:
+    """
+    Creates workloads on demand and reuses them across runs. Each workload has a metadata file next to it telling how
+    it was generated and when it was last used, from which unused workloads are garbage collected
+
+    :param directory: where to store workloads, [trigger] workloads by default
+    """
+    def __init__(self, directory: str=None):
+        self.directory = directory or get_global_conf().getdir("trigger", "workloads")
+
+    def path(self, size: int, generator: str="zeros", seed: int=0) -> str:
+        """
+        :param size: the size of the workload, in MiB
+        :param generator: the name of the generator of the content
+        :param seed: the seed of the generator
+        :return: the path of the workload
+        """
+        return os.path.join(self.directory, "{}-{}-{}M.dat".format(generator, seed, size))
+
+    @staticmethod
+    def metadata_path(path: str) -> str:
+        """
+        :param path: the path of a workload
+        :return: the path of its metadata
+        """
+        return path + ".json"
+
+    def metadata(self, path: str) -> dict:
+        """
+        :param path: the path of a workload
+        :return: the metadata of the workload, None if it is not a complete workload
+        """
+        with suppress(OSError, ValueError):
+            with open(self.metadata_path(path)) as _file_:
+                return json.load(_file_)
+        return None
+
+    def write_metadata(self, path: str, metadata: dict) -> None:
+        """
+        Saves the metadata of a workload
+
+        :param path: the path of the workload
+        :param metadata: the metadata to save
+        """
+        with open(self.metadata_path(path), "w") as _file_:
+            json.dump(metadata, _file_, indent=4, sort_keys=True)
+
+    def get(self, size: int, generator: str="zeros", seed: int=0) -> str:
+        """
+        Gets a workload, creating it if it does not exist yet
+
+        :param size: the size of the workload, in MiB
+        :param generator: the name of the generator of the content, one of GENERATORS
+        :param seed: the seed of the generator
+        :return: the path to the workload, which must not be modified
+        """
+        path = self.path(size, generator, seed)
+        os.makedirs(self.directory, exist_ok=True)
+
+        with FileLock(path + ".lock"):
+            metadata = self.metadata(path)
+            if metadata is None or not os.path.exists(path):
+                logging.verbose("Creating a %(size)s MiB %(generator)s workload", dict(size=size, generator=generator))
+                descriptor, staging = tempfile.mkstemp(prefix=".workload-", dir=self.directory)
+                try:
+                    with os.fdopen(descriptor, "wb") as _file_:
+                        GENERATORS[generator](_file_, size * CHUNK_SIZE, random.Random(seed))
+                    os.rename(staging, path)
+                except BaseException:
+                    with suppress(FileNotFoundError):
+                        os.remove(staging)
+                    raise
+
+                metadata = {"size": size, "generator": generator, "seed": seed, "created": time.time()}
+
+            metadata["last_used"] = time.time()
+            self.write_metadata(path, metadata)
+
+        self.collect(keep=path)
+        return path
+
+    def workloads(self) -> list:
+        """
+        :return: the paths of all complete workloads with their metadata, least recently used first
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".dat"):
+                metadata = self.metadata(path)
+                if metadata is not None and os.path.exists(path):
+                    found.append((path, metadata))
+
+        return sorted(found, key=lambda entry: entry[1].get("last_used", 0))
+
+    @staticmethod
+    def disk_usage(path: str) -> int:
+        """
+        :param path: the path of a workload
+        :return: the space the workload takes on disk, in bytes. Sparse workloads take almost none, whatever their size
+        """
+        with suppress(FileNotFoundError):
+            return os.stat(path).st_blocks * 512
+        return 0
+
+    def remove(self, path: str, metadata: dict=None) -> bool:
+        """
+        Removes a workload, holding its lock for it not to be removed while another run creates or uses it. Runs having
+        it open can still read it. The lock file is kept, as other runs may be waiting on it
+
+        :param path: the workload to remove
+        :param metadata: the metadata of the workload when it was chosen for removal. It is kept if it changed since,
+                         that is if the workload was used in between
+        :return: whether the workload was removed
+        """
+        with FileLock(path + ".lock"):
+            if metadata is not None and self.metadata(path) != metadata:
+                return False
+
+            logging.verbose("Removing workload %(path)s", dict(path=path))
+            for _file_ in [path, self.metadata_path(path)]:
+                with suppress(FileNotFoundError):
+                    os.remove(_file_)
+
+        return True
+
+    def collect(self, max_size: float=None, max_age: float=None, keep: str=None) -> None:
+        """
+        Removes workloads unused for more than max_age days, and then the least recently used ones until they take
+        at most max_size GiB on disk
+
+        :param max_size: the space workloads can use, in GiB, [trigger] workloads_max_size by default, 0 for no limit
+        :param max_age: the number of days after which an unused workload is removed, [trigger] workloads_max_age by
+                        default, 0 for no limit
+        :param keep: a workload never to remove
+        """
+        if max_size is None:
+            max_size = get_global_conf().getfloat("trigger", "workloads_max_size")
+        if max_age is None:
+            max_age = get_global_conf().getfloat("trigger", "workloads_max_age")
+
+        workloads = [(path, metadata) for path, metadata in self.workloads() if path != keep]
+        if max_age:
+            for path, metadata in workloads.copy():
+                if time.time() - metadata.get("last_used", 0) > max_age * 24 * 3600:
+                    self.remove(path, metadata)
+                    workloads.remove((path, metadata))
+
+        if max_size:
+            total = sum(self.disk_usage(path) for path, _ in self.workloads())
+            for path, metadata in workloads:
+                if total <= max_size * 1024 ** 3:
+                    break
+                usage = self.disk_usage(path)
+                if self.remove(path, metadata):
+                    total -= usage
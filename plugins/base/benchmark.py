@@ -7,12 +7,12 @@ A plugin to run a benchmark on top of another plugin, for comparison
 
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
-import os
 import statistics
 
-from lib.parsers.configuration import get_global_conf
 from lib.plugins import AnalysisPlugin, MainPlugin
+from lib.results import ResultStore
 from lib.trigger import RawTrigger
+from lib.trigger.measures import Measure
 
 
 class Benchmark(AnalysisPlugin):
@@ -20,7 +20,6 @@ class Benchmark(AnalysisPlugin):
     The Benchmark plugin. Changes the trigger to be a Benchmark instance and runs it
     """
     help = "Benchmark the execution"
-    benchmark_log = os.path.join(get_global_conf().getdir("trigger", "exp-results"), "benchmark.log")
 
     @classmethod
     def options(cls) -> str:
@@ -44,30 +43,42 @@ class Benchmark(AnalysisPlugin):
 
     def post_trigger_run(self, trigger: RawTrigger, main_plugin: MainPlugin, *args, **kwargs) -> None:
         """
-        Collects the benchmark results and saves them in a file
+        Collects the benchmark results and saves them in the result store
         :param trigger: the trigger instance that is run
         :param main_plugin: the main plugin under which we run
         :param args: additional arguments
         :param kwargs: additional keyword arguments
         """
-        if len(trigger.returned_information) == 1:
-            mean = trigger.returned_information[0]
-            stdev = 0
-            variance = 0
-        else:
-            mean = statistics.mean(trigger.returned_information)
-            stdev = statistics.stdev(trigger.returned_information)
-            variance = statistics.variance(trigger.returned_information)
+        timings = [float(data) for data in trigger.returned_information]
+        summary = {"mean": timings[0], "stdev": 0, "variance": 0}
+        if len(timings) > 1:
+            summary = {
+                "mean": statistics.mean(timings),
+                "stdev": statistics.stdev(timings),
+                "variance": statistics.variance(timings)
+            }
 
-        if not os.path.exists(os.path.dirname(self.benchmark_log)):
-            os.makedirs(os.path.dirname(self.benchmark_log))
+        for key in ["precision", "warmup", "placement", "higher_is_better"]:
+            if key in trigger.returned_metadata:
+                summary[key] = trigger.returned_metadata[key]
 
-        with open(self.benchmark_log, "a") as logs:
-            logs.write("{name}, {plugin}, {slice_size}, {mean}, {stdev}, {variance} {total_numbers}\n".format(
-                name=trigger.conf.get("name"),
-                plugin=main_plugin.__class__.__name__,
-                slice_size=kwargs.get("number", None),
-                mean=mean,
-                stdev=stdev,
-                variance=variance,
-                total_numbers=" ".join([str(data) for data in trigger.returned_information])))
+        if all(isinstance(data, Measure) for data in trigger.returned_information):
+            summary.update({
+                "cpu": statistics.mean(data.cpu_time for data in trigger.returned_information),
+                "rss": statistics.mean(data.max_rss for data in trigger.returned_information),
+                "voluntary_switches": statistics.mean(data.voluntary_switches for data in trigger.returned_information),
+                "involuntary_switches": statistics.mean(
+                    data.involuntary_switches for data in trigger.returned_information
+                )
+            })
+
+        ResultStore().add_run(
+            bug=trigger.conf.get("name"),
+            plugin=main_plugin.__class__.__name__,
+            samples=trigger.returned_information,
+            summary=summary,
+            cold_samples=trigger.returned_metadata.get("cold", []),
+            curve=trigger.returned_metadata.get("curve", []),
+            helper_samples=trigger.returned_metadata.get("helpers", []),
+            slice_size=kwargs.get("number", None)
+        )
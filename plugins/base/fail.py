@@ -8,16 +8,16 @@ A simple plugin implementation for failing run
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 
-from contextlib import suppress
+from configparser import SectionProxy
 import logging
 import os
 import shutil
-import time
 
 from lib.plugins import MainPlugin
 from lib.constants import PLUGIN_ERROR
 from lib.parsers.configuration import get_global_conf
 from lib.trigger import RawTrigger
+from lib.trigger.coredumps import archive_core, remove_core, wait_for_core
 
 
 class Fail(MainPlugin):
@@ -27,6 +27,15 @@ class Fail(MainPlugin):
     extension = "fail"
     help = "Simple trigger for failing runs"
 
+    def get_locks(self, conf: SectionProxy) -> set:
+        """
+        The kernel writes the coredumps of a program to a single path, two runs of a program cannot wait for theirs at
+        the same time
+        :param conf: the configuration of the program
+        :return: a set of lock names
+        """
+        return {"coredump:{}".format(conf.get_core_path())}
+
     def pre_trigger_run(self, trigger: RawTrigger, *args, **kwargs) -> None:
         """
         Updates the coredumps information in order to generate some correctly
@@ -44,9 +53,19 @@ class Fail(MainPlugin):
         core_path = trigger.conf.get_core_path()
         logging.verbose("core_path: %(core_path)s", dict(core_path=core_path))
 
-        with suppress(OSError):
-            logging.debug("attempting to delete old coredump at %(core_path)s", dict(core_path=core_path))
-            os.remove(core_path)
+        for path in self.core_paths(trigger):
+            logging.debug("attempting to delete old coredump at %(core_path)s", dict(core_path=path))
+            remove_core(path)
+
+    @staticmethod
+    def core_paths(trigger: RawTrigger) -> list:
+        """
+        The paths at which the coredump of the trigger may appear
+        :param trigger: the trigger instance we are running
+        :return: the compressed core written by the core handler and the raw core written by the kernel
+        """
+        core_path = trigger.conf.get_core_path()
+        return [core_path + ".gz", core_path]
 
     def check_trigger_success(self, error: int, trigger: RawTrigger, *args, **kwargs) -> None:
         """
@@ -57,7 +76,6 @@ class Fail(MainPlugin):
         :param kwargs: additional keyword arguments
         :return: 0|PLUGIN_ERROR on success|failure
         """
-        time.sleep(0.1)  # wait for the kernel to generate the coredump. It might take some time under heavy load
         core_path = trigger.conf.get_core_path()
 
         if os.path.exists(trigger.conf.getdir("install_directory") + "/core"):
@@ -74,8 +92,12 @@ class Fail(MainPlugin):
         if os.path.exists(main_core_path):
             shutil.move(main_core_path, core_path)
 
-        if os.path.isfile(core_path):
-            logging.info("Coredump generated at %(core_path)s", dict(core_path=core_path))
+        # the core may still be being written, especially by a server that crashed in a child process. It is only
+        # waited for when the trigger saw a crash
+        timeout = get_global_conf().getfloat("trigger", "core_dump_timeout") if error != 0 else 0
+        core = wait_for_core(self.core_paths(trigger), timeout)
+        if core is not None:
+            logging.info("Coredump generated at %(core_path)s", dict(core_path=core))
 
         else:
             logging.error("Could not generate coredump for %(name)s", dict(name=trigger.conf.get("name")))
@@ -100,10 +122,6 @@ class Fail(MainPlugin):
         """
         destination_folder = os.path.join(get_global_conf().getdir("trigger", "exp-results"), trigger.conf.get("name"))
 
-        with suppress(FileNotFoundError):
-            if not os.path.exists(destination_folder):
-                os.makedirs(destination_folder)
-            shutil.move(
-                trigger.conf.get_core_path(),
-                os.path.join(destination_folder, os.path.basename(trigger.conf.get_core_path()))
-            )
+        for path in self.core_paths(trigger):
+            if os.path.exists(path):
+                logging.verbose("Archived coredump at %(path)s", dict(path=archive_core(path, destination_folder)))
@@ -8,30 +8,20 @@ This module is used to compute and report runtime difference between other plugi
 
 # noinspection PyProtectedMember
 from argparse import _SubParsersAction
+import importlib.util
 import math
 import random
 
 from lib import get_subclasses
 from lib.exceptions import MissingDependency
 from lib.plugins import MetaPlugin, MainPlugin
+from lib.registry import get_registry
+from lib.results import ResultStore
+from lib.trigger.placement import Placement
 from plugins.base.benchmark import Benchmark
 from plugins.base.success import Success
 
 
-try:
-    import matplotlib
-    matplotlib.use('Agg')  # this is required in a GUI-less environment
-    import matplotlib.pyplot
-    import matplotlib.patches
-except ImportError:
-    matplotlib = None
-
-try:
-    import numpy
-except ImportError:
-    numpy = None
-
-
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 
@@ -40,7 +30,6 @@ class Overhead(MetaPlugin):
     This plugin allows to run instrumented runs and compare time spent against a normal run
     """
     help = "A trigger to automatically measure overhead of other plugins"
-    available_plugins = {}
     required = Benchmark
 
     def __init__(self):
@@ -55,20 +44,20 @@ class Overhead(MetaPlugin):
         :param args: additional arguments to pass to parents
         :param kwargs: additional keyword arguments to pass to parents
         """
-        for plugin in get_subclasses(MainPlugin):
-            if plugin == Success:
-                continue
-            cls.available_plugins[str(plugin).rsplit(".", 1)[1].rstrip("'>").lower()] = plugin()
-
         parser = super().register_for_trigger(subparser, *args, **kwargs)
         parser.add_argument(
             "-p", "--plugin", action="append", help="the bug to benchmark. Can be used multiple times",
-            dest="overhead_plugins", required=True, choices=[plugin for plugin in cls.available_plugins]
+            dest="overhead_plugins", required=True,
+            choices=[plugin.__name__.lower() for plugin in get_subclasses(MainPlugin) if plugin != Success]
         )
         parser.add_argument(
             "-g", "--graph", dest="graph_destination",
             help="Generate a overhead report as a graph (you will need matplotlib for this)"
         )
+        parser.add_argument(
+            "-m", "--metric", dest="overhead_metric", default="time", choices=["time", "cpu", "rss"],
+            help="the cost to compare: wall time, cpu time or maximum resident memory. Default : time"
+        )
 
     def before_run(self, overhead_plugins, analysis_plugins, graph_destination, *args, **kwargs):
         """
@@ -82,10 +71,10 @@ class Overhead(MetaPlugin):
         :return: dict containing main_plugins and analysis_plugins
         """
         if graph_destination:
-            if not matplotlib:
-                raise MissingDependency("matplotlib", python_module=True)
-            elif not numpy:
-                raise MissingDependency("numpy", python_module=True)
+            # the libraries are only imported once the graph is generated, as they are slow to load
+            for module in ["matplotlib", "numpy"]:
+                if importlib.util.find_spec(module) is None:
+                    raise MissingDependency(module, python_module=True)
             self.graph_destination = graph_destination
 
         if analysis_plugins is None:
@@ -95,40 +84,37 @@ class Overhead(MetaPlugin):
         else:
             analysis_plugins.append(Benchmark)
         return {
-            "main_plugins": [self.available_plugins[plugin_name] for plugin_name in overhead_plugins] + [Success()],
+            "main_plugins": [get_registry().load(name, "main")() for name in overhead_plugins] + [Success()],
             "analysis_plugins": analysis_plugins
         }
 
-    def after_run(self, plugins, bugs, *args, **kwargs):
+    def after_run(self, plugins, bugs, *args, overhead_metric: str="time", **kwargs):
         """
         Generates the report for the collected data
 
         :param plugins: plugins used on the run
         :param bugs: bugs used on the run
         :param args: additional arguments
+        :param overhead_metric: the cost to compare, one of time, cpu or rss
         :param kwargs: additional keyword arguments
         """
-        entries = {}
         plugin_names = [plugin.__class__.__name__ for plugin in plugins]
-
-        # generate the list of entries, using the most up to date ones
-        with open(Benchmark.benchmark_log, "r") as _file_:
-            for line in _file_.readlines():
-                entry = [x.strip() for x in line.split(",")]
-                if entry[0] in bugs and entry[1] in plugin_names:
-                    plugin_name = entries.get(entry[0], {})
-                    plugin_name[entry[1]] = entry[3]
-                    entries[entry[0]] = plugin_name
+        # runs pinned differently are not comparable
+        store = ResultStore()
+        entries = store.latest(bugs, plugin_names, metric=overhead_metric, placement=Placement.from_conf().key)
 
         # generate a report
         report = {}
         for program in entries:
+            if Success.__name__ not in entries[program]:
+                continue
+
             for plugin in entries[program]:
                 if plugin == Success.__name__:
                     continue
 
                 entry = report.get(program, {})
-                if program.startswith("apache"):
+                if store.higher_is_better(program, plugin, overhead_metric):
                     entry[plugin] = float(entries[program][Success.__name__]) / float(entries[program][plugin])
                 else:
                     entry[plugin] = float(entries[program][plugin]) / float(entries[program][Success.__name__])
@@ -175,11 +161,16 @@ class Overhead(MetaPlugin):
         Generates a graph from the given report
 
         :param report: report to use
+        :raise MissingDependency if matplotlib or numpy is not installed
         """
-        if not matplotlib:
-            raise MissingDependency("matplotlib", python_module=True)
-        elif not numpy:
-            raise MissingDependency("numpy", python_module=True)
+        try:
+            import matplotlib
+            matplotlib.use('Agg')  # this is required in a GUI-less environment
+            import matplotlib.pyplot
+            import matplotlib.patches
+            import numpy
+        except ImportError as exc:
+            raise MissingDependency(exc.name, python_module=True)
 
         width = 0.8
         programs = [key for key in report.keys()]
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+
+"""
+This module benchmarks plugins and compares the results against the stored history, to detect performance regressions
+"""
+
+
+# noinspection PyProtectedMember
+from argparse import _SubParsersAction
+import logging
+import socket
+import statistics
+import time
+
+from lib import get_subclasses
+from lib.plugins import MetaPlugin, MainPlugin
+from lib.registry import get_registry
+from lib.results import ResultStore
+from lib.stats import mann_whitney
+from lib.trigger.placement import Placement
+from plugins.base.benchmark import Benchmark
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class Regression(MetaPlugin):
+    """
+    This plugin benchmarks plugins and fails if they got significantly slower than in previous runs on this host
+    """
+    help = "Benchmarks plugins and reports significant slowdowns compared to previous runs"
+
+    def __init__(self):
+        super().__init__()
+        self.start_time = None
+
+    @classmethod
+    def register_for_trigger(cls, subparser: _SubParsersAction, *args, **kwargs):
+        """
+        Registers for the trigger, adding options to select plugins and tune the detection
+        :param subparser: the parser to use
+        :param args: additional arguments to pass to parents
+        :param kwargs: additional keyword arguments to pass to parents
+        """
+        parser = super().register_for_trigger(subparser, *args, **kwargs)
+        parser.add_argument(
+            "-p", "--plugin", action="append", help="the plugin to benchmark. Can be used multiple times",
+            dest="regression_plugins", required=True,
+            choices=[plugin.__name__.lower() for plugin in get_subclasses(MainPlugin)]
+        )
+        parser.add_argument(
+            "-m", "--metric", dest="regression_metric", default="time", choices=["time", "cpu", "rss"],
+            help="the cost to compare: wall time, cpu time or maximum resident memory. Default : time"
+        )
+        parser.add_argument(
+            "--days", dest="regression_days", type=float, default=30,
+            help="how many days of history to compare against. Default : 30"
+        )
+        parser.add_argument(
+            "--threshold", dest="regression_threshold", type=float, default=0.05,
+            help="the minimum relative slowdown of the median to report. Default : 0.05"
+        )
+        parser.add_argument(
+            "--alpha", dest="regression_alpha", type=float, default=0.01,
+            help="the significance level of the Mann-Whitney test. Default : 0.01"
+        )
+        parser.add_argument(
+            "--min-samples", dest="regression_min_samples", type=int, default=5,
+            help="the minimum number of samples of this run and of the history needed to compare them, as the test "
+                 "cannot reach a low p-value with fewer. Default : 5"
+        )
+
+    def before_run(self, regression_plugins, analysis_plugins, *args, **kwargs):
+        """
+        Sets up the plugins to benchmark
+
+        :param regression_plugins: list of plugins for which to run main
+        :param analysis_plugins: analysis plugins to enable
+        :param args: additional arguments
+        :param kwargs: additional keyword arguments
+        :return: dict containing main_plugins and analysis_plugins
+        """
+        self.start_time = time.time()
+
+        if analysis_plugins is None:
+            analysis_plugins = [Benchmark]
+        elif Benchmark not in analysis_plugins:
+            analysis_plugins.append(Benchmark)
+
+        return {
+            "main_plugins": [get_registry().load(name, "main")() for name in regression_plugins],
+            "analysis_plugins": analysis_plugins
+        }
+
+    # pylint: disable=too-many-arguments
+    def after_run(self, plugins, bugs, *args, regression_metric: str="time", regression_days: float=30,
+                  regression_threshold: float=0.05, regression_alpha: float=0.01, regression_min_samples: int=5,
+                  **kwargs) -> int:
+        """
+        Compares the samples of this run to the history of each bug and plugin, and reports the regressions
+
+        :param plugins: plugins used on the run
+        :param bugs: bugs used on the run
+        :param args: additional arguments
+        :param regression_metric: the cost to compare, one of time, cpu or rss
+        :param regression_days: the number of days of history to compare against
+        :param regression_threshold: the minimum relative slowdown to report
+        :param regression_alpha: the significance level of the test
+        :param regression_min_samples: the minimum number of new and old samples to compare
+        :param kwargs: additional keyword arguments
+        :return: 0 | 1 if no | some regression was found
+        """
+        store = ResultStore()
+        host = socket.gethostname()
+        placement = Placement.from_conf().key
+        regressions = []
+        output = "{:<20}|{:^12}|{:^10}|{:^10}|{:^17}|\n".format("bug", "plugin", "change", "p-value", "verdict")
+        output += "-" * 74 + "\n"
+
+        for bug in bugs:
+            for plugin in [plugin.__class__.__name__ for plugin in plugins]:
+                new = store.history(
+                    bug, plugin, metric=regression_metric, since=self.start_time, host=host, placement=placement
+                )
+                old = store.history(
+                    bug, plugin, metric=regression_metric, since=self.start_time - regression_days * 24 * 3600,
+                    until=self.start_time, host=host, placement=placement
+                )
+                if not new or not old:
+                    output += "{:<20}|{:^12}|{:^10}|{:^10}|{:^17}|\n".format(bug, plugin, "-", "-", "no history")
+                    continue
+
+                if min(len(new), len(old)) < regression_min_samples:
+                    logging.warning(
+                        "Only %(new)s new and %(old)s old samples for %(bug)s under %(plugin)s, %(needed)s of each are "
+                        "needed to detect a regression. Run it more times, or raise [benchmark] kept_runs",
+                        dict(new=len(new), old=len(old), bug=bug, plugin=plugin, needed=regression_min_samples)
+                    )
+                    output += "{:<20}|{:^12}|{:^10}|{:^10}|{:^17}|\n".format(bug, plugin, "-", "-", "too few samples")
+                    continue
+
+                if store.higher_is_better(bug, plugin, regression_metric):
+                    change = statistics.median(old) / statistics.median(new) - 1
+                    p_value = mann_whitney(old, new)
+                else:
+                    change = statistics.median(new) / statistics.median(old) - 1
+                    p_value = mann_whitney(new, old)
+
+                verdict = "ok"
+                if p_value < regression_alpha and change > regression_threshold:
+                    verdict = "REGRESSION"
+                    regressions.append((bug, plugin))
+
+                output += "{:<20}|{:^12}|{:>+9.1%} |{:^10.4f}|{:^17}|\n".format(bug, plugin, change, p_value, verdict)
+
+        print(output)
+        return 1 if regressions else 0
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+A plugin sweeping client/server triggers over numbers of clients and iterations, to see where the bug starts to show
+and where the server stops scaling
+"""
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+import logging
+
+from lib.exceptions import PluginIncompatibleException
+from lib.parsers.configuration import get_global_conf
+from lib.plugins import AnalysisPlugin, MainPlugin
+from lib.trigger import RawTrigger, TriggerWithHelper
+from lib.trigger.sweep import grid, sweep
+
+
+class Sweep(AnalysisPlugin):
+    """
+    The Sweep plugin. Replaces the trigger run by a sweep over the [trigger] sweep_clients and sweep_iterations grid,
+    triggering the bug [trigger] sweep_runs times at each point and timing the helpers once
+    """
+    help = "Sweep client/server triggers over numbers of clients and iterations"
+
+    @classmethod
+    def options(cls) -> list:
+        """
+        The options to launch the sweep
+        """
+        return ["--sweep"]
+
+    def pre_trigger_run(self, trigger: RawTrigger, *args, **kwargs) -> None:
+        """
+        Replaces the trigger run by the sweep
+        :param trigger: the trigger instance to be run
+        :param args: additional arguments
+        :param kwargs: additional keyword arguments
+        :raise PluginIncompatibleException if the trigger has no helpers to scale
+        """
+        if not isinstance(trigger, TriggerWithHelper):
+            raise PluginIncompatibleException(
+                "{} has no client/server trigger to sweep".format(trigger.conf.get("name"))
+            )
+
+        conf = get_global_conf()
+        points = grid(
+            [int(clients) for clients in conf.getlist("trigger", "sweep_clients")],
+            [int(iterations) for iterations in conf.getlist("trigger", "sweep_iterations", fallback=[])]
+        )
+        runs = conf.getint("trigger", "sweep_runs")
+        run = trigger.run
+
+        def sweep_run() -> int:
+            """
+            Runs the sweep and keeps its results in the trigger
+            :return: 0|1 if the sweep could|could not run the bug at every point
+            """
+            trigger.returned_information = [point.as_dict() for point in sweep(trigger, run, points, runs)]
+            return int(any(point["unexpected"] == point["runs"] for point in trigger.returned_information))
+
+        trigger.run = sweep_run
+
+    def post_trigger_run(self, trigger: RawTrigger, main_plugin: MainPlugin, *args, **kwargs) -> None:
+        """
+        Shows the trigger probability and throughput at every point of the sweep
+        :param trigger: the trigger instance that is run
+        :param main_plugin: the main plugin under which we run
+        :param args: additional arguments
+        :param kwargs: additional keyword arguments
+        """
+        output = "{:<20}|{:^12}|{:^10}|{:^12}|{:^12}|{:^16}|\n".format(
+            "bug", "plugin", "clients", "iterations", "triggered", "throughput"
+        )
+        output += "-" * 88 + "\n"
+        for point in trigger.returned_information:
+            output += "{:<20}|{:^12}|{:^10}|{:^12}|{:^12.1%}|{:^16}|\n".format(
+                trigger.conf.get("name"), main_plugin.__class__.__name__, point["clients"],
+                "default" if point["iterations"] is None else point["iterations"], point["probability"],
+                "-" if point["throughput"] is None else "{:.1f}/s".format(point["throughput"])
+            )
+
+        logging.info("Sweep results :\n%(output)s", dict(output=output))
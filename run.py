@@ -14,11 +14,13 @@ import sys
 from lib.configuration.coredump import change_coredump_filter
 from lib.exceptions import ProgramNotInstalledException, PluginIncompatibleException
 from lib.constants import PROGRAM_ARGUMENT_ERROR
-from lib.hooks import load_plugins, register_for_trigger, pre_trigger_run, check_trigger_success, post_trigger_run, \
-    post_trigger_clean, before_run, after_run
+from lib.hooks import register_for_trigger, resolve_plugins, pre_trigger_run, check_trigger_success, \
+    post_trigger_run, post_trigger_clean, before_run, after_run
 from lib.plugins import MainPlugin, MetaPlugin
 from lib.parsers.arguments import SmartArgumentParser
 from lib.parsers.configuration import get_global_conf, get_trigger_conf
+from lib.trigger.reproduction import estimate_reproduction
+from lib.trigger.scheduler import Task, TriggerScheduler
 from lib import logger
 from lib.parsers import arguments
 
@@ -41,6 +43,16 @@ def parse_args(args: list) -> dict:
     plugin_parser = parser.add_subparsers(metavar="plugin")
     parser.add_argument("bugs", nargs="+", type=str, help="one of {} or all".format(", ".join(PROGRAMS)), metavar="bug",
                         choices=PROGRAMS+["all"])
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="the number of cpus to use for running triggers concurrently. Triggers locking the same resources are "
+             "never run together"
+    )
+    parser.add_argument(
+        "--reproduce", type=int, default=0, metavar="RUNS",
+        help="estimate how often each bug reproduces, triggering it at most RUNS times and stopping as soon as the "
+             "confidence interval of the rate is narrower than [trigger] reproduction_precision"
+    )
 
     register_for_trigger(parser=parser, subparser=plugin_parser)
 
@@ -61,18 +73,28 @@ def parse_args(args: list) -> dict:
                 parser.print_help()
                 exit(PROGRAM_ARGUMENT_ERROR)
 
-    return vars(parsed_args)
+    resolved_args = resolve_plugins(vars(parsed_args))
+    if resolved_args["reproduce"] and isinstance(resolved_args["main_plugin"], MetaPlugin):
+        # meta plugins combine the results of every run in after_run, which reproduction runs never reach
+        logging.error("--reproduce cannot be used with meta plugins")
+        parser.print_help()
+        exit(PROGRAM_ARGUMENT_ERROR)
 
+    return resolved_args
 
-def trigger_bug(bug: str, main_plugin: MainPlugin, **kwargs: dict) -> int:
+
+def trigger_bug(bug: str, main_plugin: MainPlugin, report_trigger_result: bool=False, **kwargs: dict) -> int:
     """
     Trigger a bug against the main_plugin
     :param bug: the bug to trigger
     :param main_plugin: the plugin against which to trigger
+    :param report_trigger_result: return what the trigger's run returned instead of the verdict of the main plugin
     :param kwargs: additional keywords arguments to pass
-    :return: 0|!0 on success| failure
+    :return: 0|!0 on success| failure, or 0|1|None if the bug did not show|showed|ended unexpectedly with
+             report_trigger_result
     """
     plugin_args = kwargs.copy()
+    logger.start_new_log_section(bug, "triggering")
 
     try:
         logging.info("Triggering %(bug)s", dict(bug=bug))
@@ -89,6 +111,8 @@ def trigger_bug(bug: str, main_plugin: MainPlugin, **kwargs: dict) -> int:
         if not os.path.exists(trigger.conf.getdir("install_directory")):
             raise ProgramNotInstalledException(trigger.conf.get("name"))
 
+        change_coredump_filter(trigger.conf.get("core_dump_filter", None))
+
         pre_trigger_run(**plugin_args)
 
         plugin_args["error"] = trigger.run()
@@ -96,20 +120,103 @@ def trigger_bug(bug: str, main_plugin: MainPlugin, **kwargs: dict) -> int:
         error = check_trigger_success(**plugin_args)
         if error:
             logging.error("%(bug)s did not run successfully", dict(bug=bug))
-            return error
+            return plugin_args["error"] if report_trigger_result else error
 
         post_trigger_run(**plugin_args)
+        return plugin_args["error"] if report_trigger_result else 0
 
     finally:
         logging.verbose("Cleaning environment")
         post_trigger_clean(**plugin_args)
+        if "trigger" in plugin_args:
+            plugin_args["trigger"].release_resources()
+
+
+def get_trigger_task(bug: str, main_plugin: MainPlugin, **kwargs: dict) -> Task:
+    """
+    Creates a scheduler task to trigger the bug, locking the resources its trigger declares
+    :param bug: the bug to trigger
+    :param main_plugin: the plugin against which to trigger
+    :param kwargs: additional keyword arguments to pass to trigger_bug
+    :return: the task to schedule
+    """
+    trigger_class = importlib.import_module("data.{}.trigger".format(bug)).Trigger
+    conf = get_trigger_conf(bug)
+    return Task(
+        trigger_bug, dict(bug=bug, main_plugin=main_plugin, **kwargs),
+        locks=trigger_class.get_locks(conf) | main_plugin.get_locks(conf), cpus=trigger_class.get_cpus()
+    )
+
+
+def run_triggers(runs: list, jobs: int, **kwargs: dict) -> list:
+    """
+    Triggers all (plugin, bug) pairs given, using at most jobs processes
+    :param runs: list of (main_plugin, bug) to trigger
+    :param jobs: the number of triggers that can run concurrently
+    :param kwargs: additional keyword arguments to pass to trigger_bug
+    :return: a list of (return value, exception) in the same order as runs
+    """
+    if jobs <= 1:
+        results = []
+        for plugin, bug in runs:
+            try:
+                results.append((trigger_bug(bug=bug, main_plugin=plugin, **kwargs), None))
+            except (PluginIncompatibleException, ProgramNotInstalledException) as exc:
+                results.append((None, exc))
+        return results
 
+    tasks = [get_trigger_task(bug, plugin, **kwargs) for plugin, bug in runs]
+    scheduler = TriggerScheduler(jobs, expected_exceptions=(PluginIncompatibleException, ProgramNotInstalledException))
+    return scheduler.run(tasks)
 
-def main(bugs: list, main_plugin: MainPlugin or MetaPlugin, **kwargs: dict) -> None:
+
+def reproduce_triggers(runs: list, jobs: int, max_runs: int, **kwargs: dict) -> int:
+    """
+    Estimates the reproduction rate of all (plugin, bug) pairs given, a run reproducing the bug when its trigger saw
+    it, whatever the verdict of the plugin
+    :param runs: list of (main_plugin, bug) to trigger
+    :param jobs: the number of triggers that can run concurrently
+    :param max_runs: the maximum number of times to trigger each bug
+    :param kwargs: additional keyword arguments to pass to trigger_bug
+    :return: 0|1 if every|not every pair could be run
+    """
+    conf = get_global_conf()
+    output = "{:<20}|{:^12}|{:^8}|{:^12}|{:^8}|{:^18}|\n".format(
+        "bug", "plugin", "runs", "reproduced", "rate", "interval"
+    )
+    output += "-" * 84 + "\n"
+    error = 0
+
+    for plugin, bug in runs:
+        estimate = estimate_reproduction(
+            lambda count, plugin=plugin, bug=bug: run_triggers(
+                [(plugin, bug)] * count, jobs, report_trigger_result=True, **kwargs
+            ),
+            batch_size=jobs, max_runs=max_runs, min_runs=conf.getint("trigger", "reproduction_min_runs"),
+            precision=conf.getfloat("trigger", "reproduction_precision"),
+            confidence=conf.getfloat("trigger", "reproduction_confidence")
+        )
+        for exc in estimate.errors:
+            logging.warning(exc)
+            error = 1
+
+        output += "{:<20}|{:^12}|{:^8}|{:^12}|{:^8.1%}|{:^18}|\n".format(
+            bug, plugin.__class__.__name__, estimate.runs, estimate.reproduced, estimate.rate,
+            "[{:.1%}, {:.1%}]".format(*estimate.interval)
+        )
+
+    print(output)
+    return error
+
+
+def main(bugs: list, main_plugin: MainPlugin or MetaPlugin, jobs: int=1, reproduce: int=0, **kwargs: dict) -> None:
     """
     Run all given bugs
     :param bugs: bugs to run
     :param main_plugin: the main plugin enabled for the run
+    :param jobs: the number of triggers to run concurrently
+    :param reproduce: if not 0, the maximum number of runs to do to estimate the reproduction rate of each bug. Only
+                      valid with a MainPlugin
     :param kwargs: additional information for bug triggering
     """
     change_coredump_filter()
@@ -121,16 +228,18 @@ def main(bugs: list, main_plugin: MainPlugin or MetaPlugin, **kwargs: dict) -> N
     else:
         main_plugins = [main_plugin]
 
+    runs = [(plugin, bug) for plugin in main_plugins for bug in bugs]
+    if reproduce:
+        return reproduce_triggers(runs, jobs, reproduce, **kwargs)
+
     return_values = []
     exceptions = []
-    for plugin in main_plugins:
-        for bug in bugs:
-            try:
-                logger.start_new_log_section(bug, "triggering")
-                return_values.append(trigger_bug(bug=bug, main_plugin=plugin, **kwargs))
-            except (PluginIncompatibleException, ProgramNotInstalledException) as exc:
-                logging.warning(exc)
-                exceptions.append(exc)
+    for value, exc in run_triggers(runs, jobs, **kwargs):
+        if exc is not None:
+            logging.warning(exc)
+            exceptions.append(exc)
+        else:
+            return_values.append(value)
 
     err = None
     if isinstance(main_plugin, MetaPlugin):
@@ -147,7 +256,6 @@ def main(bugs: list, main_plugin: MainPlugin or MetaPlugin, **kwargs: dict) -> N
 if __name__ == "__main__":
     try:
         logger.setup_logging()
-        load_plugins()
         exit(main(**parse_args(sys.argv[1:])))
     except KeyboardInterrupt:
         exit(1)
@@ -11,6 +11,12 @@ __author__ = 'Benjamin Schubert, ben.c.schubert@gmail.com'
 import abc
 import unittest
 
+from lib.logger import register_verbose_level
+
+
+# the code under test logs with logging.verbose, which only exists once the level is registered
+register_verbose_level()
+
 
 class UnitTest(unittest.TestCase, metaclass=abc.ABCMeta):
     """
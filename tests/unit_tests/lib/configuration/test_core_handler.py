@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the coredump handler
+"""
+
+import gzip
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+from lib.configuration.core_handler import CoreStackHasher, metadata_path, store_core
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+def note(kind: int, description: bytes) -> bytes:
+    """
+    :param kind: the type of the note
+    :param description: the content of the note
+    :return: an ELF note owned by CORE
+    """
+    description += bytes(-len(description) % 4)
+    return struct.pack("<III", 5, len(description), kind) + b"CORE\0\0\0\0" + description
+
+
+def make_core(text_base: int=0x400000, stack_base: int=0x7ffd0000, return_addresses: tuple=(0x50, 0x60, 0x70),
+              signal: int=11) -> bytes:
+    """
+    Builds a minimal x86_64 core, with a program mapped at text_base and a stack with a chain of frames
+
+    :param text_base: where the program is loaded
+    :param stack_base: where the stack is
+    :param return_addresses: the offsets in the program of the return addresses of the frames
+    :param signal: the signal that killed the program
+    :return: the core
+    """
+    registers = [0] * 27
+    registers[4] = stack_base + 0x200
+    registers[16] = text_base + 0x40
+    registers[19] = stack_base + 0x100
+    status = bytearray(336)
+    struct.pack_into("<h", status, 12, signal)
+    struct.pack_into("<27Q", status, 112, *registers)
+
+    name = b"/usr/bin/program\0"
+    files = struct.pack("<QQQQQ", 1, 4096, text_base, text_base + 0x1000, 0) + name
+    notes = note(1, bytes(status)) + note(0x46494c45, files)
+
+    stack = bytearray(0x2000)
+    for index, offset in enumerate(return_addresses):
+        frame = 0x200 + 0x100 * index
+        previous = stack_base + frame + 0x100 if index + 1 < len(return_addresses) else 0
+        struct.pack_into("<QQ", stack, frame, previous, text_base + offset)
+
+    notes_offset = 64 + 3 * 56
+    stack_offset = notes_offset + len(notes)
+    headers = [
+        (4, 0, notes_offset, 0, 0, len(notes), 0, 1),
+        (1, 5, stack_offset, text_base, 0, 0, 0x1000, 4096),
+        (1, 6, stack_offset, stack_base, 0, len(stack), len(stack), 4096),
+    ]
+    header = struct.pack(
+        "<16sHHIQQQIHHHHHH", b"\x7fELF\x02\x01\x01", 4, 62, 1, 0, 64, 0, 0, 64, 56, len(headers), 0, 0, 0
+    )
+    return header + b"".join(struct.pack("<IIQQQQQQ", *entry) for entry in headers) + notes + bytes(stack)
+
+
+def digest(core: bytes, chunk_size: int=None) -> str:
+    """
+    :param core: the core to hash
+    :param chunk_size: the size of the chunks to feed the core by, all at once by default
+    :return: the hash of the core
+    """
+    hasher = CoreStackHasher()
+    chunk_size = chunk_size or len(core)
+    for offset in range(0, len(core), chunk_size):
+        hasher.feed(core[offset:offset + chunk_size])
+    return hasher.hexdigest()
+
+
+class TestCoreStackHasher(UnitTest):
+    """
+    Tests for CoreStackHasher
+    """
+    def test_frames_are_followed(self):
+        """ Checks that the program counter and every return address are found, relative to the program """
+        hasher = CoreStackHasher()
+        hasher.feed(make_core())
+        self.assertEqual(
+            ["program+0x40", "program+0x50", "program+0x60", "program+0x70"],
+            [hasher.symbolize(frame) for frame in hasher.frames()]
+        )
+        self.assertEqual(11, hasher.signal)
+
+    def test_hash_does_not_depend_on_chunks(self):
+        """ Checks that the hash is the same however the core is streamed """
+        expected = digest(make_core())
+        self.assertIsNotNone(expected)
+        for chunk_size in [1, 7, 64, 100, 4096]:
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(expected, digest(make_core(), chunk_size))
+
+    def test_hash_does_not_depend_on_addresses(self):
+        """ Checks that the same crash has the same hash wherever the program and stack are loaded """
+        self.assertEqual(digest(make_core()), digest(make_core(text_base=0x55550000, stack_base=0x7fff1000)))
+
+    def test_different_crashes_have_different_hashes(self):
+        """ Checks that a different stack or signal gives a different hash """
+        self.assertNotEqual(digest(make_core()), digest(make_core(return_addresses=(0x50, 0x68, 0x70))))
+        self.assertNotEqual(digest(make_core()), digest(make_core(signal=6)))
+
+    def test_invalid_core(self):
+        """ Checks that anything that is not a core has no hash """
+        self.assertIsNone(digest(b"not a core at all" * 10))
+        self.assertIsNone(digest(make_core()[:200]))
+
+
+class TestStoreCore(UnitTest):
+    """
+    Tests for store_core
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_core_is_compressed_and_described(self):
+        """ Checks that the core is stored compressed, with its hash and size next to it """
+        core = make_core()
+        destination = os.path.join(self.directory, "program.core.gz")
+        metadata = store_core(io.BytesIO(core), destination, metadata={"pid": 42})
+
+        with gzip.open(destination) as _file_:
+            self.assertEqual(core, _file_.read())
+        with open(metadata_path(destination)) as _file_:
+            self.assertEqual(metadata, json.load(_file_))
+
+        self.assertEqual(digest(core), metadata["stack_hash"])
+        self.assertEqual(len(core), metadata["size"])
+        self.assertEqual(42, metadata["pid"])
+        self.assertEqual(
+            sorted(["program.core.gz", "program.core.json"]), sorted(os.listdir(self.directory))
+        )
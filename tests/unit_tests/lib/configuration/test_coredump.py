@@ -18,6 +18,7 @@ __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 
 @patch("lib.configuration.coredump.launch_and_log_as_root", lambda cmd: raise_(Exception(" ".join(cmd))))
+@patch("lib.configuration.coredump.core_pattern", lambda: "/tmp/coredumps/%E.core")
 class TestCoredumps(UnitTest):
     call_regexp = r"^echo.*?sysctl.conf$"
 
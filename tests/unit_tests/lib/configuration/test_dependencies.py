@@ -6,7 +6,6 @@
 Tests for dependency handler
 """
 
-import logging
 import os
 from unittest import mock
 import sys
@@ -22,9 +21,6 @@ __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 
 class InstallTester(UnitTest):
-    def setUp(self):
-        logging.verbose = logging.debug
-
     def launch_and_log_modules(self, cmd, expected):
         self.assertEqual("--user" in cmd, expected)
 
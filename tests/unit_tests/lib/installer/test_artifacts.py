@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the artifact store
+"""
+
+import hashlib
+import os
+import tempfile
+
+from lib.exceptions import InstallationErrorException
+from lib.installer.artifacts import ArtifactStore
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestArtifactStore(UnitTest):
+    """
+    Tests for ArtifactStore
+    """
+    def setUp(self):
+        """ Creates a store and two local mirrors, the first one having a corrupted archive """
+        self.directory = tempfile.TemporaryDirectory()
+        self.mirrors = []
+        for name, content in [("corrupted", b"corrupted sources"), ("good", b"sources")]:
+            mirror = os.path.join(self.directory.name, name)
+            os.makedirs(mirror)
+            with open(os.path.join(mirror, "program-1.0.tar.gz"), "wb") as _file_:
+                _file_.write(content)
+            self.mirrors.append("file://" + mirror)
+
+        self.checksum = hashlib.sha256(b"sources").hexdigest()
+        self.url = "http://localhost:1/program-1.0.tar.gz"
+        self.store_directory = os.path.join(self.directory.name, "store")
+        self.destination = os.path.join(self.directory.name, "src", "program-1.0.tar.gz")
+
+    def tearDown(self):
+        """ Removes the directories """
+        self.directory.cleanup()
+
+    def test_mirrors_are_verified(self):
+        """ Checks that an archive not matching its checksum is skipped for the next mirror """
+        ArtifactStore(self.store_directory, self.mirrors).fetch(self.url, self.destination, self.checksum)
+
+        with open(self.destination, "rb") as _file_:
+            self.assertEqual(_file_.read(), b"sources")
+
+    def test_stored_artifacts_need_no_mirror(self):
+        """
+        Checks that an artifact is served from the store once it was fetched, with the checksum it was stored with
+        """
+        ArtifactStore(self.store_directory, self.mirrors[1:]).fetch(self.url, self.destination)
+        os.remove(self.destination)
+
+        store = ArtifactStore(self.store_directory, [])
+        self.assertEqual(store.known_checksum("program-1.0.tar.gz"), self.checksum)
+        store.fetch(self.url, self.destination)
+        self.assertTrue(os.path.exists(self.destination))
+
+    def test_first_checksum_is_trusted(self):
+        """ Checks that a later copy of an artifact has to match the first one stored """
+        ArtifactStore(self.store_directory, self.mirrors[1:]).fetch(self.url, self.destination)
+        os.remove(os.path.join(self.store_directory, "sha256", self.checksum))
+
+        with self.assertRaises(InstallationErrorException):
+            ArtifactStore(self.store_directory, self.mirrors[:1]).fetch(self.url, self.destination)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the build cache
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from lib.installer.cache import BuildCache
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestBuildCache(UnitTest):
+    """
+    Tests for BuildCache
+    """
+    def setUp(self):
+        """ Creates a fake installer with install, build, patches and source directories """
+        self.directory = tempfile.TemporaryDirectory()
+        for name in ["install", "build", "pristine", "patches", "src"]:
+            os.makedirs(os.path.join(self.directory.name, name))
+
+        with open(os.path.join(self.directory.name, "install", "program"), "w") as _file_:
+            _file_.write("binary")
+        with open(os.path.join(self.directory.name, "build", "program.o"), "w") as _file_:
+            _file_.write("object")
+        with open(os.path.join(self.directory.name, "patches", "fix.patch"), "w") as _file_:
+            _file_.write("patch")
+
+        self.installer = mock.Mock(
+            install_dir=os.path.join(self.directory.name, "install"),
+            working_dir=os.path.join(self.directory.name, "build"),
+            pristine_dir=os.path.join(self.directory.name, "pristine"),
+            patches_path=os.path.join(self.directory.name, "patches"),
+            additional_sources_path=os.path.join(self.directory.name, "src"),
+            conf={"name": "program", "display_name": "program", "configure_args": "--enable-fast"},
+            env={"CC": "false-compiler-that-does-not-exist"}
+        )
+        self.installer.source_fingerprint.return_value = "archive:1234"
+        self.cache_directory = os.path.join(self.directory.name, "cache")
+
+    def tearDown(self):
+        """ Removes the directories """
+        self.directory.cleanup()
+
+    def test_store_and_restore(self):
+        """ Checks that a stored build is restored in place of the install, build and pristine directories """
+        cache = BuildCache(self.installer, self.cache_directory)
+        self.assertFalse(cache.restore())
+        cache.store()
+
+        os.remove(os.path.join(self.installer.install_dir, "program"))
+        shutil.rmtree(self.installer.working_dir)
+        shutil.rmtree(self.installer.pristine_dir)
+
+        self.assertTrue(BuildCache(self.installer, self.cache_directory).restore())
+        with open(os.path.join(self.installer.install_dir, "program")) as _file_:
+            self.assertEqual(_file_.read(), "binary")
+        self.assertTrue(os.path.exists(os.path.join(self.installer.working_dir, "program.o")))
+        self.assertTrue(os.path.isdir(self.installer.pristine_dir))
+
+    def test_key_depends_on_build_inputs(self):
+        """ Checks that changing the sources, patches, configuration or environment changes the key """
+        key = BuildCache(self.installer, self.cache_directory).key
+        self.assertEqual(key, BuildCache(self.installer, self.cache_directory).key)
+
+        with open(os.path.join(self.installer.patches_path, "fix.patch"), "w") as _file_:
+            _file_.write("another patch")
+        patched_key = BuildCache(self.installer, self.cache_directory).key
+        self.assertNotEqual(key, patched_key)
+
+        self.installer.conf["configure_args"] = "--disable-fast"
+        configured_key = BuildCache(self.installer, self.cache_directory).key
+        self.assertNotEqual(patched_key, configured_key)
+
+        self.installer.env["CFLAGS"] = "-O3"
+        self.assertNotEqual(configured_key, BuildCache(self.installer, self.cache_directory).key)
+
+    def test_unidentified_sources_are_not_cached(self):
+        """ Checks that nothing is cached when the sources cannot be identified """
+        self.installer.source_fingerprint.return_value = None
+        cache = BuildCache(self.installer, self.cache_directory)
+        cache.store()
+
+        self.assertFalse(os.path.exists(self.cache_directory))
+        self.assertFalse(cache.restore())
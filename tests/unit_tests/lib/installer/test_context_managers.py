@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the context managers used to build plugin-specific executables
+"""
+
+import os
+import tempfile
+from unittest import mock
+
+from lib.installer.context_managers import VariantBuildManager
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestVariantBuildManager(UnitTest):
+    """
+    Tests for VariantBuildManager
+    """
+    def setUp(self):
+        """ Creates a fake installer with a configured build tree and a copy of its sources """
+        self.directory = tempfile.TemporaryDirectory()
+        working_dir = os.path.join(self.directory.name, "build", "memcached")
+        pristine_dir = os.path.join(self.directory.name, "variants", ".pristine")
+        for directory in [working_dir, pristine_dir]:
+            os.makedirs(directory)
+
+        with open(os.path.join(working_dir, "Makefile"), "w") as _file_:
+            _file_.write("abs_builddir = {}\n".format(working_dir))
+        with open(os.path.join(pristine_dir, "configure"), "w") as _file_:
+            _file_.write("#!/bin/sh\n")
+
+        self.installer = mock.Mock(
+            working_dir=working_dir,
+            variants_dir=os.path.join(self.directory.name, "variants"),
+            pristine_dir=pristine_dir,
+            patches_path=os.path.join(self.directory.name, "patches"),
+            conf=mock.Mock(**{"get.return_value": "memcached-127", "getlist.return_value": ["post-config.patch"]})
+        )
+
+    def tearDown(self):
+        """ Removes the directories """
+        self.directory.cleanup()
+
+    def test_build_tree_is_configured_from_sources(self):
+        """ Checks that the tree is a patched copy of the sources configured in place, not a copy of the build """
+        with VariantBuildManager(self.installer, "fail") as variant:
+            self.assertTrue(variant.is_patched)
+            self.assertTrue(os.path.exists(os.path.join(variant.directory, "configure")))
+            self.assertFalse(os.path.exists(os.path.join(variant.directory, "Makefile")))
+
+        self.assertEqual(self.installer.mock_calls, [
+            mock.call.conf.get("display_name"),
+            mock.call.patch(variant.patch, variant.directory, patches_path=variant.patches_path),
+            mock.call.configure(variant.directory),
+            mock.call.conf.getlist("patches_post_config", []),
+            mock.call.patch(["post-config.patch"], variant.directory),
+        ])
+
+    def test_build_tree_is_kept(self):
+        """ Checks that the tree is configured only once, and kept with its build products """
+        with VariantBuildManager(self.installer, "fail") as variant:
+            with open(os.path.join(variant.directory, "memcached"), "w") as _file_:
+                _file_.write("binary")
+
+        with VariantBuildManager(self.installer, "fail") as variant:
+            self.assertTrue(os.path.exists(os.path.join(variant.directory, "memcached")))
+
+        self.assertEqual(self.installer.configure.call_count, 1)
+
+    def test_changed_patch_recreates_tree(self):
+        """ Checks that the tree is copied and configured again if the patch is not the one it was built with """
+        with VariantBuildManager(self.installer, "fail") as variant:
+            with open(os.path.join(variant.directory, variant.STAMP), "w") as _file_:
+                _file_.write("an older patch")
+
+        with VariantBuildManager(self.installer, "fail"):
+            pass
+
+        self.assertEqual(self.installer.configure.call_count, 2)
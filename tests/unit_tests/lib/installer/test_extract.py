@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the extraction of archives
+"""
+
+import io
+import os
+import tarfile
+import tempfile
+from unittest import mock
+
+from lib.installer import extract
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestExtraction(UnitTest):
+    """
+    Tests for the extraction helpers and ExtractionCache
+    """
+    def setUp(self):
+        """ Creates a small compressed archive """
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.directory.name, "program-1.0.tar.gz")
+        with tarfile.open(self.archive, "w:gz") as tar:
+            info = tarfile.TarInfo("program-1.0/main.c")
+            info.size = len(b"int main;")
+            tar.addfile(info, io.BytesIO(b"int main;"))
+
+    def tearDown(self):
+        """ Removes the directory """
+        self.directory.cleanup()
+
+    def check_extracted(self, destination: str) -> None:
+        """ Checks that the archive was extracted in the destination """
+        with open(os.path.join(destination, "program-1.0", "main.c")) as _file_:
+            self.assertEqual(_file_.read(), "int main;")
+
+    def test_extract_with_external_tools(self):
+        """ Checks extraction through an external decompressor and tar """
+        destination = os.path.join(self.directory.name, "external")
+        extract.extract(self.archive, destination)
+        self.check_extracted(destination)
+
+    def test_extract_with_tarfile(self):
+        """ Checks extraction when no external decompressor is available """
+        destination = os.path.join(self.directory.name, "python")
+        with mock.patch("lib.installer.extract.decompressor", return_value=None):
+            extract.extract(self.archive, destination)
+        self.check_extracted(destination)
+
+    def test_cache_extracts_once(self):
+        """ Checks that an archive is extracted only once, and copied out of the cache afterwards """
+        cache = extract.ExtractionCache(os.path.join(self.directory.name, "cache"))
+        with mock.patch("lib.installer.extract.extract", wraps=extract.extract) as extraction:
+            for name in ["first", "second"]:
+                cache.extract(self.archive, os.path.join(self.directory.name, name))
+                self.check_extracted(os.path.join(self.directory.name, name))
+
+        self.assertEqual(extraction.call_count, 1)
+        self.assertEqual(cache.tree(self.archive), cache.tree(self.archive))
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the dependency graph installer and its jobserver
+"""
+
+import os
+import select
+import subprocess
+import tempfile
+import threading
+import time
+import types
+from unittest import mock
+
+from lib import constants
+from lib.installer import Installer
+from lib.installer.scheduler import InstallNode, InstallScheduler, JobServer, section_dependencies
+from lib.parsers.configuration import get_global_conf, get_program_conf
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class FakeInstaller:  # pylint: disable=too-few-public-methods
+    """
+    An installer recording when it ran in a file
+
+    :param name: the name of the installer
+    :param log: the file in which to record the run
+    :param fail: whether the installation fails
+    :param exit_code: if set, the code with which the installation process exits without reporting
+    """
+    def __init__(self, name: str, log: str, fail: bool=False, exit_code: int=None):
+        self.conf = {"name": name}
+        self.log = log
+        self.fail = fail
+        self.exit_code = exit_code
+
+    def run(self) -> int:
+        """ Records the start and end of the run """
+        with open(self.log, "a") as _file_:
+            _file_.write("start {}\n".format(self.conf["name"]))
+        time.sleep(0.1)
+        if self.fail:
+            raise RuntimeError("Compilation failed")
+        if self.exit_code is not None:
+            os._exit(self.exit_code)  # pylint: disable=protected-access
+        with open(self.log, "a") as _file_:
+            _file_.write("end {}\n".format(self.conf["name"]))
+        return 0
+
+
+class TestInstallScheduler(UnitTest):
+    """
+    Tests for the InstallScheduler
+    """
+    def setUp(self):
+        """ Disables the progress bar and creates a log of installations """
+        get_global_conf().set("install", "show_progress", "false")
+        self.log = tempfile.NamedTemporaryFile()
+
+    def tearDown(self):
+        """ Removes the log """
+        self.log.close()
+
+    def read_log(self) -> list:
+        """ :return: the lines of the log """
+        with open(self.log.name) as _file_:
+            return _file_.read().splitlines()
+
+    def test_sections_depend_on_libraries_and_references(self):
+        """ Checks that libraries and sections referred to in the configuration are dependencies """
+        self.assertEqual(section_dependencies(get_program_conf("sqlite-333"), "DEADLOCK"), {"SQLITE"})
+        self.assertEqual(section_dependencies(get_program_conf("sqlite-333"), "SQLITE"), set())
+        self.assertEqual(section_dependencies(get_program_conf("apache-21287"), "PHP"), {"APACHE"})
+
+    def test_dependencies_are_installed_first(self):
+        """ Checks that a section only starts once its dependencies are installed, others running meanwhile """
+        nodes = [
+            InstallNode("program", "LIB", FakeInstaller("lib", self.log.name), set()),
+            InstallNode("program", "MAIN", FakeInstaller("main", self.log.name), {("program", "LIB")}),
+            InstallNode("other", "OTHER", FakeInstaller("other", self.log.name), set())
+        ]
+
+        self.assertEqual(InstallScheduler(3).run(nodes), {"program": 0, "other": 0})
+        log = self.read_log()
+        self.assertLess(log.index("end lib"), log.index("start main"))
+        self.assertLess(log.index("start other"), log.index("end lib"))
+
+    def test_failure_skips_dependents(self):
+        """ Checks that sections depending on a failed one are not installed """
+        nodes = [
+            InstallNode("program", "LIB", FakeInstaller("lib", self.log.name, fail=True), set()),
+            InstallNode("program", "MAIN", FakeInstaller("main", self.log.name), {("program", "LIB")})
+        ]
+
+        self.assertEqual(InstallScheduler(2).run(nodes), {"program": constants.INSTALL_FAIL})
+        self.assertNotIn("start main", self.read_log())
+
+
+    def test_processes_exiting_without_report_fail(self):
+        """ Checks that nodes whose process exits without reporting fail, and that their token is given back once """
+        tokens = []
+        close = JobServer.close
+
+        def count_tokens(jobserver):
+            """ Counts the tokens left in the pool before closing it """
+            while select.select([jobserver.read_fd], [], [], 0)[0]:
+                tokens.append(os.read(jobserver.read_fd, 1))
+            close(jobserver)
+
+        nodes = [
+            InstallNode("clean", "MAIN", FakeInstaller("clean", self.log.name, exit_code=0), set()),
+            InstallNode("crash", "MAIN", FakeInstaller("crash", self.log.name, exit_code=3), set()),
+            InstallNode("program", "MAIN", FakeInstaller("main", self.log.name), set())
+        ]
+        with mock.patch.object(JobServer, "close", count_tokens):
+            results = InstallScheduler(2).run(nodes)
+
+        self.assertEqual(results, {"clean": constants.INSTALL_FAIL, "crash": constants.INSTALL_FAIL, "program": 0})
+        self.assertEqual(len(tokens), 2)
+
+
+class TestJobServer(UnitTest):
+    """
+    Tests for the JobServer
+    """
+    def test_make_uses_the_pool(self):
+        """ Checks that make runs as many jobs as there are tokens in the pool and no more """
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "Makefile"), "w") as _file_:
+                _file_.write("all: a b c d\na b c d:\n\t@sleep 0.3\n")
+
+            jobserver = JobServer(2)
+            try:
+                with jobserver:
+                    start = time.time()
+                    subprocess.check_call(
+                        ["make", "-s"], cwd=directory, env=dict(os.environ, MAKEFLAGS=jobserver.makeflags),
+                        pass_fds=jobserver.fds
+                    )
+                    duration = time.time() - start
+            finally:
+                jobserver.close()
+
+        self.assertGreater(duration, 0.5)
+        self.assertLess(duration, 0.9)
+
+    def test_concurrent_makes_take_tokens(self):
+        """ Checks that the makes of an installation share its token, and take one from the pool each beyond it """
+        jobserver = JobServer(2)
+        installer = types.SimpleNamespace(jobserver=jobserver, __job_slot__=threading.Lock())
+        running, highest = [], []
+        lock = threading.Lock()
+
+        def make():
+            """ Records how many makes run at once """
+            with Installer.job_slot(installer):
+                with lock:
+                    running.append(None)
+                    highest.append(len(running))
+                time.sleep(0.3)
+                with lock:
+                    running.pop()
+
+        try:
+            with jobserver:
+                threads = [threading.Thread(target=make) for _ in range(3)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+                self.assertEqual(max(highest), 2)
+                # the token taken from the pool was given back, the one of the installation is still held
+                self.assertTrue(jobserver.try_acquire())
+                self.assertFalse(jobserver.try_acquire())
+        finally:
+            jobserver.close()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the process runner of the helper module
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+from lib.helper import launch_and_log
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestLaunchAndLog(UnitTest):
+    """
+    Tests for launch_and_log
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_lines_are_logged_as_they_come(self):
+        """ Checks that each line is logged while the process is still running """
+        code = "import sys, time\nfor i in range(3):\n    print(i, flush=True)\n    time.sleep(0.2)"
+        logged = []
+        handler = logging.Handler()
+        handler.emit = lambda record: logged.append((record.getMessage(), record.created))
+        logging.getLogger().addHandler(handler)
+        level = logging.getLogger().level
+        logging.getLogger().setLevel(logging.DEBUG)
+        try:
+            launch_and_log([sys.executable, "-c", code])
+        finally:
+            logging.getLogger().removeHandler(handler)
+            logging.getLogger().setLevel(level)
+
+        times = {line: created for line, created in logged if line in ["0", "1", "2"]}
+        self.assertEqual(["0", "1", "2"], sorted(times))
+        self.assertGreater(times["2"] - times["0"], 0.3)
+
+    def test_only_the_tail_is_kept(self):
+        """ Checks that the output returned and reported on errors is limited to the last lines """
+        self.assertEqual("8\n9", launch_and_log([sys.executable, "-c", "for i in range(10): print(i)"], tail=2))
+
+        with self.assertRaises(subprocess.CalledProcessError) as context:
+            launch_and_log("echo first; echo second >&2; exit 3", shell=True, tail=1, error_msg="Failed")
+        self.assertEqual(3, context.exception.returncode)
+        self.assertEqual(b"second", context.exception.output)
+        self.assertEqual("Failed", context.exception.error_msg)
+
+    def test_output_is_teed(self):
+        """ Checks that the whole output is appended to the log file, after the command """
+        log_file = os.path.join(self.directory.name, "program", "make.log")
+        launch_and_log([sys.executable, "-c", "print('a'); print('b')"], tail=1, log_file=log_file)
+        launch_and_log(["echo", "c"], log_file=log_file)
+
+        with open(log_file) as _file_:
+            lines = _file_.read().splitlines()
+        self.assertEqual(["a", "b", "$ echo c", "c"], lines[1:])
+        self.assertTrue(lines[0].startswith("$ "))
+
+    def test_whole_output_is_kept_on_demand(self):
+        """ Checks that only the last lines are returned, and every line when tail is None """
+        command = [sys.executable, "-c", "print('\\n'.join(str(line) for line in range(300)))"]
+        self.assertEqual(launch_and_log(command, tail=2), "298\n299")
+        self.assertEqual(launch_and_log(command, tail=None).splitlines(), [str(line) for line in range(300)])
+
+    def test_long_lines_are_split(self):
+        """ Checks that lines without end do not have to be held whole in memory """
+        output = launch_and_log([sys.executable, "-c", "print('x' * 200000, end='')"], tail=1)
+        self.assertLess(len(output), 200000)
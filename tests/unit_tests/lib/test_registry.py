@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the plugin registry and its manifest
+"""
+
+from argparse import ArgumentParser
+import json
+import os
+import tempfile
+
+from lib.registry import decode, encode, PluginReference, PluginRegistry, resolve
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestPluginRegistry(UnitTest):
+    """
+    Tests for the manifest of plugins and its replay
+    """
+    plugins = ["base.fail", "base.success", "base.benchmark"]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "plugins.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_manifest_describes_plugins(self):
+        """ Checks that the manifest lists the enabled plugins with their kind and options, and is stored """
+        registry = PluginRegistry(self.plugins, self.path)
+        entries = {entry["name"]: entry for entry in registry.entries()}
+
+        self.assertEqual({"fail", "success", "benchmark"}, set(entries))
+        self.assertEqual("main", entries["fail"]["kind"])
+        self.assertEqual("analysis", entries["benchmark"]["kind"])
+        self.assertEqual(["-b", "--benchmark"], entries["benchmark"]["options"])
+        self.assertEqual(["fail", "success"], [entry["name"] for entry in registry.entries("main")])
+        with open(self.path) as _file_:
+            self.assertEqual(registry.manifest, json.load(_file_))
+
+    def test_replay_registers_references(self):
+        """ Checks that replaying the manifest gives the same parser, with plugins as references until resolved """
+        registry = PluginRegistry(self.plugins, self.path)
+        parser = ArgumentParser()
+        registry.register("register_for_trigger", parser=parser, subparser=parser.add_subparsers())
+
+        arguments = vars(parser.parse_args(["--benchmark", "success"]))
+        self.assertEqual(PluginReference("plugins.base.success", "Success", instance=True), arguments["main_plugin"])
+        self.assertEqual([PluginReference("plugins.base.benchmark", "Benchmark")], arguments["analysis_plugins"])
+
+        self.assertEqual("Success", type(resolve(arguments["main_plugin"])).__name__)
+        self.assertEqual(["Benchmark"], [plugin.__name__ for plugin in resolve(arguments["analysis_plugins"])])
+        self.assertEqual("Fail", registry.load("fail", "main").__name__)
+        self.assertRaises(KeyError, registry.load, "benchmark", "main")
+
+    def test_manifest_is_rebuilt_when_outdated(self):
+        """ Checks that the manifest is not reused once the enabled plugins or their files changed """
+        manifest = PluginRegistry(self.plugins, self.path).manifest
+        self.assertTrue(PluginRegistry(self.plugins, self.path).is_valid(manifest))
+        self.assertFalse(PluginRegistry(self.plugins[:2], self.path).is_valid(manifest))
+
+        path = next(path for path in manifest["files"] if path.endswith("fail.py"))
+        manifest["files"][path] -= 1
+        self.assertFalse(PluginRegistry(self.plugins, self.path).is_valid(manifest))
+
+        with open(self.path, "w") as _file_:
+            json.dump(manifest, _file_)
+        registry = PluginRegistry(self.plugins, self.path)
+        self.assertTrue(registry.is_valid(registry.manifest))
+
+    def test_encoding(self):
+        """ Checks that the arguments given to parsers survive the manifest, and the others are refused """
+        from plugins.base.fail import Fail
+
+        value = {"type": float, "nargs": ("A", "B"), "const": Fail, "default": Fail(), "choices": ["a", 1, None]}
+        decoded = decode(json.loads(json.dumps(encode(value))))
+        self.assertEqual(float, decoded["type"])
+        self.assertEqual(("A", "B"), decoded["nargs"])
+        self.assertEqual(PluginReference("plugins.base.fail", "Fail"), decoded["const"])
+        self.assertEqual(PluginReference("plugins.base.fail", "Fail", instance=True), decoded["default"])
+        self.assertEqual(["a", 1, None], decoded["choices"])
+
+        self.assertRaises(TypeError, encode, object())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the benchmark result store
+"""
+
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from lib.results import SCHEMA, ResultStore
+from lib.trigger.measures import Measure
+from plugins.base.regression import Regression
+from plugins.base.success import Success
+from tests.lib.decorators import mute
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestResultStore(UnitTest):
+    """
+    Tests for ResultStore
+    """
+    def setUp(self):
+        """ Creates a store in a temporary directory """
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ResultStore(os.path.join(self.directory.name, "results.sqlite"))
+
+    def tearDown(self):
+        """ Removes the store """
+        self.directory.cleanup()
+
+    def test_latest_run_wins(self):
+        """ Checks that only the most recent run of a bug and plugin is reported """
+        self.store.add_run("bug", "Success", [1.0], {"mean": 1.0}, timestamp=1)
+        self.store.add_run("bug", "Success", [2.0], {"mean": 2.0}, timestamp=2)
+        self.store.add_run("bug", "Fail", [3.0], {"mean": 3.0}, timestamp=1)
+        self.store.add_run("other", "Success", [4.0], {"mean": 4.0}, timestamp=3)
+
+        self.assertEqual(
+            self.store.latest(["bug"], ["Success", "Fail", "Missing"]), {"bug": {"Success": 2.0, "Fail": 3.0}}
+        )
+
+    def test_filters_and_metrics(self):
+        """ Checks that results can be filtered by host and compiler and that other metrics are queryable """
+        self.store.add_run("bug", "Success", [1.0], {"mean": 1.0, "rss": 10}, host="a", compiler="base.gcc")
+        self.store.add_run("bug", "Success", [2.0], {"mean": 2.0}, host="b", compiler="base.clang")
+
+        self.assertEqual(self.store.latest(["bug"], ["Success"], metric="rss", host="a"), {"bug": {"Success": 10}})
+        self.assertEqual(self.store.latest(["bug"], ["Success"], compiler="base.clang"), {"bug": {"Success": 2.0}})
+        self.assertEqual(self.store.latest(["bug"], ["Success"], metric="rss", host="b"), {})
+
+    def test_raw_samples_are_kept(self):
+        """ Checks that warm, cold and helper samples are stored """
+        run_id = self.store.add_run(
+            "bug", "Success", [Measure(1.5, 1, 0.25, 100, 2, 3), Measure(2.5, 2, 0.5, 100, 2, 3)], {"mean": 2},
+            cold_samples=[9.0], helper_samples=[0.5, 0.75]
+        )
+
+        self.assertEqual(self.store.samples(run_id), [1.5, 2.5])
+        self.assertEqual(self.store.samples(run_id, kind="cold"), [9.0])
+        self.assertEqual(self.store.samples(run_id, kind="helper"), [0.5, 0.75])
+
+    def test_load_curve_is_kept(self):
+        """ Checks that the throughput and latencies at each concurrency level are stored with the run """
+        curve = [
+            dict(concurrency=8, throughput=900.0, mean=0.008, p50=0.007, p90=0.01, p99=0.02, p999=0.05, count=10),
+            dict(concurrency=1, throughput=500.0, mean=0.002, p50=0.002, p90=0.003, p99=0.004, p999=0.01, count=10),
+        ]
+        run_id = self.store.add_run("apache-1", "Success", [500.0], {"mean": 500.0}, curve=curve)
+        other_id = self.store.add_run("bug", "Success", [1.0], {"mean": 1.0})
+
+        self.assertEqual([point["concurrency"] for point in self.store.curve(run_id)], [1, 8])
+        self.assertEqual(self.store.curve(run_id)[1]["p99"], 0.02)
+        self.assertEqual(self.store.curve(other_id), [])
+
+    def test_history_time_range(self):
+        """ Checks that the history only contains warm samples of runs in the given range """
+        self.store.add_run("bug", "Success", [1.0, 2.0], {"mean": 1.5}, cold_samples=[8.0], timestamp=10)
+        self.store.add_run("bug", "Success", [3.0], {"mean": 3.0}, timestamp=20)
+        self.store.add_run("bug", "Fail", [4.0], {"mean": 4.0}, timestamp=20)
+
+        self.assertEqual(sorted(self.store.history("bug", "Success", until=20)), [1.0, 2.0])
+        self.assertEqual(self.store.history("bug", "Success", since=15), [3.0])
+        self.assertEqual(self.store.history("bug", "Success", metric="cpu"), [])
+
+    def test_placement_filter(self):
+        """ Checks that results can be filtered by the placement of the processes """
+        self.store.add_run("bug", "Success", [1.0], {"mean": 1.0, "placement": "pinned"}, timestamp=1)
+        self.store.add_run("bug", "Success", [2.0], {"mean": 2.0}, timestamp=2)
+
+        self.assertEqual(self.store.latest(["bug"], ["Success"], placement="pinned"), {"bug": {"Success": 1.0}})
+        self.assertEqual(self.store.history("bug", "Success", placement="pinned"), [1.0])
+        self.assertEqual(self.store.latest(["bug"], ["Success"]), {"bug": {"Success": 2.0}})
+
+    def test_direction_is_stored(self):
+        """ Checks that throughputs are known to be better when higher, and costs when lower """
+        self.store.add_run("apache-1", "Success", [10.0], {"mean": 10.0, "higher_is_better": True}, timestamp=1)
+        self.store.add_run("bug", "Success", [1.0], {"mean": 1.0, "higher_is_better": False}, timestamp=1)
+
+        self.assertTrue(self.store.higher_is_better("apache-1", "Success"))
+        self.assertFalse(self.store.higher_is_better("apache-1", "Success", metric="rss"))
+        self.assertFalse(self.store.higher_is_better("bug", "Success"))
+        self.assertFalse(self.store.higher_is_better("unknown", "Success"))
+
+    def test_old_databases_are_migrated(self):
+        """ Checks that databases created before a column was added get it, filled for older runs """
+        path = os.path.join(self.directory.name, "old.sqlite")
+        connection = sqlite3.connect(path)
+        connection.executescript(
+            SCHEMA.replace(",\n    placement TEXT", "").replace(",\n    higher_is_better INTEGER", "")
+        )
+        with connection:
+            connection.execute("INSERT INTO runs (bug, plugin, timestamp) VALUES ('apache-21287', 'Success', 1)")
+            connection.execute("INSERT INTO runs (bug, plugin, timestamp) VALUES ('pbzip-2094', 'Success', 1)")
+        connection.close()
+
+        store = ResultStore(path)
+        connection = sqlite3.connect(path)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(runs)")]
+        connection.close()
+        self.assertIn("placement", columns)
+        self.assertIn("higher_is_better", columns)
+        self.assertTrue(store.higher_is_better("apache-21287", "Success"))
+        self.assertFalse(store.higher_is_better("pbzip-2094", "Success"))
+
+    def test_legacy_log_is_imported_once(self):
+        """ Checks that the results older versions logged are imported the first time the database is opened """
+        legacy_log = os.path.join(self.directory.name, "benchmark.log")
+        with open(legacy_log, "w") as _file_:
+            _file_.write("pbzip-2094, Success, None, 1.5, 0.7, 0.5 1.0 2.0\n")
+            _file_.write("truncated line\n")
+            _file_.write("apache-21287, Success, 4, 10.0, 0, 0 10.0\n")
+
+        path = os.path.join(self.directory.name, "legacy.sqlite")
+        store = ResultStore(path, legacy_log)
+        ResultStore(path, legacy_log)
+
+        self.assertEqual(store.latest(["pbzip-2094", "apache-21287"], ["Success"]),
+                         {"pbzip-2094": {"Success": 1.5}, "apache-21287": {"Success": 10.0}})
+        self.assertEqual(sorted(store.history("pbzip-2094", "Success")), [1.0, 2.0])
+        self.assertTrue(store.higher_is_better("apache-21287", "Success"))
+        self.assertFalse(store.higher_is_better("pbzip-2094", "Success"))
+        self.assertEqual(store.history("apache-21287", "Success"), [10.0])
+
+
+class TestRegression(UnitTest):
+    """
+    Tests for the regression report
+    """
+    def setUp(self):
+        """ Creates a store in a temporary directory, used by the plugin """
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ResultStore(os.path.join(self.directory.name, "results.sqlite"))
+        patcher = mock.patch("plugins.base.regression.ResultStore", return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.regression = Regression()
+        self.regression.start_time = 100
+
+    def tearDown(self):
+        """ Removes the store """
+        self.directory.cleanup()
+
+    def add_runs(self, bug: str, values: list, timestamp: float, higher_is_better: bool) -> None:
+        """
+        Stores one run per value
+
+        :param bug: the bug benchmarked
+        :param values: the result of each run
+        :param timestamp: when the runs were done
+        :param higher_is_better: whether the results are throughputs
+        """
+        for value in values:
+            self.store.add_run(
+                bug, "Success", [value], {"mean": value, "higher_is_better": higher_is_better}, timestamp=timestamp
+            )
+
+    @mute
+    def test_too_few_samples_are_not_compared(self):
+        """ Checks that a single throughput sample, which can never be significant, is not reported as ok """
+        self.add_runs("apache-1", [100.0] * 40, 50, True)
+        self.add_runs("apache-1", [10.0], 150, True)
+
+        with mock.patch("builtins.print") as printed:
+            self.assertEqual(0, self.regression.after_run([Success()], ["apache-1"]))
+        self.assertIn("too few samples", printed.call_args[0][0])
+
+    @mute
+    def test_slower_timings_are_a_regression(self):
+        """ Checks that a significant slowdown against a faster history is reported and makes the run fail """
+        self.add_runs("bug", [1.0 + index / 100 for index in range(10)], 50, False)
+        self.add_runs("bug", [1.5 + index / 100 for index in range(6)], 150, False)
+
+        with mock.patch("builtins.print") as printed:
+            self.assertEqual(1, self.regression.after_run([Success()], ["bug"]))
+        self.assertIn("REGRESSION", printed.call_args[0][0])
+
+    @mute
+    def test_small_or_old_changes_are_not_regressions(self):
+        """ Checks that slowdowns under the threshold and runs older than the history window are not reported """
+        self.add_runs("bug", [1.0 + index / 100 for index in range(10)], 50, False)
+        self.add_runs("bug", [1.02 + index / 100 for index in range(6)], 150, False)
+        self.assertEqual(0, self.regression.after_run([Success()], ["bug"]))
+
+        self.add_runs("other", [1.0 + index / 100 for index in range(10)], 50, False)
+        self.add_runs("other", [1.5 + index / 100 for index in range(6)], 150, False)
+        self.assertEqual(0, self.regression.after_run([Success()], ["other"], regression_days=25 / (24 * 3600)))
+
+    @mute
+    def test_lower_throughput_is_a_regression(self):
+        """ Checks that throughputs regress when they decrease and timings when they increase """
+        self.add_runs("apache-1", [100.0 + index for index in range(10)], 50, True)
+        self.add_runs("apache-1", [50.0 + index for index in range(6)], 150, True)
+        self.assertEqual(1, self.regression.after_run([Success()], ["apache-1"]))
+
+        self.add_runs("bug", [1.0 + index / 100 for index in range(10)], 50, False)
+        self.add_runs("bug", [0.5 + index / 100 for index in range(6)], 150, False)
+        self.assertEqual(0, self.regression.after_run([Success()], ["bug"]))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the statistical helpers
+"""
+
+import random
+
+from lib.stats import mann_whitney, median_confidence_interval, relative_precision, student_quantile, warmup_length, \
+    wilson_interval
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestStats(UnitTest):
+    """
+    Tests for lib.stats
+    """
+    def test_student_quantiles(self):
+        """ Checks the quantiles against tabulated values """
+        for degrees, expected in [(1, 12.706), (2, 4.303), (4, 2.776), (9, 2.262), (29, 2.045)]:
+            self.assertAlmostEqual(student_quantile(0.975, degrees), expected, places=2)
+
+    def test_warmup_is_detected(self):
+        """ Checks that slow first runs are discarded, and that steady results are not """
+        generator = random.Random(42)
+        steady = [10 + generator.gauss(0, 0.1) for _ in range(30)]
+
+        self.assertEqual(warmup_length([30, 20, 15] + steady), 3)
+        self.assertLessEqual(warmup_length(steady), 3)
+
+    def test_precision_increases_with_samples(self):
+        """ Checks that more samples of the same distribution give a narrower interval """
+        generator = random.Random(42)
+        samples = [10 + generator.gauss(0, 1) for _ in range(400)]
+
+        for statistic in ["mean", "median"]:
+            self.assertGreater(
+                relative_precision(samples[:10], statistic=statistic), relative_precision(samples, statistic=statistic)
+            )
+            self.assertLess(relative_precision(samples, statistic=statistic), 0.02)
+
+    def test_median_interval_contains_median(self):
+        """ Checks that the median interval is centered on the median """
+        median, half_width = median_confidence_interval(list(range(101)))
+        self.assertEqual(median, 50)
+        self.assertGreater(half_width, 0)
+
+    def test_mann_whitney_detects_shift(self):
+        """ Checks that a shifted distribution is detected as greater, and that noise is not """
+        generator = random.Random(42)
+        baseline = [10 + generator.gauss(0, 0.5) for _ in range(30)]
+        same = [10 + generator.gauss(0, 0.5) for _ in range(10)]
+        slower = [11 + generator.gauss(0, 0.5) for _ in range(10)]
+
+        self.assertLess(mann_whitney(slower, baseline), 0.01)
+        self.assertGreater(mann_whitney(same, baseline), 0.01)
+        self.assertGreater(mann_whitney(baseline, slower), 0.99)
+
+    def test_wilson_interval(self):
+        """ Checks the Wilson interval against known values and that it stays within [0, 1] """
+        low, high = wilson_interval(5, 10)
+        self.assertAlmostEqual(low, 0.2366, places=4)
+        self.assertAlmostEqual(high, 0.7634, places=4)
+
+        low, high = wilson_interval(0, 20)
+        self.assertEqual(low, 0)
+        self.assertAlmostEqual(high, 0.1611, places=4)
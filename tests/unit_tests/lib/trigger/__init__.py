@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Unittest for the trigger module
+"""
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
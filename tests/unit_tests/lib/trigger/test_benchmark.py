@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the client-server benchmarks
+"""
+
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from unittest import mock
+
+from lib.trigger.benchmark import ApacheBenchmark, BaseBenchmark, RawBenchmark, ServerBenchmark
+from lib.trigger.measures import Measure
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class FakeServerBenchmark(ServerBenchmark):
+    """
+    A benchmark whose server always starts and whose measures are given in advance
+    """
+    def __init__(self, trigger, measures):
+        super().__init__(trigger)
+        self.measures = iter(measures)
+        self.starts = 0
+        self.stops = 0
+
+    def run(self, *args, **kwargs) -> int:
+        """ Runs the benchmark with a persistent server """
+        return self.persistent_run()
+
+    def measure(self) -> (list, bool):
+        """ Returns the next measure """
+        return next(self.measures)
+
+    def start_server(self) -> bool:
+        """ Counts starts """
+        self.starts += 1
+        return True
+
+    def stop_server(self) -> None:
+        """ Counts stops """
+        self.stops += 1
+
+
+class TestPersistentServer(UnitTest):
+    """
+    Tests for benchmarks keeping a server alive between measures
+    """
+    @mock.patch.object(ServerBenchmark, "kept_runs", 2)
+    @mock.patch.object(ServerBenchmark, "expected_results", 3)
+    def test_server_restarted_only_after_failure(self):
+        """ Checks that the server is restarted only on failures and that cold runs are kept apart """
+        trigger = mock.Mock(returned_metadata={})
+        benchmark = FakeServerBenchmark(
+            trigger, [([10], True), ([1], True), ([0], False), ([9], True), ([2], True), ([3], True)]
+        )
+
+        self.assertEqual(benchmark.run(), 0)
+        self.assertEqual(benchmark.starts, 2)
+        self.assertEqual(benchmark.stops, 2)
+        self.assertEqual(trigger.returned_information, [2, 3])
+        self.assertEqual(trigger.returned_metadata["cold"], [10, 9])
+
+
+class TestAdaptiveBenchmark(UnitTest):
+    """
+    Tests for benchmarks sampling until their results are precise enough
+    """
+    @mock.patch.object(RawBenchmark, "maximum_tries", 30)
+    @mock.patch.object(RawBenchmark, "adaptive", True)
+    def test_measures_are_kept(self):
+        """ Checks that the Measures of a BaseBenchmark can be used to detect the warmup and the precision """
+        trigger = mock.Mock(cmd="true", returned_metadata={})
+
+        self.assertEqual(BaseBenchmark(trigger).run(), 0)
+        self.assertTrue(trigger.returned_information)
+        self.assertTrue(all(isinstance(result, Measure) for result in trigger.returned_information))
+        self.assertIn("precision", trigger.returned_metadata)
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """
+    Serves files without logging requests
+    """
+    def log_message(self, *args):
+        """ Does not log requests """
+
+
+class TestApacheBenchmark(UnitTest):
+    """
+    Tests for the http benchmark
+    """
+    @mock.patch.object(ApacheBenchmark, "requests", 50)
+    @mock.patch.object(ApacheBenchmark, "rate", None)
+    @mock.patch.object(ApacheBenchmark, "concurrency_levels", [1, 4])
+    def test_concurrency_curve(self):
+        """ Checks that the server is measured at every concurrency level """
+        server = ThreadingHTTPServer(("127.0.0.1", 0), QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        trigger = mock.Mock(
+            returned_metadata={}, check_success=mock.Mock(return_value=0),
+            benchmark_url="http://127.0.0.1:{}/".format(server.server_address[1])
+        )
+        try:
+            result, success = ApacheBenchmark(trigger).measure()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        curve = trigger.returned_metadata["curve"]
+        self.assertTrue(success)
+        self.assertEqual([point["concurrency"] for point in curve], [1, 4])
+        self.assertEqual(result, [curve[0]["throughput"]])
+        self.assertTrue(all(point["count"] == 50 and point["p50"] <= point["p999"] for point in curve))
+
+    @mock.patch.object(ApacheBenchmark, "placement", mock.MagicMock(key="default"))
+    @mock.patch.object(ApacheBenchmark, "persistent_server", False)
+    @mock.patch.object(ApacheBenchmark, "adaptive", False)
+    @mock.patch.object(ApacheBenchmark, "kept_runs", 2)
+    @mock.patch.object(ApacheBenchmark, "expected_results", 3)
+    def test_restarted_server_keeps_steady_results(self):
+        """ Checks that apache is measured as many times as other servers, with the same warmup and precision """
+        trigger = mock.Mock(returned_metadata={})
+        benchmark = ApacheBenchmark(trigger)
+        with mock.patch.object(benchmark, "start_server", return_value=True) as start, \
+                mock.patch.object(benchmark, "stop_server"), \
+                mock.patch.object(benchmark, "measure", side_effect=[([50.0], True), ([], False), ([100.0], True),
+                                                                     ([102.0], True)]):
+            self.assertEqual(benchmark.run(), 0)
+
+        self.assertEqual(start.call_count, 4)
+        self.assertEqual(trigger.returned_information, [100.0, 102.0])
+        self.assertEqual(trigger.returned_metadata["warmup"], 1)
+        self.assertIn("precision", trigger.returned_metadata)
+        self.assertTrue(trigger.returned_metadata["higher_is_better"])
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the helpers results channel
+"""
+
+import time
+
+from lib.trigger.channel import ResultsChannel, run_helpers
+from lib.trigger.helper import BaseHelper
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class ReportingHelper(BaseHelper):  # pylint: disable=too-few-public-methods
+    """
+    A helper waiting for some time before reporting a value
+    """
+    def __init__(self, value, delay, results):
+        super().__init__()
+        self.value = value
+        self.delay = delay
+        self.results = results
+
+    def run(self) -> None:
+        """ Waits and reports the value """
+        time.sleep(self.delay)
+        self.results.put(self.value)
+
+
+class TestResultsChannel(UnitTest):
+    """
+    Tests for ResultsChannel
+    """
+    def test_all_results_are_collected(self):
+        """ Checks that every helper's result is collected in order, including helpers reporting None """
+        channel = ResultsChannel(4)
+        helpers = [
+            ReportingHelper(value, delay, channel.slot(index))
+            for index, (value, delay) in enumerate([(3, 0.2), (None, 0), (1.5, 0.1), (7, 0)])
+        ]
+        run_helpers(helpers, channel)
+
+        self.assertEqual(channel.results(), [3, None, 1.5, 7])
+        durations = channel.durations()
+        self.assertGreaterEqual(durations[0], 0.2)
+        self.assertLess(durations[3], durations[0])
+        self.assertFalse(any(helper.is_alive() for helper in helpers))
+
+    def test_terminated_helpers_have_no_result(self):
+        """ Checks that helpers stopped by the timeout are reaped and only miss their own result """
+        channel = ResultsChannel(2)
+        helpers = [ReportingHelper(1, 0, channel.slot(0)), ReportingHelper(2, 30, channel.slot(1))]
+        run_helpers(helpers, channel, timeout=0.5)
+
+        self.assertEqual(channel.results(), [1])
+        self.assertIsNone(channel.durations()[1])
+        self.assertTrue(all(helper.exitcode is not None for helper in helpers))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the collection of coredumps
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from lib.configuration.core_handler import metadata_path
+from lib.trigger.coredumps import archive_core, wait_for_core
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestCoredumps(UnitTest):
+    """
+    Tests for wait_for_core and archive_core
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.archive = os.path.join(self.directory, "archive")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_core(self, name: str, stack_hash: str=None) -> str:
+        """
+        Creates a fake core with its description
+
+        :param name: the name of the core
+        :param stack_hash: the hash of the crash
+        :return: the path to the core
+        """
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as _file_:
+            _file_.write(b"core")
+        with open(metadata_path(path), "w") as _file_:
+            json.dump({"stack_hash": stack_hash, "signal": 11, "time": 1}, _file_)
+        return path
+
+    def test_core_arrival_is_detected(self):
+        """ Checks that a core moved in place while waiting is found without waiting for the whole timeout """
+        core = os.path.join(self.directory, "program.core.gz")
+        staging = os.path.join(self.directory, ".core-staging")
+        with open(staging, "w") as _file_:
+            _file_.write("core")
+
+        timer = threading.Timer(0.2, os.rename, [staging, core])
+        start = time.monotonic()
+        timer.start()
+        try:
+            self.assertEqual(core, wait_for_core([core, core[:-len(".gz")]], 10))
+        finally:
+            timer.join()
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_missing_core(self):
+        """ Checks that no core is found when none appears """
+        self.assertIsNone(wait_for_core([os.path.join(self.directory, "program.core")], 0.1))
+        self.assertIsNone(wait_for_core([os.path.join(self.directory, "missing", "program.core")], 0.1))
+
+    def test_identical_crashes_are_archived_once(self):
+        """ Checks that only the first core of each crash is kept, and that all crashes are counted """
+        first = archive_core(self.make_core("first.core.gz", "abcd"), self.archive)
+        second = archive_core(self.make_core("second.core.gz", "abcd"), self.archive)
+        other = archive_core(self.make_core("third.core.gz", "ef01"), self.archive)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "second.core.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "second.core.json")))
+
+        with open(os.path.join(self.archive, "crashes.json")) as _file_:
+            crashes = json.load(_file_)
+        self.assertEqual({"abcd": 2, "ef01": 1}, {key: value["count"] for key, value in crashes.items()})
+        self.assertEqual(os.path.basename(first), crashes["abcd"]["core"])
+        self.assertTrue(os.path.exists(metadata_path(first)))
+
+    def test_core_without_hash(self):
+        """ Checks that cores that could not be hashed are all kept """
+        core = archive_core(self.make_core("program.core.gz"), self.archive)
+        self.assertEqual(os.path.join(self.archive, "program.core.gz"), core)
+        self.assertTrue(os.path.exists(core))
+        self.assertFalse(os.path.exists(os.path.join(self.archive, "crashes.json")))
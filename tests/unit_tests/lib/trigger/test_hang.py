@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the deadlock detector
+"""
+
+import subprocess
+import sys
+import time
+
+from lib.trigger.hang import HangDetector, ThreadSample, read_threads
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+DEADLOCK = "import threading; lock = threading.Lock(); lock.acquire(); lock.acquire()"
+
+
+class TestHangDetector(UnitTest):
+    """
+    Tests for HangDetector
+    """
+    @staticmethod
+    def spawn(code: str) -> subprocess.Popen:
+        """
+        :param code: the python code to run
+        :return: a python interpreter running the code
+        """
+        return subprocess.Popen([sys.executable, "-c", code])
+
+    def test_deadlock_is_detected(self):
+        """ Checks that a process stuck on a lock is detected within about the timeout """
+        process = self.spawn(DEADLOCK)
+        try:
+            start = time.monotonic()
+            self.assertTrue(HangDetector(process.pid, timeout=0.3, interval=0.02).wait(process))
+            self.assertLess(time.monotonic() - start, 5)
+            self.assertTrue(all(thread.waiting_on_futex for thread in read_threads(process.pid).values()))
+        finally:
+            process.kill()
+            process.wait()
+
+    def test_exit_is_detected(self):
+        """ Checks that a process exiting is not taken for a deadlock, and that its exit is noticed at once """
+        process = self.spawn("import time; time.sleep(0.5)")
+        start = time.monotonic()
+        self.assertFalse(HangDetector(process.pid, timeout=0.2, interval=10).wait(process))
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_busy_process_is_not_deadlocked(self):
+        """ Checks that a process using cpu time is not taken for a deadlock """
+        process = self.spawn("import time\\nend = time.time() + 1\\nwhile time.time() < end: pass")
+        self.assertFalse(HangDetector(process.pid, timeout=0.2, interval=0.02).wait(process))
+
+    def test_thread_states(self):
+        """ Checks which thread states count as waiting on a futex """
+        self.assertTrue(ThreadSample("S", 0, wchan="futex_wait_queue").waiting_on_futex)
+        self.assertTrue(ThreadSample("S", 0).waiting_on_futex)
+        self.assertFalse(ThreadSample("S", 0, wchan="hrtimer_nanosleep").waiting_on_futex)
+        self.assertFalse(ThreadSample("R", 0, wchan="futex_wait_queue").waiting_on_futex)
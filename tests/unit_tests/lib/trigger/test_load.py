@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the HTTP load generator
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+from lib.trigger.load import LatencyHistogram, LoadGenerator
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with its path, or without a body for /empty and /cached, keeping the connection open
+    """
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """ Answers with the requested path """
+        KeepAliveHandler.connections.add(self.client_address)
+        if self.path in ("/empty", "/cached"):
+            self.send_response(204 if self.path == "/empty" else 304)
+            self.end_headers()
+            return
+
+        body = self.path.encode()
+        self.send_response(200 if self.path != "/missing" else 404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """ Does not log requests """
+
+
+class TestLoadGenerator(UnitTest):
+    """
+    Tests for LoadGenerator
+    """
+    def setUp(self):
+        """ Starts a local http server """
+        KeepAliveHandler.connections = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        """ Stops the server """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_kept_alive(self):
+        """ Checks that every request is answered and that each client uses a single connection """
+        result = LoadGenerator([self.url + "/page?id={iteration}"], concurrency=4, requests=200).run()
+
+        self.assertEqual(result.requests, 200)
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(result.statuses, {200: 200})
+        self.assertLessEqual(len(KeepAliveHandler.connections), 4)
+
+    def test_url_mix(self):
+        """ Checks that urls are picked according to their weights """
+        result = LoadGenerator(
+            [self.url + "/", self.url + "/missing"], weights=[3, 1], concurrency=2, requests=400
+        ).run()
+
+        self.assertEqual(sum(result.statuses.values()), 400)
+        self.assertGreater(result.statuses[200], result.statuses[404] * 2)
+
+    def test_open_loop_rate(self):
+        """ Checks that requests are sent at the given rate """
+        result = LoadGenerator([self.url], concurrency=4, requests=40, rate=200).run()
+
+        self.assertEqual(result.requests, 40)
+        self.assertGreaterEqual(result.elapsed, 39 / 200)
+        self.assertLess(result.throughput, 220)
+
+    def test_responses_without_body(self):
+        """ Checks that responses without a body nor a length are not waited for until the timeout """
+        result = LoadGenerator([self.url + "/empty", self.url + "/cached"], concurrency=2, requests=20, timeout=2).run()
+
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(result.statuses[204] + result.statuses[304], 20)
+        self.assertLess(result.elapsed, 2)
+
+    def test_unreachable_server_stops_after_errors(self):
+        """ Checks that a run against a dead server gives up """
+        self.tearDown()
+        result = LoadGenerator([self.url], concurrency=2, requests=1000, max_errors=5).run()
+        self.assertEqual(result.requests, 0)
+        self.assertLess(result.errors, 20)
+        self.setUp()
+
+
+class TestLatencyHistogram(UnitTest):
+    """
+    Tests for LatencyHistogram
+    """
+    def test_percentiles(self):
+        """ Checks that percentiles are correct within the precision of the histogram """
+        histogram = LatencyHistogram()
+        for value in range(1, 1001):
+            histogram.record(value / 1000)
+
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, delta=0.5 * 0.01)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, delta=0.99 * 0.01)
+        self.assertEqual(histogram.percentile(100), 1)
+        self.assertAlmostEqual(histogram.mean, 0.5005)
+
+    def test_merge(self):
+        """ Checks that merging histograms is the same as recording all values in one """
+        first, second, merged = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for value in range(1, 100):
+            (first if value % 2 else second).record(value / 100)
+            merged.record(value / 100)
+
+        first.merge(second)
+        self.assertEqual(first.summary(), merged.summary())
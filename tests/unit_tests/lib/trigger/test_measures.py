@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the resource accounting of benchmarked processes
+"""
+
+import sys
+
+from lib.trigger.measures import measure_command
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestMeasures(UnitTest):
+    """
+    Tests for measure_command
+    """
+    def test_cpu_and_memory_are_measured(self):
+        """ Checks that a busy child reports cpu time and memory, and that its wall time is its float value """
+        returncode, measure = measure_command(
+            [sys.executable, "-c", "data = bytearray(50 * 1024 * 1024)\nfor _ in range(2000000): pass"]
+        )
+
+        self.assertEqual(returncode, 0)
+        self.assertGreater(measure.cpu_time, 0)
+        self.assertGreater(measure.max_rss, 50 * 1024)
+        self.assertEqual(float(measure), measure.wall_time)
+
+    def test_return_code_is_given(self):
+        """ Checks that the exit code of the child is returned """
+        returncode, _ = measure_command("exit 3", shell=True)
+        self.assertEqual(returncode, 3)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the placement of benchmarked processes
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from lib.trigger.placement import Placement, format_cpus, parse_cpus
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestCpuLists(UnitTest):
+    """
+    Tests for parse_cpus and format_cpus
+    """
+    def test_round_trip(self):
+        """ Checks that cpu lists are parsed and formatted as ranges """
+        self.assertEqual([0, 1, 2, 3, 6, 8, 9], parse_cpus("0-3, 6,8-9"))
+        self.assertEqual("0-3,6,8-9", format_cpus([9, 0, 1, 2, 3, 6, 8]))
+        self.assertEqual([], parse_cpus(""))
+
+    def test_malformed(self):
+        """ Checks that malformed lists are rejected """
+        with self.assertRaises(ValueError):
+            parse_cpus("0-a")
+
+
+class TestPlacement(UnitTest):
+    """
+    Tests for Placement
+    """
+    def setUp(self):
+        self.available = sorted(os.sched_getaffinity(0))
+
+    def test_nothing_pinned(self):
+        """ Checks that an empty placement changes nothing and is not recorded """
+        with Placement() as placement:
+            self.assertEqual(self.available, sorted(os.sched_getaffinity(0)))
+        self.assertIsNone(placement.key)
+
+    def test_unavailable_cpus(self):
+        """ Checks that cpus bugbase cannot use are rejected """
+        with self.assertRaises(ValueError):
+            Placement(program_cpus=[max(self.available) + 1])
+
+    def test_helpers_get_the_other_cpus(self):
+        """ Checks that bugbase runs on the cpus not given to the program, and gets its cpus back afterwards """
+        if len(self.available) < 2:
+            self.skipTest("At least two cpus are needed")
+
+        placement = Placement(program_cpus=self.available[:1])
+        self.assertEqual(self.available[1:], placement.helper_cpus)
+        with placement:
+            self.assertEqual(self.available[1:], sorted(os.sched_getaffinity(0)))
+        self.assertEqual(self.available, sorted(os.sched_getaffinity(0)))
+
+    def test_program_is_pinned(self):
+        """ Checks that programs started with the preexec function run on the program cpus, and that it is recorded """
+        placement = Placement(program_cpus=self.available[-1:], memory_limit=0)
+        with placement:
+            output = subprocess.check_output(
+                [sys.executable, "-c", "import os; print(sorted(os.sched_getaffinity(0)))"],
+                preexec_fn=placement.preexec_fn()
+            )
+
+        self.assertEqual(str(self.available[-1:]), output.decode().strip())
+        self.assertEqual(str(self.available[-1]), json.loads(placement.key)["program_cpus"])
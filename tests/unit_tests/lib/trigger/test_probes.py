@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the server readiness probes
+"""
+
+import os
+import socket
+import tempfile
+
+from lib.trigger.probes import LogProbe, PidfileProbe, TcpProbe, wait_ready, wait_stopped
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestProbes(UnitTest):
+    """
+    Tests for the probes and the waiting functions
+    """
+    def test_tcp_probe_follows_listening_socket(self):
+        """ Checks that the tcp probe is ready only while something listens on the port """
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        probe = TcpProbe(server.getsockname()[1])
+
+        self.assertTrue(wait_ready([probe], timeout=1))
+        server.close()
+        self.assertTrue(wait_stopped([probe], timeout=1))
+
+    def test_pidfile_probe(self):
+        """ Checks that the pidfile probe needs a living process """
+        with tempfile.TemporaryDirectory() as directory:
+            probe = PidfileProbe(os.path.join(directory, "server.pid"))
+            self.assertTrue(probe.is_stopped())
+
+            with open(probe.path, "w") as pidfile:
+                pidfile.write(str(os.getpid()))
+            self.assertTrue(probe.is_ready())
+
+    def test_log_probe(self):
+        """ Checks that the log probe waits for the pattern """
+        with tempfile.TemporaryDirectory() as directory:
+            probe = LogProbe(os.path.join(directory, "log"), r"ready to accept")
+            self.assertFalse(wait_ready([probe], timeout=0.1))
+
+            with open(probe.path, "w") as log:
+                log.write("starting\nserver ready to accept connections\n")
+            self.assertTrue(probe.is_ready())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the reproduction rate estimation
+"""
+
+import random
+
+from lib.exceptions import PluginIncompatibleException
+from lib.trigger.reproduction import estimate_reproduction
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestEstimateReproduction(UnitTest):
+    """
+    Tests for estimate_reproduction
+    """
+    def test_stops_early_when_precise(self):
+        """ Checks that a bug that always reproduces stops as soon as the interval is narrow enough """
+        batches = []
+
+        def run_batch(count):
+            batches.append(count)
+            return [(1, None)] * count
+
+        estimate = estimate_reproduction(run_batch, batch_size=4, max_runs=1000, min_runs=10, precision=0.05)
+        self.assertLess(estimate.runs, 1000)
+        self.assertEqual(estimate.rate, 1)
+        self.assertLessEqual(estimate.half_width, 0.05)
+        self.assertTrue(all(count == 4 for count in batches))
+
+    def test_interval_contains_rate(self):
+        """ Checks that the estimated interval contains the true reproduction rate and that max_runs is respected """
+        generator = random.Random(0)
+        estimate = estimate_reproduction(
+            lambda count: [(int(generator.random() < 0.3), None) for _ in range(count)],
+            batch_size=3, max_runs=400, precision=0.01
+        )
+
+        low, high = estimate.interval
+        self.assertEqual(estimate.runs, 400)
+        self.assertLess(low, 0.3)
+        self.assertGreater(high, 0.3)
+
+    def test_stops_on_exceptions(self):
+        """ Checks that runs raising an exception are not counted and stop the estimation """
+        exception = PluginIncompatibleException("incompatible")
+        estimate = estimate_reproduction(lambda count: [(None, exception)] * count, batch_size=2, max_runs=100)
+        self.assertEqual(estimate.runs, 0)
+        self.assertEqual(estimate.errors, [exception, exception])
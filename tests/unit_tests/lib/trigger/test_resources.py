@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# pylint: disable=invalid-name
+
+"""
+Tests for the declarative trigger resources
+"""
+
+import os
+import tempfile
+from unittest import mock
+
+from lib.parsers.configuration import get_global_conf
+from lib.trigger import RawTrigger
+from lib.trigger.resources import Cpus, Port, ProcessName, ScratchDirectory
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class FakeTrigger(RawTrigger):
+    """
+    A trigger declaring one resource of each type
+    """
+    program = "fake"
+    benchmark = None
+    resources = [Port("port"), Port("fixed_port", option="listening_port"), ScratchDirectory("scratch"), Cpus(2),
+                 ProcessName("fake")]
+
+    def __init__(self):  # pylint: disable=super-init-not-called
+        self.__resources__ = {}
+        self.conf = {"listening_port": "16002"}
+
+    def run(self) -> int:
+        """ Nothing to run """
+        return 0
+
+    def check_success(self, *args, **kwargs) -> int:
+        """ Always successful """
+        return 0
+
+
+class TestResources(UnitTest):
+    """
+    Tests for trigger resources
+    """
+    def setUp(self):
+        """ Uses a temporary scratch directory """
+        self.scratch = tempfile.TemporaryDirectory()
+        get_global_conf().set("trigger", "scratch_directory", self.scratch.name)
+
+    def tearDown(self):
+        """ Removes the scratch directory """
+        self.scratch.cleanup()
+
+    def test_only_non_duplicable_resources_are_locked(self):
+        """ Checks that fixed ports and process names are locked, but not the others """
+        self.assertSetEqual(FakeTrigger.get_locks({"listening_port": "16002"}), {"port:16002", "process:fake"})
+
+    def test_cpus_are_summed(self):
+        """ Checks that declared cpus are used for scheduling """
+        self.assertEqual(FakeTrigger.get_cpus(), 2)
+
+    def test_each_run_gets_its_own_scratch_directory(self):
+        """ Checks that two triggers get different scratch directories, removed on release """
+        first, second = FakeTrigger(), FakeTrigger()
+        self.assertNotEqual(first.resource("scratch"), second.resource("scratch"))
+        self.assertEqual(first.resource("scratch"), first.resource("scratch"))
+
+        directory = first.resource("scratch")
+        first.release_resources()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_fixed_port_comes_from_configuration(self):
+        """ Checks that a fixed port is read from the configuration, and a free one is otherwise given """
+        trigger = FakeTrigger()
+        self.assertEqual(trigger.resource("fixed_port"), 16002)
+        self.assertGreater(trigger.resource("port"), 0)
+
+    def test_unknown_resource_raises(self):
+        """ Checks that asking for an undeclared resource fails """
+        with mock.patch.object(FakeTrigger, "resources", []):
+            self.assertRaises(KeyError, FakeTrigger().resource, "port")
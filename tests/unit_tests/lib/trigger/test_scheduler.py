@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# pylint: disable=invalid-name
+
+"""
+Tests for the concurrent trigger scheduler
+"""
+
+import os
+
+from lib import constants
+from lib.exceptions import PluginIncompatibleException
+from lib.parsers.configuration import get_global_conf
+from lib.trigger.scheduler import Task, TriggerScheduler
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+def identity(value: int) -> int:
+    """ Returns the value it is given """
+    return value
+
+
+def incompatible(msg: str) -> None:
+    """ Raises a PluginIncompatibleException """
+    raise PluginIncompatibleException(msg)
+
+
+def exit_cleanly() -> None:
+    """ Exits with code 0 through SystemExit """
+    raise SystemExit(0)
+
+
+def exit_silently() -> None:
+    """ Exits with code 0 without unwinding, and therefore without reporting anything """
+    os._exit(0)  # pylint: disable=protected-access
+
+
+class TestTriggerScheduler(UnitTest):
+    """
+    Tests for the TriggerScheduler
+    """
+    def setUp(self):
+        """ Disables the progress bar """
+        get_global_conf().set("trigger", "show_progress", "false")
+
+    def test_tasks_sharing_a_lock_cannot_run_together(self):
+        """ Checks that a task is not started while another one holds the same lock """
+        scheduler = TriggerScheduler(4)
+        self.assertFalse(scheduler.can_start(Task(identity, {}, locks={"port:80"}), {"port:80"}, 1))
+        self.assertTrue(scheduler.can_start(Task(identity, {}, locks={"port:81"}), {"port:80"}, 1))
+
+    def test_tasks_do_not_exceed_job_slots(self):
+        """ Checks that cpus of running tasks never go over the number of jobs, but that a big task can still run """
+        scheduler = TriggerScheduler(4)
+        self.assertFalse(scheduler.can_start(Task(identity, {}, cpus=2), set(), 3))
+        self.assertTrue(scheduler.can_start(Task(identity, {}, cpus=8), set(), 0))
+
+    def test_results_are_in_task_order(self):
+        """ Checks that results are returned in the order of the tasks, whatever the order they finished in """
+        tasks = [Task(identity, dict(value=value), locks={"lock:{}".format(value % 2)}) for value in range(6)]
+        results = TriggerScheduler(3).run(tasks)
+        self.assertEqual([value for value, _ in results], list(range(6)))
+
+    def test_expected_exceptions_are_returned(self):
+        """ Checks that expected exceptions are sent back instead of being treated as failures """
+        results = TriggerScheduler(2, expected_exceptions=(PluginIncompatibleException,)).run(
+            [Task(incompatible, dict(msg="not compatible")), Task(identity, dict(value=0))]
+        )
+        self.assertIsInstance(results[0][1], PluginIncompatibleException)
+        self.assertEqual(str(results[0][1]), "not compatible")
+        self.assertEqual(results[1], (0, None))
+
+    def test_tasks_exiting_without_result_fail(self):
+        """ Checks that tasks exiting with code 0 without a result are failures, instead of being waited for forever """
+        results = TriggerScheduler(3).run(
+            [Task(exit_cleanly, {}), Task(exit_silently, {}), Task(identity, dict(value=2))]
+        )
+        self.assertEqual(
+            [(constants.PROGRAM_TRIGGER_FAIL, None), (constants.PROGRAM_TRIGGER_FAIL, None), (2, None)], results
+        )
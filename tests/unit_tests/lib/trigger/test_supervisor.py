@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the supervisor of trigger processes
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from lib.trigger.supervisor import Supervisor
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+# starts a server that daemonizes twice, writing the pid of the daemon to its standard output
+DAEMON = """
+import os, sys, time
+if os.fork() == 0:
+    os.setsid()
+    if os.fork() == 0:
+        print(os.getpid(), flush=True)
+        time.sleep(60)
+    os._exit(0)
+os.wait()
+"""
+
+STUBBORN = """
+import signal, time
+signal.signal(signal.SIGTERM, signal.SIG_IGN)
+print("ready", flush=True)
+time.sleep(60)
+"""
+
+
+def alive(pid: int) -> bool:
+    """
+    :param pid: a process
+    :return: whether the process is running
+    """
+    try:
+        with open("/proc/{}/stat".format(pid)) as _file_:
+            return _file_.read().rpartition(")")[2].split()[0] not in ("Z", "X")
+    except OSError:
+        return False
+
+
+class TestSupervisor(UnitTest):
+    """
+    Tests for Supervisor
+    """
+    def setUp(self):
+        self.supervisor = Supervisor()
+
+    def tearDown(self):
+        self.supervisor.stop(timeout=1)
+
+    def start(self, code: str) -> subprocess.Popen:
+        """
+        :param code: the python code to run
+        :return: a supervised python interpreter running the code
+        """
+        return subprocess.Popen(
+            [sys.executable, "-c", code], stdout=subprocess.PIPE, universal_newlines=True,
+            **self.supervisor.popen_kwargs()
+        )
+
+    def test_daemons_are_stopped(self):
+        """ Checks that processes that left their session and parent are still found and stopped """
+        process = self.start(DAEMON)
+        daemon = int(process.stdout.readline())
+        process.wait()
+        process.stdout.close()
+
+        self.assertIn(daemon, self.supervisor.processes())
+        self.assertTrue(self.supervisor.stop(timeout=5))
+        self.assertFalse(alive(daemon))
+        self.assertEqual(set(), self.supervisor.processes())
+
+    def test_stubborn_processes_are_killed(self):
+        """ Checks that processes ignoring SIGTERM are killed after the timeout """
+        process = self.start(STUBBORN)
+        process.stdout.readline()
+
+        start = time.monotonic()
+        self.assertTrue(self.supervisor.stop(timeout=0.3))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(-9, process.wait())
+        process.stdout.close()
+
+    def test_other_processes_are_left_alone(self):
+        """ Checks that only the processes of the supervisor are stopped """
+        other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        try:
+            process = self.start("import time; time.sleep(60)")
+            self.assertIn(process.pid, self.supervisor.processes())
+            self.assertNotIn(other.pid, self.supervisor.processes())
+            self.assertNotIn(os.getpid(), self.supervisor.processes())
+            self.assertTrue(self.supervisor.stop(timeout=5))
+            self.assertTrue(alive(other.pid))
+            process.wait()
+            process.stdout.close()
+        finally:
+            other.kill()
+            other.wait()
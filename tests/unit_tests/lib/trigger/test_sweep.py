@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the sweeps of client/server triggers
+"""
+
+from unittest import mock
+
+from lib.parsers.configuration import get_global_conf
+from lib.trigger import TriggerWithHelper
+from lib.trigger.sweep import grid, sweep
+from plugins.base.sweep import Sweep
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestSweep(UnitTest):
+    """
+    Tests for sweep
+    """
+    def test_grid(self):
+        """ Checks that every pair of clients and iterations is visited, keeping default iterations if none given """
+        self.assertEqual(
+            [(point.clients, point.iterations) for point in grid([1, 2], [10, 100])],
+            [(1, 10), (1, 100), (2, 10), (2, 100)]
+        )
+        self.assertEqual([(point.clients, point.iterations) for point in grid([4], [])], [(4, None)])
+
+    @mock.patch("lib.trigger.sweep.measure_throughput", return_value=12.5)
+    def test_probability(self, _):
+        """ Checks that triggered and unexpected runs are counted at each point and that the trigger is reset """
+        trigger = mock.Mock()
+        outcomes = iter([1, 0, None, 0, 1, 1])
+        points = sweep(trigger, lambda: next(outcomes), grid([1, 8], []), runs=3)
+
+        self.assertEqual([point.triggered for point in points], [1, 2])
+        self.assertEqual([point.unexpected for point in points], [1, 0])
+        self.assertAlmostEqual(points[1].probability, 2 / 3)
+        self.assertEqual(points[0].throughput, 12.5)
+        self.assertEqual(trigger.scale.call_args_list, [mock.call(1, None), mock.call(8, None), mock.call()])
+
+
+class TestSweepPlugin(UnitTest):
+    """
+    Tests for the Sweep plugin
+    """
+    @mock.patch("lib.trigger.sweep.measure_throughput", return_value=None)
+    def test_trigger_run_is_replaced_by_the_sweep(self, _):
+        """ Checks that the plugin sweeps the configured grid in place of the trigger run """
+        trigger = mock.Mock(spec=TriggerWithHelper)
+        trigger.run.return_value = 1
+        Sweep().pre_trigger_run(trigger=trigger)
+
+        conf = get_global_conf()
+        clients = [int(clients) for clients in conf.getlist("trigger", "sweep_clients")]
+        self.assertEqual(0, trigger.run())
+        self.assertEqual(clients, [point["clients"] for point in trigger.returned_information])
+        self.assertEqual(
+            [conf.getint("trigger", "sweep_runs")] * len(clients),
+            [point["triggered"] for point in trigger.returned_information]
+        )
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Tests for the workload manager
+"""
+
+import bz2
+import os
+import tempfile
+import time
+
+from lib.trigger.workloads import WorkloadManager
+from tests.unit_tests import UnitTest
+
+
+__author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
+
+
+class TestWorkloadManager(UnitTest):
+    """
+    Tests for WorkloadManager
+    """
+    def setUp(self):
+        """ Creates a workload directory """
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = WorkloadManager(self.directory.name)
+
+    def tearDown(self):
+        """ Removes the workloads """
+        self.directory.cleanup()
+
+    def test_workloads_are_reused(self):
+        """ Checks that a workload is generated once, with its metadata """
+        path = self.manager.get(1, "random", seed=4)
+        modification = os.path.getmtime(path)
+
+        self.assertEqual(self.manager.get(1, "random", seed=4), path)
+        self.assertEqual(os.path.getmtime(path), modification)
+        self.assertEqual(os.path.getsize(path), 1024 ** 2)
+        self.assertEqual(
+            {key: self.manager.metadata(path)[key] for key in ["size", "generator", "seed"]},
+            {"size": 1, "generator": "random", "seed": 4}
+        )
+
+    def test_generators_are_seeded(self):
+        """ Checks that the same seed gives the same content, and another seed another content """
+        contents = []
+        for seed in [1, 1, 2]:
+            path = self.manager.get(2, "mixed", seed=seed)
+            with open(path, "rb") as _file_:
+                contents.append(_file_.read())
+            self.manager.remove(path)
+
+        self.assertEqual(contents[0], contents[1])
+        self.assertNotEqual(contents[0], contents[2])
+
+    def test_mixed_data_compresses_partially(self):
+        """ Checks that mixed data is neither incompressible nor trivially compressible """
+        with open(self.manager.get(4, "mixed"), "rb") as _file_:
+            content = _file_.read()
+
+        ratio = len(bz2.compress(content)) / len(content)
+        self.assertGreater(ratio, 0.1)
+        self.assertLess(ratio, 0.9)
+
+    def test_least_recently_used_are_collected(self):
+        """ Checks that old workloads are removed first when over the size limit """
+        old = self.manager.get(1, "random")
+        metadata = self.manager.metadata(old)
+        metadata["last_used"] = time.time() - 3600
+        self.manager.write_metadata(old, metadata)
+        recent = self.manager.get(1, "random", seed=1)
+
+        self.manager.collect(max_size=1.5 / 1024, max_age=0)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(old + ".lock"))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_sparse_workloads_take_no_space(self):
+        """ Checks that sparse workloads are not counted for their size, as they take no space on disk """
+        workloads = [self.manager.get(64, "sparse", seed=seed) for seed in range(2)]
+        self.manager.collect(max_size=1 / 1024, max_age=0)
+        self.assertTrue(all(os.path.exists(path) for path in workloads))
+
+    def test_used_workloads_are_not_removed(self):
+        """ Checks that a workload used since it was chosen for removal is kept """
+        path = self.manager.get(1, "zeros")
+        metadata = self.manager.metadata(path)
+        self.manager.get(1, "zeros")
+
+        self.assertFalse(self.manager.remove(path, metadata))
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(self.manager.remove(path, self.manager.metadata(path)))
+        self.assertFalse(os.path.exists(path))
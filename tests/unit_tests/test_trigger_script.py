@@ -9,11 +9,16 @@ Tests for the trigger entry point
 __author__ = "Benjamin Schubert, benjamin.schubert@epfl.ch"
 
 
-import logging
 import os
+import tempfile
+from unittest.mock import MagicMock, patch
 
 from lib import hooks
 from lib.parsers.configuration import get_global_conf
+from lib.plugins import MetaPlugin
+from lib.trigger.reproduction import estimate_reproduction
+from plugins.base.fail import Fail
+from plugins.base.success import Success
 from tests.lib.decorators import mute
 from tests.unit_tests import UnitTest
 import run
@@ -29,8 +34,6 @@ class TestTriggerScript(UnitTest):
         Loads all enabled plugins before running
         """
         hooks.load_plugins()
-        logging.VERBOSE = logging.DEBUG
-        logging.verbose = logging.debug
 
     def test_coredump_filter(self) -> None:
         """
@@ -86,3 +89,41 @@ class TestTriggerScript(UnitTest):
         """
         args = run.parse_args(["success", "pbzip-2094"])
         self.assertEqual(len(args["bugs"]), 1)
+
+    @mute
+    def test_reproduce_rejects_meta_plugins(self) -> None:
+        """
+        Checks that --reproduce cannot be combined with a meta plugin, whose after_run would never be called
+        """
+        with patch("run.resolve_plugins", lambda arguments: dict(arguments, main_plugin=MagicMock(spec=MetaPlugin))):
+            self.assertRaises(SystemExit, run.parse_args, ["success", "pbzip-2094", "--reproduce", "10"])
+
+    @patch("run.change_coredump_filter", lambda _filter=None: None)
+    @patch("run.pre_trigger_run", lambda **kwargs: None)
+    @patch("run.post_trigger_run", lambda **kwargs: None)
+    @patch("run.post_trigger_clean", lambda **kwargs: None)
+    @patch("plugins.base.fail.wait_for_core", lambda paths, timeout: paths[0])
+    def test_triggered_bugs_are_reproductions(self) -> None:
+        """
+        Checks that only the runs in which the trigger saw the bug count as reproductions, whatever the plugin
+        """
+        for plugin in [Success(), Fail()]:
+            with self.subTest(plugin=plugin.__class__.__name__), tempfile.TemporaryDirectory() as install_directory:
+                outcomes = iter([0, 1, None, 1])
+                trigger = MagicMock()
+                trigger.conf.getdir.return_value = install_directory
+                trigger.conf.get_core_path.return_value = os.path.join(install_directory, "core-1")
+                trigger.run.side_effect = lambda: next(outcomes)
+                module = MagicMock()
+                module.Trigger.return_value = trigger
+
+                with patch("run.importlib.import_module", lambda name: module):
+                    estimate = estimate_reproduction(
+                        lambda count: run.run_triggers(
+                            [(plugin, "pbzip-2094")] * count, jobs=1, report_trigger_result=True
+                        ),
+                        batch_size=1, max_runs=4
+                    )
+
+                self.assertEqual(estimate.runs, 4)
+                self.assertEqual(estimate.reproduced, 2)